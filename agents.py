@@ -5,8 +5,24 @@ from langchain_core.messages import HumanMessage, AIMessage
 from state import AgentState
 from tools import *
 from database.seed_data import MOCK_CUSTOMER_DB
+from sop_rules import collect_evidence, pre_adjudicate
+from findings import make_finding, render_findings
+from resilience import call_with_retry, deferred_resolution, DEFERRED
+from config import ACTIONS, SUPERVISOR_ROUTING, SOP_RULES_ENABLED
 import json
 import re
+import time
+
+
+def _deferred(agent, label, error):
+    """Node output for an agent that gave up after its retries; the supervisor closes the run"""
+    attempts = getattr(error, "attempts", 1)
+    return {
+        "findings": [make_finding(agent, str(error), status="deferred", metrics={"attempts": attempts})],
+        "agent_status": {agent: "deferred"},
+        "messages": [AIMessage(content=f"{label} deferred after {attempts} attempt(s)")],
+        "next": "supervisor"
+    }
 
 
 def create_investigator_agent(model):
@@ -48,21 +64,20 @@ Details: {alert_data['trigger_details']}
 Investigate this alert using available database tools."""
 
         try:
-            result = agent.invoke({"messages": [HumanMessage(content=query)]})
+            result = call_with_retry("investigator", lambda: agent.invoke({"messages": [HumanMessage(content=query)]}))
             findings_text = result["messages"][-1].content
+            evidence = collect_evidence(result["messages"])
             
             return {
-                "findings": [f"[Investigator] {findings_text}"],
+                "findings": [make_finding("investigator", findings_text, evidence)],
+                "agent_status": {"investigator": "ok"},
+                "evidence": evidence,
                 "messages": [AIMessage(content=f"Investigator completed")],
                 "next": "supervisor"
             }
         except Exception as e:
-            print(f"❌ Investigator failed: {str(e)}")
-            return {
-                "findings": [f"[Investigator] ERROR: {str(e)}"],
-                "messages": [AIMessage(content=f"Investigator failed - retrying...")],
-                "next": "investigator"
-            }
+            print(f"❌ Investigator deferred: {str(e)}")
+            return _deferred("investigator", "Investigator", e)
     
     return investigator_node
 
@@ -106,21 +121,20 @@ Details: {alert_data['trigger_details']}
 Gather contextual information using KYC and external data tools."""
 
         try:
-            result = agent.invoke({"messages": [HumanMessage(content=query)]})
+            result = call_with_retry("context_gatherer", lambda: agent.invoke({"messages": [HumanMessage(content=query)]}))
             findings_text = result["messages"][-1].content
+            evidence = collect_evidence(result["messages"])
             
             return {
-                "findings": [f"[Context Gatherer] {findings_text}"],
+                "findings": [make_finding("context_gatherer", findings_text, evidence)],
+                "agent_status": {"context_gatherer": "ok"},
+                "evidence": evidence,
                 "messages": [AIMessage(content=f"Context Gatherer completed")],
                 "next": "supervisor"
             }
         except Exception as e:
-            print(f"❌ Context Gatherer failed: {str(e)}")
-            return {
-                "findings": [f"[Context Gatherer] ERROR: {str(e)}"],
-                "messages": [AIMessage(content=f"Context Gatherer failed - retrying...")],
-                "next": "context_gatherer"
-            }
+            print(f"❌ Context Gatherer deferred: {str(e)}")
+            return _deferred("context_gatherer", "Context Gatherer", e)
     
     return context_gatherer_node
 
@@ -172,7 +186,23 @@ Output ONLY a JSON resolution:
         print("="*80)
         
         alert_data = state["alert_data"]
-        all_findings = "\n\n".join(state["findings"])
+        
+        if SOP_RULES_ENABLED:
+            decision = pre_adjudicate(alert_data, state.get("evidence", {}))
+            if decision:
+                print(f"⚡ SOP rule {decision['sop_rule_applied']}: {decision['action']} (LLM skipped)")
+                return {
+                    "resolution": decision,
+                    "findings": [make_finding(
+                        "adjudicator", f"Decision: {decision['action']} (SOP rule {decision['sop_rule_applied']})",
+                        metrics={"action": decision["action"], "confidence": decision["confidence"]}
+                    )],
+                    "agent_status": {"adjudicator": "ok"},
+                    "messages": [AIMessage(content=f"Adjudicator completed")],
+                    "next": "aem_executor"
+                }
+        
+        all_findings = render_findings(state["findings"])
         
         query = f"""Alert ID: {alert_data['alert_id']}
 Scenario: {alert_data['scenario_code']} - {alert_data['scenario_name']}
@@ -184,7 +214,7 @@ Based on SOP rules for {alert_data['scenario_code']}, make your final resolution
 Output ONLY the JSON resolution format."""
 
         try:
-            result = agent.invoke({"messages": [HumanMessage(content=query)]})
+            result = call_with_retry("adjudicator", lambda: agent.invoke({"messages": [HumanMessage(content=query)]}))
             resolution_text = result["messages"][-1].content
             
             try:
@@ -197,26 +227,66 @@ Output ONLY the JSON resolution format."""
                     "confidence": 0.7,
                     "sop_rule_applied": alert_data['scenario_code']
                 }
+            resolution_json["decided_by"] = "llm"
             
             return {
                 "resolution": resolution_json,
-                "findings": [f"[Adjudicator] Decision: {resolution_json['action']}"],
+                "findings": [make_finding(
+                    "adjudicator", f"Decision: {resolution_json['action']}",
+                    metrics={"action": resolution_json["action"], "confidence": resolution_json.get("confidence")}
+                )],
+                "agent_status": {"adjudicator": "ok"},
                 "messages": [AIMessage(content=f"Adjudicator completed")],
                 "next": "aem_executor"
             }
         except Exception as e:
-            print(f"❌ Adjudicator failed: {str(e)}")
-            return {
-                "findings": [f"[Adjudicator] ERROR: {str(e)}"],
-                "messages": [AIMessage(content=f"Adjudicator failed - retrying...")],
-                "next": "adjudicator"
-            }
+            print(f"❌ Adjudicator deferred: {str(e)}")
+            return _deferred("adjudicator", "Adjudicator", e)
     
     return adjudicator_node
 
 
-def create_supervisor_node(model):
-    """Supervisor - LLM-powered orchestrator of the multi-agent system"""
+# Routing target that fans out to investigator and context_gatherer at once
+FAN_OUT = "investigate_parallel"
+
+
+def _progress_route(mode, agent_status, resolution, parallel=False):
+    """The routing table: next step implied by what has been done so far"""
+    if mode == "conversation":
+        return "conversational", "Conversation mode"
+    investigated = "investigator" in agent_status
+    has_context = "context_gatherer" in agent_status
+    if parallel and not investigated and not has_context:
+        return FAN_OUT, "Investigation and context needed (parallel)"
+    if not investigated:
+        return "investigator", "Investigation needed"
+    if not has_context:
+        return "context_gatherer", "Context needed"
+    if not resolution:
+        return "adjudicator", "Adjudication needed"
+    return "FINISH", "Complete"
+
+
+def route_by_rules(state, parallel=False):
+    """
+    Deterministic routing for the states the routing table fully covers.
+    Returns (next_agent, reasoning), or None when the state is ambiguous
+    (unknown mode, malformed resolution) and the LLM should decide. Deferred
+    agents never get here: the supervisor closes those runs first.
+    """
+    mode = state.get("mode", "resolve")
+    agent_status = state.get("agent_status", {})
+    resolution = state.get("resolution", {})
+    
+    if mode not in ("resolve", "conversation"):
+        return None
+    if resolution and resolution.get("action") not in ACTIONS:
+        return None
+    return _progress_route(mode, agent_status, resolution, parallel)
+
+
+def create_supervisor_node(model, parallel=False):
+    """Supervisor - rule-first orchestrator, LLM for ambiguous states"""
     
     supervisor_prompt = """You are the SUPERVISOR of AARS (Agentic Alert Resolution System).
 You are the orchestrating brain that controls a team of specialized agents.
@@ -246,16 +316,42 @@ Valid values: investigator, context_gatherer, adjudicator, conversational, FINIS
 
     def supervisor_node(state: AgentState) -> AgentState:
         print("\n" + "="*80)
-        print("🧠 SUPERVISOR (LLM Brain) Activated")
+        print("🧠 SUPERVISOR Activated")
         print("="*80)
         
         mode = state.get("mode", "resolve")
         findings = state.get("findings", [])
+        agent_status = state.get("agent_status", {})
         resolution = state.get("resolution", {})
         alert_data = state.get("alert_data", {})
         user_query = state.get("user_query", "")
+        started = time.perf_counter()
         
-        findings_summary = "\n".join(findings) if findings else "No findings yet"
+        def decided(next_agent, reasoning, path):
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+            print(f"{'⚡ Rule' if path == 'rules' else '🧠 LLM'} Decision: {next_agent} ({elapsed_ms} ms)")
+            print(f"💭 Reasoning: {reasoning}")
+            return {
+                "next": next_agent,
+                "messages": [AIMessage(content=f"Supervisor: {reasoning}. Routing to {next_agent}")],
+                "routing_trace": [{"path": path, "next": next_agent, "reasoning": reasoning, "elapsed_ms": elapsed_ms}]
+            }
+        
+        deferred = [agent for agent, status in agent_status.items() if status == "deferred"]
+        if mode == "resolve" and deferred and not resolution:
+            # An agent gave up after its retries: close the run instead of routing around it
+            reasons = [f["summary"] for f in findings if f["status"] == "deferred"]
+            update = decided("aem_executor", f"Deferred - {', '.join(deferred)} could not complete", path="rules")
+            update["resolution"] = deferred_resolution(deferred, reasons)
+            return update
+        
+        if SUPERVISOR_ROUTING == "rules":
+            routed = route_by_rules(state, parallel)
+            if routed:
+                return decided(*routed, path="rules")
+        
+        # Status and key metrics only; the prose reports are for the adjudicator
+        findings_summary = render_findings(findings, detail=False)
         
         decision_prompt = f"""
 CURRENT STATE:
@@ -290,36 +386,18 @@ Decide which agent should work next. Respond with JSON only."""
                 else:
                     raise ValueError("No JSON found")
             except (json.JSONDecodeError, ValueError):
-                if mode == "conversation":
-                    next_agent = "conversational"
-                    reasoning = "Fallback: Conversation mode"
-                elif not any("Investigator" in f for f in findings):
-                    next_agent = "investigator"
-                    reasoning = "Fallback: Investigation needed"
-                elif not any("Context Gatherer" in f for f in findings):
-                    next_agent = "context_gatherer"
-                    reasoning = "Fallback: Context needed"
-                elif not resolution:
-                    next_agent = "adjudicator"
-                    reasoning = "Fallback: Adjudication needed"
-                else:
-                    next_agent = "FINISH"
-                    reasoning = "Fallback: Complete"
-            
-            print(f"🧠 LLM Decision: {next_agent}")
-            print(f"💭 Reasoning: {reasoning}")
+                next_agent, reasoning = _progress_route(mode, agent_status, resolution, parallel)
+                return decided(next_agent, f"Fallback: {reasoning}", path="fallback")
             
-            return {
-                "next": next_agent,
-                "messages": [AIMessage(content=f"Supervisor: {reasoning}. Routing to {next_agent}")]
-            }
+            return decided(next_agent, reasoning, path="llm")
             
         except Exception as e:
             print(f"❌ Supervisor error: {str(e)}")
             next_agent = "conversational" if mode == "conversation" else "investigator"
             return {
                 "next": next_agent,
-                "messages": [AIMessage(content=f"Supervisor fallback to {next_agent}")]
+                "messages": [AIMessage(content=f"Supervisor fallback to {next_agent}")],
+                "routing_trace": [{"path": "error", "next": next_agent, "reasoning": str(e), "elapsed_ms": None}]
             }
     
     return supervisor_node
@@ -348,6 +426,8 @@ def create_aem_executor_node():
             print(f"\nAction: SAR filed. Case {alert_data['alert_id']} routed to Human Queue")
         elif action == "FalsePositive":
             print(f"\nAction: Alert {alert_data['alert_id']} closed as False Positive")
+        elif action == DEFERRED:
+            print(f"\n⏸️  Alert {alert_data['alert_id']} deferred - returned to the queue for a later run")
         elif action == "BLOCK_ACCOUNT":
             print(f"\n🚫 ACCOUNT BLOCKED!")
             print(f"   ✓ Account {alert_data['subject_id']} FROZEN")
@@ -361,6 +441,7 @@ def create_aem_executor_node():
         
         return {
             "next": "END",
+            "resolution": resolution,  # echoed so a resumed run that starts here still reports it
             "messages": [AIMessage(content=f"AEM executed: {action}")]
         }
     
@@ -422,7 +503,10 @@ CUSTOMER:
         history_text = "(No previous messages)"
         if conversation_history:
             formatted = []
-            for msg in conversation_history[-6:]:
+            summary = conversation_history[0] if conversation_history[0].get("role") == "summary" else None
+            if summary:
+                formatted.append(f"(Summary of {summary['turns']} earlier turns)\n{summary['content']}\n")
+            for msg in conversation_history[1 if summary else 0:][-6:]:
                 role = "User" if msg.get("role") == "user" else "Assistant"
                 content = msg.get("content", "")[:200]
                 formatted.append(f"{role}: {content}...")
@@ -3,29 +3,20 @@
 import streamlit as st
 from datetime import datetime
 import time
-import json
 import os
-from workflow import create_aars_workflow, run_conversation, run_alert_resolution
+from workflow import get_workflow, reset_workflows, stream_conversation, run_alert_resolution, find_interrupted_resolutions
 from database.seed_data import TEST_ALERTS, MOCK_CUSTOMER_DB
-from config import SCENARIOS, OPENAI_API_KEY
+from config import SCENARIOS, OPENAI_API_KEY, LLM_BACKEND, LLM_CACHE_PATH
+from resilience import DEFERRED
+from database.connection import migrate_db
+from resolution_store import record_resolution, resolved_alert_ids, latest_resolution, clear_resolutions, import_legacy_histories
 
-def load_workflow_histories():
-    """Load workflow histories from file"""
-    history_file = "checkpoints/workflow_histories.json"
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_workflow_histories(histories):
-    """Save workflow histories to file"""
-    history_file = "checkpoints/workflow_histories.json"
-    os.makedirs(os.path.dirname(history_file), exist_ok=True)
-    with open(history_file, 'w') as f:
-        json.dump(histories, f, indent=2)
+def load_workflow_history(alert_id):
+    """Step history of the alert's latest resolution, loaded when the alert is shown"""
+    if alert_id not in st.session_state.alert_workflow_histories:
+        resolution = latest_resolution(alert_id)
+        st.session_state.alert_workflow_histories[alert_id] = resolution["step_history"] if resolution else []
+    return st.session_state.alert_workflow_histories[alert_id]
 
 def load_conversation_from_checkpoint(app, alert_id):
     """Load conversation history from LangGraph checkpoint"""
@@ -39,6 +30,51 @@ def load_conversation_from_checkpoint(app, alert_id):
         print(f"Could not load conversation from checkpoint: {e}")
     return []
 
+@st.cache_resource
+def prepare_database():
+    """Apply pending schema migrations, build a missing feature store and move legacy JSON histories into the database, once per process"""
+    from features import ensure_customer_features
+    
+    applied = migrate_db()
+    ensure_customer_features()
+    import_legacy_histories()
+    return applied
+
+@st.cache_resource(show_spinner="Building workflow...")
+def load_workflow():
+    """Compiled workflow shared by all sessions of this process"""
+    return get_workflow()
+
+
+def scan_interrupted_alerts():
+    """Alerts whose last resolve run stopped mid-way: alert_id -> checkpoint thread summary"""
+    if os.getenv("USE_CHECKPOINTS", "true").lower() != "true":
+        return {}
+    try:
+        return {t["alert_data"]["alert_id"]: t for t in find_interrupted_resolutions()}
+    except Exception as e:
+        print(f"Could not scan checkpoints for interrupted runs: {e}")
+        return {}
+
+
+def drop_workflow():
+    """Forget the shared workflow, e.g. after its checkpoint file was deleted"""
+    load_workflow.clear()
+    reset_workflows()
+
+
+def remove_checkpoint_files(pattern):
+    """Delete checkpoint files matching pattern, keeping the LLM cache whose connection stays open"""
+    import glob
+    cache_files = {os.path.abspath(LLM_CACHE_PATH) + suffix for suffix in ("", "-wal", "-shm", "-journal")}
+    for f in glob.glob(pattern):
+        if os.path.abspath(f) in cache_files:
+            continue
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
 # Page configuration
 st.set_page_config(
     page_title="AARS - Alert Resolution System",
@@ -271,6 +307,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+prepare_database()
+
 # Session State Initialization
 if 'workflow_app' not in st.session_state:
     st.session_state.workflow_app = None
@@ -281,14 +319,16 @@ if 'processing' not in st.session_state:
 if 'alert_conversations' not in st.session_state:
     st.session_state.alert_conversations = {}
 if 'alert_workflow_histories' not in st.session_state:
-    st.session_state.alert_workflow_histories = load_workflow_histories()
+    st.session_state.alert_workflow_histories = {}  # alert_id -> step history, filled lazily
 if 'solving_alert' not in st.session_state:
     st.session_state.solving_alert = None
 if 'resolved_alerts' not in st.session_state:
-    st.session_state.resolved_alerts = set(st.session_state.alert_workflow_histories.keys())
+    st.session_state.resolved_alerts = resolved_alert_ids()
 if 'pending_alerts' not in st.session_state:
     all_alerts = {alert['alert_id'] for alert in TEST_ALERTS}
     st.session_state.pending_alerts = all_alerts - st.session_state.resolved_alerts
+if 'interrupted_alerts' not in st.session_state:
+    st.session_state.interrupted_alerts = scan_interrupted_alerts()
 
 # Sidebar
 with st.sidebar:
@@ -334,7 +374,7 @@ with st.sidebar:
     for alert in TEST_ALERTS:
         alert_id = alert['alert_id']
         is_resolved = alert_id in st.session_state.resolved_alerts
-        status_badge = "✅" if is_resolved else "⏳"
+        status_badge = "✅" if is_resolved else "↻" if alert_id in st.session_state.interrupted_alerts else "⏳"
         
         msg_count = len(st.session_state.alert_conversations.get(alert_id, []))
         badge_text = f"{status_badge} {alert['scenario_code']}"
@@ -360,7 +400,9 @@ with st.sidebar:
     else:
         st.info("⚪ Standby Mode")
     
-    if OPENAI_API_KEY:
+    if LLM_BACKEND == "stub":
+        st.warning("🧪 Offline Stub LLM")
+    elif OPENAI_API_KEY:
         st.success("🟢 API Connected")
     else:
         st.error("🔴 API Not Configured")
@@ -387,13 +429,10 @@ with st.sidebar:
         st.session_state.alert_workflow_histories = {}
         st.session_state.solving_alert = None
         st.session_state.workflow_app = None
-        save_workflow_histories({})
-        import glob
-        for f in glob.glob("checkpoints/*.db*"):
-            try:
-                os.remove(f)
-            except:
-                pass
+        st.session_state.interrupted_alerts = {}
+        clear_resolutions()
+        drop_workflow()
+        remove_checkpoint_files("checkpoints/*.db*")
         st.rerun()
     
     if st.button("🗑️ Clear Chat", use_container_width=True):
@@ -401,39 +440,36 @@ with st.sidebar:
             current_id = st.session_state.current_alert['alert_id']
             if current_id in st.session_state.alert_conversations:
                 del st.session_state.alert_conversations[current_id]
-            if current_id in st.session_state.alert_workflow_histories:
-                del st.session_state.alert_workflow_histories[current_id]
+            if current_id in st.session_state.resolved_alerts:
+                st.session_state.alert_workflow_histories.pop(current_id, None)
                 st.session_state.resolved_alerts.discard(current_id)
                 st.session_state.pending_alerts.add(current_id)
+                clear_resolutions(current_id)
             st.session_state.solving_alert = None
             st.session_state.workflow_app = None
-            save_workflow_histories(st.session_state.alert_workflow_histories)
         st.rerun()
     
     if st.button("🧹 Clear Checkpoints", use_container_width=True):
-        import glob
         checkpoint_dir = "checkpoints"
         if os.path.exists(checkpoint_dir):
-            for f in glob.glob(os.path.join(checkpoint_dir, "*")):
-                try:
-                    os.remove(f)
-                except:
-                    pass
+            drop_workflow()
+            remove_checkpoint_files(os.path.join(checkpoint_dir, "*"))
             st.session_state.workflow_app = None
             st.session_state.alert_conversations = {}
             st.session_state.alert_workflow_histories = {}
             st.session_state.resolved_alerts = set()
+            st.session_state.interrupted_alerts = {}
+            clear_resolutions()
             st.success("✅ All checkpoints & conversations cleared!")
             st.rerun()
     
     if st.session_state.current_alert:
         current_id = st.session_state.current_alert['alert_id']
-        if current_id in st.session_state.alert_workflow_histories:
+        workflow_history = load_workflow_history(current_id) if current_id in st.session_state.resolved_alerts else []
+        if workflow_history:
             st.markdown("---")
             st.markdown('<h3 style="color: white !important;">📋 Investigation Details</h3>', unsafe_allow_html=True)
             
-            workflow_history = st.session_state.alert_workflow_histories[current_id]
-            
             for message in workflow_history:
                 if message["role"] == "resolution":
                     resolution_data = message.get("data", {})
@@ -483,23 +519,35 @@ with st.sidebar:
                     
                     st.markdown("---")
 
-def get_ai_response(user_message, alert_data):
-    """Get conversational AI response through Supervisor workflow"""
-    try:
-        if st.session_state.workflow_app is None:
-            st.session_state.workflow_app = create_aars_workflow()
-        
-        response, conversation_history = run_conversation(
+def stream_ai_response(user_message, alert_data):
+    """Stream the conversational answer into the chat panel as it is generated"""
+    alert_id = alert_data['alert_id']
+    result = {}
+    
+    def tokens():
+        for kind, payload in stream_conversation(
             app=st.session_state.workflow_app,
             alert_data=alert_data,
             user_query=user_message,
-            thread_id=alert_data['alert_id']
-        )
+            thread_id=alert_id
+        ):
+            if kind == "token":
+                yield payload
+            else:
+                result.update(payload)
+    
+    try:
+        if st.session_state.workflow_app is None:
+            st.session_state.workflow_app = load_workflow()
         
-        alert_id = alert_data['alert_id']
-        st.session_state.alert_conversations[alert_id] = conversation_history
+        with st.chat_message("assistant", avatar="🤖"):
+            streamed = st.write_stream(tokens())
+            if not streamed:
+                # Nothing streamed (e.g. a cached or error answer): show the final response
+                st.markdown(result.get("response", ""))
         
-        return response
+        st.session_state.alert_conversations[alert_id] = result.get("conversation_history", [])
+        return result.get("response")
     except Exception as e:
         return f"I apologize, but I encountered an error: {str(e)}. Please try again or contact support."
 
@@ -539,24 +587,30 @@ if st.session_state.current_alert:
     
     # Solve button for automated investigation
     if not is_resolved and st.session_state.solving_alert != alert_id:
+        interrupted = st.session_state.interrupted_alerts.get(alert_id)
         col1, col2 = st.columns([1, 3])
         with col1:
-            if st.button("🚀 Solve This Alert", type="primary", use_container_width=True):
-                if not OPENAI_API_KEY:
+            label = "↻ Resume Investigation" if interrupted else "🚀 Solve This Alert"
+            if st.button(label, type="primary", use_container_width=True):
+                if not OPENAI_API_KEY and LLM_BACKEND != "stub":
                     st.error("⚠️ OpenAI API Key not configured!")
                 else:
                     st.session_state.solving_alert = alert_id
                     st.session_state.processing = True
                     st.rerun()
         with col2:
-            st.info("💬 Or ask me questions about this alert below!")
+            if interrupted:
+                st.info(f"💾 An earlier run stopped before **{(interrupted['next'] or 'start').upper()}** finished. "
+                        "Resuming continues from its last checkpoint; completed agents are not run again.")
+            else:
+                st.info("💬 Or ask me questions about this alert below!")
     
     # Show conversation for this alert
     st.markdown('<h3 style="color: #1a1a1a !important;">💬 Conversation</h3>', unsafe_allow_html=True)
     
     if alert_id not in st.session_state.alert_conversations:
         if st.session_state.workflow_app is None:
-            st.session_state.workflow_app = create_aars_workflow()
+            st.session_state.workflow_app = load_workflow()
         
         checkpoint_history = load_conversation_from_checkpoint(
             st.session_state.workflow_app, 
@@ -576,7 +630,10 @@ if st.session_state.current_alert:
         """, unsafe_allow_html=True)
     else:
         for msg in conversation:
-            if msg["role"] == "user":
+            if msg["role"] == "summary":
+                with st.expander(f"🗂️ {msg['turns']} earlier turns (summarized)"):
+                    st.text(msg["content"])
+            elif msg["role"] == "user":
                 st.markdown(f"""
                 <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
                      color: white; padding: 1rem; border-radius: 12px; margin: 0.5rem 0; 
@@ -599,8 +656,14 @@ if st.session_state.current_alert:
     user_input = st.chat_input("Ask me anything about this alert...", key=f"chat_input_{alert_id}")
     
     if user_input:
-        with st.spinner("🤔 Thinking..."):
-            ai_response = get_ai_response(user_input, alert)
+        st.markdown(f"""
+        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+             color: white; padding: 1rem; border-radius: 12px; margin: 0.5rem 0; 
+             margin-left: 20%; box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);">
+            <strong>You:</strong> {user_input}
+        </div>
+        """, unsafe_allow_html=True)
+        ai_response = stream_ai_response(user_input, alert)
         st.rerun()
 
 else:
@@ -614,12 +677,13 @@ if st.session_state.processing:
     with st.spinner("🤖 AI Agents are investigating..."):
         try:
             if st.session_state.workflow_app is None:
-                st.session_state.workflow_app = create_aars_workflow()
+                st.session_state.workflow_app = load_workflow()
             
             alert = st.session_state.current_alert
             alert_id = alert['alert_id']
             
             workflow_history = []
+            findings = []
             resolution = None
             
             st.session_state.alert_conversations[alert_id].append({
@@ -629,6 +693,10 @@ if st.session_state.processing:
             
             for result in run_alert_resolution(st.session_state.workflow_app, alert):
                 node = result["node"]
+                st.session_state.interrupted_alerts[alert_id] = {"thread_id": result["thread_id"], "next": result["next"]}
+                findings.extend(result.get("findings") or [])
+                if node == "aem_executor":
+                    resolution = result["resolution"] or resolution
                 
                 if node == "error":
                     st.error("⚠️ Max iterations reached. Workflow may be stuck in retry loop.")
@@ -639,12 +707,14 @@ if st.session_state.processing:
                         "role": "supervisor",
                         "content": f"Routing to: **{result['next'].upper()}**"
                     })
+                    if result["resolution"]:  # deferred run closed by the supervisor
+                        resolution = result["resolution"]
                 
                 elif node == "investigator":
                     if result["has_error"]:
-                        workflow_history.append({"role": "system", "content": "⚠️ Investigator error. Retrying..."})
+                        workflow_history.append({"role": "system", "content": "⚠️ Investigator unavailable after retries - alert deferred"})
                     else:
-                        findings_text = "\n".join([f.replace("[Investigator] ", "") for f in result["findings"] if "Investigator" in f])
+                        findings_text = "\n".join(f["summary"] for f in result["findings"] if f["agent"] == "investigator")
                         workflow_history.append({
                             "role": "investigator",
                             "content": f"""**Database Investigation Complete**
@@ -662,9 +732,9 @@ if st.session_state.processing:
                 
                 elif node == "context_gatherer":
                     if result["has_error"]:
-                        workflow_history.append({"role": "system", "content": "⚠️ Context Gatherer error. Retrying..."})
+                        workflow_history.append({"role": "system", "content": "⚠️ Context Gatherer unavailable after retries - alert deferred"})
                     else:
-                        findings_text = "\n".join([f.replace("[Context Gatherer] ", "") for f in result["findings"] if "Context Gatherer" in f])
+                        findings_text = "\n".join(f["summary"] for f in result["findings"] if f["agent"] == "context_gatherer")
                         workflow_history.append({
                             "role": "context_gatherer",
                             "content": f"""**Context Gathering Complete**
@@ -682,7 +752,7 @@ if st.session_state.processing:
                 
                 elif node == "adjudicator":
                     if result["has_error"]:
-                        workflow_history.append({"role": "system", "content": "⚠️ Adjudicator error. Retrying..."})
+                        workflow_history.append({"role": "system", "content": "⚠️ Adjudicator unavailable after retries - alert deferred"})
                     elif result["resolution"]:
                         resolution = result["resolution"]
                         workflow_history.append({
@@ -696,6 +766,15 @@ if st.session_state.processing:
 **Status:** ✅ Decision made"""
                         })
                 
+                elif node == "aem_executor" and resolution and resolution['action'] == DEFERRED:
+                    workflow_history.append({"role": "system", "content": f"⏸️ {resolution['rationale']}"})
+                    record_resolution(alert, resolution, workflow_history, findings, result["thread_id"])
+                    st.session_state.interrupted_alerts.pop(alert_id, None)
+                    st.session_state.alert_conversations[alert_id].append({
+                        "role": "assistant",
+                        "content": f"⏸️ Investigation deferred - an upstream service is unavailable. The alert stays pending; try again shortly.\n\n{resolution['rationale']}"
+                    })
+                
                 elif node == "aem_executor" and resolution:
                     action = resolution['action']
                     action_messages = {
@@ -717,12 +796,13 @@ if st.session_state.processing:
                     
                     st.session_state.resolved_alerts.add(alert_id)
                     st.session_state.pending_alerts.discard(alert_id)
+                    st.session_state.interrupted_alerts.pop(alert_id, None)
                     st.session_state.alert_workflow_histories[alert_id] = workflow_history
+                    record_resolution(alert, resolution, workflow_history, findings, result["thread_id"])
                     st.session_state.alert_conversations[alert_id].append({
                         "role": "assistant",
                         "content": f"✅ Investigation complete! **Decision: {action}**\n\nSee investigation details in the sidebar."
                     })
-                    save_workflow_histories(st.session_state.alert_workflow_histories)
             
             st.session_state.processing = False
             st.session_state.solving_alert = None
@@ -0,0 +1,238 @@
+"""
+Batch alert resolution - many alerts through one compiled workflow
+
+Alerts run on a bounded worker pool and results are yielded as they finish.
+A failing alert is reported and does not affect the others; an alert whose
+agents exhaust their retries, or meet an open circuit, comes back "deferred".
+The global LLM request rate is enforced by the rate limiter on the workflow's
+shared chat model (LLM_REQUESTS_PER_MINUTE).
+
+Usage: python batch.py --workers 8 --rpm 500 --limit 1000 --output results.jsonl
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from database.connection import get_db_session, migrate_db
+from database.models import Alert, Customer
+from workflow import create_aars_workflow, run_alert_resolution, build_rate_limiter, find_interrupted_resolutions
+from resilience import DEFERRED, upstream_circuit
+from resolution_store import record_resolution
+from features import ensure_customer_features
+from config import BATCH_WORKERS, LLM_REQUESTS_PER_MINUTE
+
+
+def _step(update):
+    """One step_history entry, in the shape the UI timeline shows"""
+    node = update["node"]
+    if node == "supervisor":
+        return {"role": node, "content": f"Routing to: **{update['next'].upper()}**"}
+    if node == "aem_executor":
+        return {"role": node, "content": f"Action executed: {update['resolution']['action']}"}
+    return {"role": node, "content": "\n".join(f["summary"] for f in update["findings"])}
+
+
+def resolve_one(app, alert_data, max_iterations=50, callbacks=None, record=True):
+    """
+    Run one alert to completion, resuming its interrupted attempt if any;
+    never raises. With record=True the outcome is appended to alert_resolutions.
+    """
+    started = time.perf_counter()
+    thread_id = None
+    resolution = None
+    steps = 0
+    error = None
+    step_history = []
+    findings = []
+    
+    try:
+        for update in run_alert_resolution(app, alert_data, max_iterations=max_iterations, callbacks=callbacks):
+            steps += 1
+            thread_id = update["thread_id"]
+            if update["node"] == "error":
+                error = update["error"]
+                break
+            if update.get("resolution"):
+                resolution = update["resolution"]
+            step_history.append(_step(update))
+            findings.extend(update["findings"])
+        if record and resolution and not error:
+            step_history.append({"role": "resolution", "content": f"Alert {alert_data['alert_id']} processed", "data": resolution})
+            record_resolution(alert_data, resolution, step_history, findings, thread_id)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    
+    if error:
+        status = "failed"
+    elif resolution and resolution.get("action") == DEFERRED:
+        status = "deferred"  # upstream unavailable; left for a later run
+    else:
+        status = "resolved" if resolution else "incomplete"
+    
+    return {
+        "alert_id": alert_data["alert_id"],
+        "status": status,
+        "action": resolution.get("action") if resolution else None,
+        "resolution": resolution,
+        "error": error,
+        "steps": steps,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "thread_id": thread_id
+    }
+
+
+def resolve_alerts(app, alerts, workers=BATCH_WORKERS, max_iterations=50, callbacks=None, record=True):
+    """
+    Resolve an iterable of alerts on a thread pool, yielding each result as it
+    completes. At most 2 x workers alerts are pulled from the iterable ahead of
+    completion, so large or lazy sources are not materialized.
+    """
+    alerts = iter(alerts)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aars-batch") as pool:
+        pending = {pool.submit(resolve_one, app, a, max_iterations, callbacks, record) for a in islice(alerts, workers * 2)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for alert_data in islice(alerts, 1):
+                        pending.add(pool.submit(resolve_one, app, alert_data, max_iterations, callbacks, record))
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def aresolve_alerts(app, alerts, workers=BATCH_WORKERS, max_iterations=50, callbacks=None, record=True):
+    """
+    asyncio variant of resolve_alerts for callers already on an event loop.
+    The graph itself runs on a pool of `workers` threads (its SQLite
+    checkpointer is sync); as in resolve_alerts, at most 2 x workers alerts
+    are pulled from the iterable ahead of completion.
+    """
+    loop = asyncio.get_running_loop()
+    alerts = iter(alerts)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aars-batch")
+    
+    def submit(alert_data):
+        return loop.run_in_executor(pool, resolve_one, app, alert_data, max_iterations, callbacks, record)
+    
+    pending = {submit(a) for a in islice(alerts, workers * 2)}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                for alert_data in islice(alerts, 1):
+                    pending.add(submit(alert_data))
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        # Do not block the event loop on alerts still running after an early exit
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def prepare_database():
+    """Bring the database up to the current schema and feature store before any tool runs"""
+    migrate_db()
+    ensure_customer_features()
+
+
+def load_pending_alerts(limit=None):
+    """PENDING alerts from the database in the alert_data shape the workflow expects"""
+    with get_db_session() as db:
+        query = db.query(Alert, Customer.name).outerjoin(
+            Customer, Customer.id == Alert.customer_id
+        ).filter(Alert.status == "PENDING").order_by(Alert.created_at)
+        if limit:
+            query = query.limit(limit)
+        
+        return [
+            {
+                "alert_id": alert.id,
+                "scenario_code": alert.scenario_code,
+                "scenario_name": alert.scenario_name,
+                "subject_id": alert.customer_id,
+                "customer_name": customer_name,
+                "trigger_details": alert.trigger_details,
+            }
+            for alert, customer_name in query.all()
+        ]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--rpm", type=int, default=LLM_REQUESTS_PER_MINUTE, help="global LLM requests/minute (0 = no limit)")
+    parser.add_argument("--limit", type=int, help="max alerts to process")
+    parser.add_argument("--backend", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--output", help="write one JSON result per line to this file")
+    parser.add_argument("--no-resume", action="store_true", help="do not re-enqueue interrupted runs found at startup")
+    parser.add_argument("--verbose", action="store_true", help="show agent output")
+    args = parser.parse_args()
+    
+    prepare_database()
+    app = create_aars_workflow(rate_limiter=build_rate_limiter(args.rpm))
+    alerts = load_pending_alerts(args.limit)
+    if app.checkpointer is not None and not args.no_resume:
+        # Interrupted runs go first and continue from their last checkpoint
+        interrupted = [t["alert_data"] for t in find_interrupted_resolutions()]
+        resumed_ids = {a["alert_id"] for a in interrupted}
+        alerts = interrupted + [a for a in alerts if a["alert_id"] not in resumed_ids]
+        if interrupted:
+            print(f"↻ Resuming {len(interrupted)} interrupted resolutions from their checkpoints", file=sys.stderr)
+    print(f"Resolving {len(alerts)} alerts with {args.workers} workers ({args.backend}), rpm limit: {args.rpm or 'none'}",
+          file=sys.stderr)
+    
+    results = []
+    started = time.perf_counter()
+    output = open(args.output, "w") if args.output else None
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    
+    def report(result):
+        results.append(result)
+        print(f"  [{len(results)}/{len(alerts)}] {result['alert_id']}: {result['status']} "
+              f"{result['action'] or result['error'] or ''} ({result['elapsed_seconds']}s)", file=sys.stderr)
+        if output:
+            output.write(json.dumps(result) + "\n")
+    
+    with quiet:
+        if args.backend == "asyncio":
+            async def consume():
+                async for result in aresolve_alerts(app, alerts, args.workers):
+                    report(result)
+            asyncio.run(consume())
+        else:
+            for result in resolve_alerts(app, alerts, args.workers):
+                report(result)
+    
+    if output:
+        output.close()
+    
+    elapsed = time.perf_counter() - started
+    if results:
+        latencies = [r["elapsed_seconds"] for r in results]
+        failed = sum(r["status"] not in ("resolved", "deferred") for r in results)
+        deferred = sum(r["status"] == "deferred" for r in results)
+        print(f"\n✓ {len(results)} alerts in {elapsed:.1f}s ({len(results) / elapsed:.2f} alerts/s), "
+              f"{deferred} deferred, {failed} not resolved, p50 {_percentile(latencies, 50)}s, p95 {_percentile(latencies, 95)}s",
+              file=sys.stderr)
+        by_rules = sum(bool(r["resolution"]) and r["resolution"].get("decided_by") == "sop_rules" for r in results)
+        print(f"  {by_rules}/{len(results)} decided by SOP rules without the LLM adjudicator "
+              f"({100 * by_rules / len(results):.0f}%)", file=sys.stderr)
+        if deferred:
+            print(f"  Upstream circuit: {upstream_circuit.stats()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
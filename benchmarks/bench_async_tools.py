@@ -0,0 +1,82 @@
+"""
+Async Tools Benchmark
+Runs the investigator's DB tools for many customers twice: sequentially with
+the sync tools, then concurrently on one event loop with their async variants,
+and compares wall time. Point DATABASE_URL at a populated database first
+(e.g. one loaded with `python -m database.seed_data --synthetic`).
+
+Usage: python benchmarks/bench_async_tools.py --customers 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select
+from batch import prepare_database
+from database.connection import get_db_session
+from database.models import Customer
+from tools import (
+    customer_snapshots,
+    db_query_history,
+    check_account_dormancy,
+    get_kyc_profile,
+    adb_query_history,
+    acheck_account_dormancy,
+    aget_kyc_profile,
+)
+
+
+def run_sync(customer_ids):
+    for customer_id in customer_ids:
+        db_query_history.invoke({"customer_id": customer_id, "lookback_days": 180})
+        check_account_dormancy.invoke({"customer_id": customer_id})
+        get_kyc_profile.invoke({"customer_id": customer_id})
+
+
+async def run_async(customer_ids, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    
+    async def investigate(customer_id):
+        async with limit:
+            await adb_query_history.ainvoke({"customer_id": customer_id, "lookback_days": 180})
+            await acheck_account_dormancy.ainvoke({"customer_id": customer_id})
+            await aget_kyc_profile.ainvoke({"customer_id": customer_id})
+    
+    await asyncio.gather(*(investigate(c) for c in customer_ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    
+    prepare_database()
+    with get_db_session() as db:
+        customer_ids = db.execute(select(Customer.id).limit(args.customers)).scalars().all()
+    print(f"Investigating {len(customer_ids)} customers (3 tools each)")
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        customer_snapshots.invalidate()
+        started = time.perf_counter()
+        run_sync(customer_ids)
+        sync_seconds = time.perf_counter() - started
+        
+        customer_snapshots.invalidate()
+        started = time.perf_counter()
+        asyncio.run(run_async(customer_ids, args.concurrency))
+        async_seconds = time.perf_counter() - started
+    
+    print(f"  sync, sequential      : {sync_seconds:8.2f}s")
+    print(f"  async, concurrency={args.concurrency:<3}: {async_seconds:8.2f}s  ({sync_seconds / async_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
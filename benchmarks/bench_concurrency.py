@@ -0,0 +1,175 @@
+"""
+Concurrency Benchmark
+Runs reader and writer threads against the same SQLite file twice: once with
+the old engine settings (rollback journal, default pooling) and once with
+build_engine() (WAL + pragmas + pool sizing), and compares throughput.
+Each engine also runs its writers alone, and the CPU the process used is
+reported: when the mixed run keeps every core busy, write throughput is
+capped by the CPU the readers take, not by SQLite locking. The write p99
+shows whether writers still wait behind readers.
+
+Usage: python benchmarks/bench_concurrency.py --readers 8 --writers 2 --seconds 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, text
+from database.models import Base
+from database.connection import build_engine
+
+READ_SQL = text(
+    "SELECT COUNT(*), MAX(amount), AVG(amount) FROM transactions "
+    "WHERE customer_id = :customer_id AND date >= :since"
+)
+WRITE_SQL = text(
+    "INSERT INTO transactions (id, customer_id, amount, type, date) "
+    "VALUES (:id, :customer_id, :amount, 'credit', :date)"
+)
+
+
+def legacy_engine(url):
+    """Engine configured the way database/connection.py used to be"""
+    return create_engine(url, connect_args={"check_same_thread": False}, echo=False)
+
+
+def seed(engine, rows, customers):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO customers (id, name) VALUES (:id, :name)"),
+            [{"id": f"CUST-{i}", "name": f"Customer {i}"} for i in range(customers)]
+        )
+        conn.execute(WRITE_SQL, [
+            {
+                "id": f"SEED-{i}",
+                "customer_id": f"CUST-{rng.randrange(customers)}",
+                "amount": rng.uniform(10, 20000),
+                "date": start + timedelta(minutes=rng.randrange(500_000)),
+            }
+            for i in range(rows)
+        ])
+
+
+def run_load(engine, readers, writers, seconds, customers, batch, id_prefix="W"):
+    """Hammer the engine and return per-operation latencies and error counts"""
+    stop = threading.Event()
+    read_latencies, write_latencies = [], []
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    
+    def reader(seed_value):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(READ_SQL, {
+                        "customer_id": f"CUST-{rng.randrange(customers)}",
+                        "since": "2024-03-01",
+                    }).fetchall()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    read_latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors["read"] += 1
+    
+    def writer(seed_value):
+        rng = random.Random(seed_value)
+        counter = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(WRITE_SQL, [
+                        {
+                            "id": f"{id_prefix}{seed_value}-{counter}-{i}",
+                            "customer_id": f"CUST-{rng.randrange(customers)}",
+                            "amount": rng.uniform(10, 20000),
+                            "date": datetime(2024, 12, 1),
+                        }
+                        for i in range(batch)
+                    ])
+                counter += 1
+                elapsed = time.perf_counter() - started
+                with lock:
+                    write_latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors["write"] += 1
+    
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    
+    return read_latencies, write_latencies, errors
+
+
+def timed_load(engine, readers, writers, seconds, customers, batch, id_prefix):
+    """run_load plus the CPU cores the process kept busy on average"""
+    cpu_started = time.process_time()
+    result = run_load(engine, readers, writers, seconds, customers, batch, id_prefix)
+    return (*result, (time.process_time() - cpu_started) / seconds)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent reads and writes")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=200_000, help="seed transactions")
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--batch", type=int, default=200, help="rows per write transaction")
+    args = parser.parse_args()
+    
+    results = {}
+    for label, factory in (("legacy", legacy_engine), ("tuned", build_engine)):
+        db_path = os.path.join(tempfile.mkdtemp(), f"bench_{label}.db")
+        engine = factory(f"sqlite:///{db_path}")
+        seed(engine, args.rows, args.customers)
+        print(f"Running {label} engine: {args.writers} writers alone, then with {args.readers} readers, {args.seconds}s each")
+        results[(label, "writes only")] = timed_load(engine, 0, args.writers, args.seconds, args.customers, args.batch, "WO")
+        results[(label, "mixed")] = timed_load(engine, args.readers, args.writers, args.seconds, args.customers, args.batch, "WM")
+        engine.dispose()
+    
+    print("\n" + "="*102)
+    print(f"{'engine':<10}{'load':<13}{'reads/s':>9}{'read p50':>11}{'read p99':>11}"
+          f"{'writes/s':>11}{'write p99':>12}{'CPU cores':>11}{'errors (r/w)':>14}")
+    print("="*102)
+    for (label, load), (reads, writes, errors, cores) in results.items():
+        print(
+            f"{label:<10}{load:<13}{len(reads) / args.seconds:>9.0f}"
+            f"{percentile(reads, 50):>9.2f}ms{percentile(reads, 99):>9.2f}ms"
+            f"{len(writes) / args.seconds:>11.1f}{percentile(writes, 99):>10.2f}ms"
+            f"{cores:>11.2f}{errors['read']:>7}/{errors['write']}"
+        )
+    print("="*102)
+    print(f"({os.cpu_count()} CPU cores available)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Conversation Streaming Benchmark
+Time until the analyst sees the first words of an answer: the blocking
+run_conversation (whole graph, then the full answer) vs. stream_conversation
+(tokens as the Conversational Agent generates them). Uses the offline
+StubChatModel, so latency and generation speed are set on the command line.
+
+Usage: python benchmarks/bench_conversation.py --queries 10 --latency-ms 400 --token-ms 30
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from batch import prepare_database
+from database.seed_data import TEST_ALERTS
+from stub_llm import StubChatModel
+from workflow import create_aars_workflow, run_conversation, stream_conversation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--latency-ms", type=int, default=400, help="stub time before the first token")
+    parser.add_argument("--token-ms", type=int, default=30, help="stub time between streamed words")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepare_database()
+    os.environ["CHECKPOINT_DB"] = os.path.join(tempfile.mkdtemp(prefix="aars-bench-"), "checkpoints.db")
+    model = StubChatModel(latency_seconds=args.latency_ms / 1000, stream_delay_seconds=args.token_ms / 1000)
+    
+    blocking, first_token, streamed_total = [], [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_aars_workflow(model=model, checkpoints=True, cache_enabled=False, metrics=False)
+        for i in range(args.queries):
+            alert = TEST_ALERTS[i % len(TEST_ALERTS)]
+            
+            started = time.perf_counter()
+            run_conversation(app, alert, "Summarize the risk on this alert", thread_id=f"bench-block-{i}")
+            blocking.append(time.perf_counter() - started)
+            
+            started = time.perf_counter()
+            first = None
+            for kind, _ in stream_conversation(app, alert, "Summarize the risk on this alert", thread_id=f"bench-stream-{i}"):
+                if kind == "token" and first is None:
+                    first = time.perf_counter() - started
+            first_token.append(first)
+            streamed_total.append(time.perf_counter() - started)
+    
+    ms = lambda samples: statistics.median(samples) * 1000
+    print(f"{args.queries} queries, stub latency {args.latency_ms} ms, {args.token_ms} ms/word (median)")
+    print(f"  run_conversation, first words shown : {ms(blocking):8.1f} ms (full answer)")
+    print(f"  stream_conversation, first token    : {ms(first_token):8.1f} ms")
+    print(f"  stream_conversation, full answer    : {ms(streamed_total):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Conversation Growth Benchmark
+Checkpoint storage and state load time of one long conversation thread,
+with conversation_history compaction off (every turn kept) and on (the last
+CONVERSATION_KEEP_TURNS turns plus a rolling summary). Superseded checkpoints
+are trimmed after every turn either way, so the thread total tracks the size
+of its latest checkpoint. Uses the offline StubChatModel.
+
+Usage: python benchmarks/bench_conversation_growth.py --turns 200 --report-every 50
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import state
+from batch import prepare_database
+from checkpoint_manager import thread_summaries
+from database.seed_data import TEST_ALERTS
+from stub_llm import StubChatModel
+from workflow import create_aars_workflow, run_conversation
+
+
+def latest_checkpoint_bytes(db_path, thread_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT LENGTH(checkpoint) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def get_state_ms(app, thread_id, repeat=20):
+    config = {"configurable": {"thread_id": thread_id}}
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        app.get_state(config)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--report-every", type=int, default=50)
+    parser.add_argument("--keep-turns", type=int, default=state.CONVERSATION_KEEP_TURNS,
+                        help="turns kept verbatim when compaction is on")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepare_database()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="aars-bench-"), "checkpoints.db")
+    os.environ["CHECKPOINT_DB"] = db_path
+    alert = TEST_ALERTS[0]
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_aars_workflow(model=StubChatModel(), checkpoints=True, cache_enabled=False, metrics=False)
+    
+    print(f"{args.turns} turns on one conversation thread (stub LLM)")
+    print(f"{'mode':<22} {'turn':>6} {'history':>8} {'latest ckpt KB':>15} {'thread KB':>10} {'get_state ms':>13}")
+    for label, keep_turns in (("unbounded", 0), (f"compacted (keep {args.keep_turns})", args.keep_turns)):
+        state.CONVERSATION_KEEP_TURNS = keep_turns  # read by the reducer on every write
+        thread = f"growth-{keep_turns}"
+        for turn in range(1, args.turns + 1):
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, history = run_conversation(app, alert, f"Question {turn}: what explains the activity on this alert?",
+                                              thread_id=thread)
+            if turn % args.report_every == 0 or turn == args.turns:
+                thread_id = f"{thread}-conv"
+                thread_kb = next(t["bytes"] for t in thread_summaries(db_path) if t["thread_id"] == thread_id) / 1024
+                print(f"{label:<22} {turn:>6} {len(history):>8} "
+                      f"{latest_checkpoint_bytes(db_path, thread_id) / 1024:>15.1f} {thread_kb:>10.0f} "
+                      f"{get_state_ms(app, thread_id):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Index Benchmark
+Times the hot lookups against a generated table, first without the secondary
+indexes and then after migrate_db() has created them.
+
+Usage: python benchmarks/bench_indexes.py --rows 10000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, text
+from database.models import Base
+from database.connection import migrate_db
+
+QUERIES = {
+    "history by customer + window": (
+        "SELECT COUNT(*), MAX(amount) FROM transactions "
+        "WHERE customer_id = :customer_id AND date >= :since",
+    ),
+    "counterparty lookup": (
+        "SELECT id, amount FROM transactions WHERE counterparty = :counterparty",
+    ),
+    "pending alert queue": (
+        "SELECT id FROM alerts WHERE status = 'PENDING' AND priority = 'HIGH' "
+        "ORDER BY created_at LIMIT 50",
+    ),
+    "resolution by alert": (
+        "SELECT id, decision FROM alert_resolutions WHERE alert_id = :alert_id",
+    ),
+}
+
+
+def generate(engine, rows, customers, chunk_size=100_000):
+    """Bulk load synthetic customers, transactions, alerts and resolutions"""
+    rng = random.Random(42)
+    start_date = datetime(2023, 1, 1)
+    now = datetime.utcnow()
+    alert_count = max(rows // 100, 1)
+    
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO customers (id, name) VALUES (?, ?)",
+            ((f"CUST-{i}", f"Customer {i}") for i in range(customers))
+        )
+        
+        written = 0
+        while written < rows:
+            batch = min(chunk_size, rows - written)
+            cur.executemany(
+                "INSERT INTO transactions (id, customer_id, amount, type, date, counterparty) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        f"TXN-{written + i}",
+                        f"CUST-{rng.randrange(customers)}",
+                        round(rng.lognormvariate(7, 1.2), 2),
+                        rng.choice(("credit", "debit")),
+                        (start_date + timedelta(minutes=rng.randrange(1_000_000))).isoformat(" "),
+                        f"Counterparty {rng.randrange(rows // 10 + 1)}",
+                    )
+                    for i in range(batch)
+                )
+            )
+            raw.commit()
+            written += batch
+            print(f"  {written:,}/{rows:,} transactions", end="\r")
+        print()
+        
+        cur.executemany(
+            "INSERT INTO alerts (id, customer_id, scenario_code, status, priority, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    f"ALT-{i}",
+                    f"CUST-{rng.randrange(customers)}",
+                    rng.choice(("A-001", "A-002", "A-003", "A-004", "A-005")),
+                    rng.choice(("PENDING", "IN_PROGRESS", "RESOLVED", "CLOSED")),
+                    rng.choice(("LOW", "MEDIUM", "HIGH")),
+                    (now - timedelta(minutes=i)).isoformat(" "),
+                )
+                for i in range(alert_count)
+            )
+        )
+        cur.executemany(
+            "INSERT INTO alert_resolutions (alert_id, decision, rationale, confidence) "
+            "VALUES (?, 'RFI', 'benchmark', 0.5)",
+            ((f"ALT-{i}",) for i in range(0, alert_count, 2))
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    
+    return alert_count
+
+
+def time_queries(engine, params, repeat):
+    """Return the median wall time (ms) of each benchmark query"""
+    timings = {}
+    with engine.connect() as conn:
+        for label, (sql,) in QUERIES.items():
+            samples = []
+            for i in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params[i % len(params)]).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            timings[label] = samples[len(samples) // 2]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark secondary indexes")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="transactions to generate")
+    parser.add_argument("--customers", type=int, default=None, help="distinct customers (default rows/200)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query")
+    parser.add_argument("--db", default=None, help="database file (default: temp file)")
+    args = parser.parse_args()
+    
+    customers = args.customers or max(args.rows // 200, 1)
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    
+    # Start from the pre-index schema: tables only, no secondary indexes
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    
+    print(f"Generating {args.rows:,} transactions for {customers:,} customers in {db_path}")
+    started = time.perf_counter()
+    alert_count = generate(engine, args.rows, customers)
+    print(f"  loaded in {time.perf_counter() - started:.1f}s")
+    
+    rng = random.Random(7)
+    params = [
+        {
+            "customer_id": f"CUST-{rng.randrange(customers)}",
+            "since": "2024-06-01 00:00:00",
+            "counterparty": f"Counterparty {rng.randrange(args.rows // 10 + 1)}",
+            "alert_id": f"ALT-{rng.randrange(alert_count)}",
+        }
+        for _ in range(args.repeat)
+    ]
+    
+    before = time_queries(engine, params, args.repeat)
+    
+    started = time.perf_counter()
+    migrate_db(bind=engine)
+    print(f"  migration built indexes in {time.perf_counter() - started:.1f}s")
+    
+    after = time_queries(engine, params, args.repeat)
+    
+    print("\n" + "="*72)
+    print(f"{'query':<32}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>12}")
+    print("="*72)
+    for label in QUERIES:
+        speedup = before[label] / after[label] if after[label] else float("inf")
+        print(f"{label:<32}{before[label]:>14.2f}{after[label]:>14.3f}{speedup:>11.0f}x")
+    print("="*72)
+    
+    engine.dispose()
+    if not args.db:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
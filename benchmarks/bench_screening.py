@@ -0,0 +1,107 @@
+"""
+Sanctions Screening Benchmark
+Builds a SanctionsScreeningIndex over a generated watchlist and screens
+perturbed names (typos, token reordering, transliteration variants).
+
+Usage: python benchmarks/bench_screening.py --names 300000 --queries 2000
+"""
+
+import argparse
+import random
+import sys
+import time
+from itertools import accumulate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from screening import SanctionsScreeningIndex
+
+FIRST = ["Mohammed", "Ahmed", "Omar", "Ali", "Hassan", "Viktor", "Ivan", "Sergei", "Dmitri", "Yusuf",
+         "Abdul", "Ibrahim", "Khalid", "Tariq", "Nikolai", "Alexei", "Jamal", "Karim", "Rashid", "Samir"]
+LAST = ["Al-Hassan", "Petrov", "Ivanov", "Rahman", "Hussein", "Sokolov", "Haddad", "Nasser", "Kuznetsov",
+        "Mansour", "Farouk", "Volkov", "Saleh", "Morozov", "Aziz", "Khalil", "Popov", "Barakat", "Lebedev"]
+SYLLABLES = ["ka", "ri", "mo", "sa", "lu", "de", "vi", "an", "or", "el", "ba", "ti", "ne", "ro", "zu", "ha",
+             "mir", "tov", "sha", "lek", "din", "gor", "naz", "ul", "ef", "ya", "bek", "ko", "ser", "im"]
+VARIANTS = {"Mohammed": "Muhammad", "Yusuf": "Youssef", "Viktor": "Victor", "Sergei": "Sergey",
+            "Hussein": "Husayn", "Dmitri": "Dmitry", "Alexei": "Aleksey", "Khalid": "Khaled"}
+
+
+def build_vocabulary(rng, seed_names, size):
+    """Real seed names followed by coined ones; sampled with Zipf weights like real name lists"""
+    vocabulary = list(seed_names)
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        coined = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if coined not in seen:
+            seen.add(coined)
+            vocabulary.append(coined)
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    return vocabulary, cum_weights
+
+
+def name_generator(rng, first_count=5_000, last_count=50_000):
+    first, first_w = build_vocabulary(rng, FIRST, first_count)
+    last, last_w = build_vocabulary(rng, LAST, last_count)
+    
+    def random_name():
+        parts = rng.choices(first, cum_weights=first_w, k=rng.choice((1, 1, 2)))
+        parts += rng.choices(last, cum_weights=last_w)
+        return " ".join(parts)
+    return random_name
+
+
+def perturb(name, rng):
+    tokens = name.split()
+    kind = rng.choice(("typo", "reorder", "transliteration"))
+    if kind == "reorder":
+        rng.shuffle(tokens)
+    elif kind == "transliteration":
+        tokens = [VARIANTS.get(t, t) for t in tokens]
+    else:
+        i = rng.randrange(len(tokens))
+        word = tokens[i]
+        pos = rng.randrange(1, len(word)) if len(word) > 1 else 0
+        tokens[i] = word[:pos] + rng.choice("aeiouklmnrst") + word[pos + 1:]
+    return " ".join(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy sanctions screening")
+    parser.add_argument("--names", type=int, default=300_000, help="watchlist size")
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+    
+    rng = random.Random(3)
+    random_name = name_generator(rng)
+    names = list({random_name() for _ in range(args.names)})
+    entities = [
+        {"entity_id": f"SANC-{i}", "name": n, "program": "BENCH", "common_name": False}
+        for i, n in enumerate(names)
+    ]
+    
+    started = time.perf_counter()
+    index = SanctionsScreeningIndex(entities)
+    print(f"Indexed {len(index):,} names in {time.perf_counter() - started:.1f}s")
+    
+    targets = [rng.choice(names) for _ in range(args.queries)]
+    queries = [perturb(t, rng) for t in targets]
+    
+    latencies, hits = [], 0
+    for target, query in zip(targets, queries):
+        started = time.perf_counter()
+        candidates = index.search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if candidates and candidates[0]["name"] == target:
+            hits += 1
+    
+    latencies.sort()
+    print(f"Screened {args.queries:,} perturbed names")
+    print(f"  p50 {latencies[len(latencies) // 2]:.3f}ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.3f}ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.3f}ms")
+    print(f"  top-1 recall {hits / args.queries:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Startup Benchmark
+Measures what a new process and a new UI session pay before the first alert:
+- cold import of `workflow` in a fresh interpreter (lazy), next to importing
+  the agents, LangChain and LangGraph up front as the module used to
+- cold start to a compiled workflow (import + first build)
+- per-session setup: create_aars_workflow() per session (the old behaviour)
+  vs. the process-wide get_workflow()
+
+No API call is made: the OpenAI backend only constructs the client (a
+placeholder key is used if none is set).
+
+Usage: python benchmarks/bench_startup.py --runs 5 --sessions 20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+EAGER_IMPORTS = "import workflow, agents, llm_cache, langchain_openai, langgraph.graph"
+
+
+def time_in_fresh_process(setup, env):
+    """Seconds spent running `setup` in a new interpreter"""
+    code = (
+        "import time; started = time.perf_counter()\n"
+        f"{setup}\n"
+        "print(time.perf_counter() - started)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def median_ms(samples):
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per cold-start measurement")
+    parser.add_argument("--sessions", type=int, default=20, help="simulated UI sessions")
+    parser.add_argument("--backend", choices=["openai", "stub"], default="openai")
+    args = parser.parse_args()
+    
+    os.environ["LLM_BACKEND"] = args.backend
+    os.environ.setdefault("OPENAI_API_KEY", "placeholder-not-used")
+    os.environ["CHECKPOINT_DB"] = os.path.join(tempfile.mkdtemp(prefix="aars-bench-"), "checkpoints.db")
+    env = dict(os.environ)
+    
+    build = "import contextlib, io\nwith contextlib.redirect_stdout(io.StringIO()):\n    workflow.get_workflow()"
+    cold = {
+        "import workflow (lazy)": "import workflow",
+        "import workflow + agents/LangChain/LangGraph (eager)": EAGER_IMPORTS,
+        "import + first get_workflow()": f"import workflow\n{build}",
+    }
+    print(f"Cold start, median of {args.runs} fresh interpreters ({args.backend} backend)")
+    for label, setup in cold.items():
+        samples = [time_in_fresh_process(setup, env) for _ in range(args.runs)]
+        print(f"  {label:<55}: {median_ms(samples):8.1f} ms")
+    
+    from workflow import create_aars_workflow, get_workflow
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        get_workflow()  # imports and first build are not per-session costs
+        per_session = {"create_aars_workflow() per session": create_aars_workflow, "get_workflow() per session": get_workflow}
+        results = {}
+        for label, factory in per_session.items():
+            samples = []
+            for _ in range(args.sessions):
+                started = time.perf_counter()
+                factory()
+                samples.append(time.perf_counter() - started)
+            results[label] = samples
+    
+    print(f"\nPer-session setup, median of {args.sessions} sessions")
+    for label, samples in results.items():
+        print(f"  {label:<55}: {median_ms(samples):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+End-to-end Workflow Benchmark
+Pushes alerts through the real compiled graph (real tools, real database,
+real checkpointer) with the offline StubChatModel standing in for the LLM,
+so runs are free, deterministic and need no network. Reports per-node latency
+percentiles, tool call counts, checkpoint bytes written and alerts/sec.
+
+Alerts are the TEST_ALERTS plus generated copies with fresh ids. Point
+DATABASE_URL at a seeded database first (`python -m database.seed_data`).
+
+Usage: python benchmarks/bench_workflow.py --alerts 50 --latency-ms 200 --workers 4
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.callbacks import BaseCallbackHandler
+from database.seed_data import TEST_ALERTS
+from stub_llm import StubChatModel
+from workflow import create_aars_workflow
+from batch import prepare_database, resolve_alerts, _percentile
+from sop_rules import sop_stats
+
+
+class WorkflowProfiler(BaseCallbackHandler):
+    """Times every graph node run and counts tool calls and tool errors across worker threads"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {}
+        self.node_seconds = defaultdict(list)
+        self.tool_calls = Counter()
+        self.tool_errors = Counter()
+        self._tools = {}
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            with self._lock:
+                self._started[run_id] = (node, time.perf_counter())
+    
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+    
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+    
+    def _finish(self, run_id):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started:
+                node, at = started
+                self.node_seconds[node].append(time.perf_counter() - at)
+    
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        with self._lock:
+            self.tool_calls[name] += 1
+            self._tools[run_id] = name
+    
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        with self._lock:
+            name = self._tools.pop(run_id, "unknown")
+            if is_error_payload(output):
+                self.tool_errors[name] += 1
+    
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self.tool_errors[self._tools.pop(run_id, "unknown")] += 1
+
+
+def is_error_payload(output):
+    """Tools report failures as a JSON object with an "error" key instead of raising"""
+    content = getattr(output, "content", output)
+    if not isinstance(content, str):
+        return False
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and bool(payload.get("error"))
+
+
+def generate_alerts(count):
+    """TEST_ALERTS, then copies cycling through them with unique alert ids"""
+    alerts = []
+    for i in range(count):
+        base = TEST_ALERTS[i % len(TEST_ALERTS)]
+        alert = {k: v for k, v in base.items() if k != "expected_action"}
+        if i >= len(TEST_ALERTS):
+            alert["alert_id"] = f"{base['alert_id']}-B{i:05d}"
+        alerts.append(alert)
+    return alerts
+
+
+def checkpoint_bytes(db_path):
+    """Payload bytes stored by SqliteSaver (checkpoints + pending writes)"""
+    with sqlite3.connect(db_path) as conn:
+        checkpoints = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+        ).fetchone()[0]
+        writes = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+    return checkpoints + writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=len(TEST_ALERTS))
+    parser.add_argument("--latency-ms", type=int, default=200, help="artificial latency of each stub LLM call")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sequential", action="store_true", help="disable the parallel investigation fan-out")
+    parser.add_argument("--no-checkpoints", action="store_true")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepare_database()
+    workdir = tempfile.mkdtemp(prefix="aars-bench-")
+    os.environ["CHECKPOINT_DB"] = os.path.join(workdir, "checkpoints.db")
+    
+    profiler = WorkflowProfiler()
+    alerts = generate_alerts(args.alerts)
+    results = []
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_aars_workflow(
+            parallel=not args.sequential,
+            cache_enabled=False,
+            model=StubChatModel(latency_seconds=args.latency_ms / 1000),
+            checkpoints=not args.no_checkpoints
+        )
+        started = time.perf_counter()
+        for result in resolve_alerts(app, alerts, args.workers, callbacks=[profiler], record=False):
+            results.append(result)
+        elapsed = time.perf_counter() - started
+    
+    resolved = sum(r["status"] == "resolved" for r in results)
+    print(f"{len(results)} alerts, {args.workers} workers, stub latency {args.latency_ms} ms, "
+          f"{'sequential' if args.sequential else 'parallel'} investigation")
+    print(f"  resolved        : {resolved}/{len(results)}")
+    print(f"  wall time       : {elapsed:.2f}s ({len(results) / elapsed:.2f} alerts/s)")
+    
+    latencies = [r["elapsed_seconds"] for r in results]
+    print(f"  per alert       : p50 {_percentile(latencies, 50):.3f}s  p95 {_percentile(latencies, 95):.3f}s  "
+          f"p99 {_percentile(latencies, 99):.3f}s")
+    
+    print("\n  node              runs     p50 ms     p95 ms     p99 ms")
+    for node, seconds in sorted(profiler.node_seconds.items()):
+        ms = [s * 1000 for s in seconds]
+        print(f"  {node:<16} {len(ms):>5} {_percentile(ms, 50):>10.1f} {_percentile(ms, 95):>10.1f} "
+              f"{_percentile(ms, 99):>10.1f}")
+    
+    print("\n  tool                          calls  errors")
+    for name, count in profiler.tool_calls.most_common():
+        print(f"  {name:<28} {count:>6} {profiler.tool_errors[name]:>7}")
+    
+    print(f"\n  SOP pre-adjudication: {sop_stats.stats()}")
+    
+    if not args.no_checkpoints:
+        written = checkpoint_bytes(os.environ["CHECKPOINT_DB"])
+        print(f"\n  checkpoint bytes: {written:,} ({written / max(len(results), 1):,.0f} per alert)")
+    
+    failures = [r for r in results if r["status"] != "resolved"]
+    for r in failures[:5]:
+        print(f"  ✗ {r['alert_id']}: {r['status']} {r['error'] or ''}")
+    
+    tool_errors = sum(profiler.tool_errors.values())
+    if tool_errors:
+        # Alerts still "resolve" on error payloads, so the timings above are not representative
+        print(f"\n  ✗ {tool_errors}/{sum(profiler.tool_calls.values())} tool calls returned errors - "
+              f"check DATABASE_URL points at a seeded database")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
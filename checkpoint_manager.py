@@ -1,32 +1,283 @@
-"""Checkpoint management utilities"""
+"""
+Checkpoint management utilities
 
+Every resolve run writes its own checkpoint thread, plus the checkpoints of
+the agents nested inside its nodes, so the checkpoint database grows with
+every alert; conversation threads are trimmed after each turn
+(trim_thread). This module lists threads with their size and age, prunes
+finished threads down to their latest checkpoint, applies age/count
+retention, and compacts the file with incremental vacuum in small steps, so
+workflows running against the same database are never blocked for long.
+
+Usage: python checkpoint_manager.py list
+       python checkpoint_manager.py maintain --max-age-days 30 --max-threads 5000
+"""
+
+import argparse
 import os
-from pathlib import Path
+import sqlite3
+import time
+from datetime import datetime, timezone
+from config import SQLITE_BUSY_TIMEOUT_MS, CHECKPOINT_MAX_AGE_DAYS, CHECKPOINT_MAX_THREADS
+
+# Value of the state's `next` channel once a run has completed (AEM / conversational)
+FINISHED_NEXT = ("END", "FINISH")
+
+
+def default_db_path():
+    return os.getenv("CHECKPOINT_DB", "checkpoints/aars_checkpoints.db")
+
 
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _file_bytes(db_path):
+    return sum(os.path.getsize(p) for p in (db_path, f"{db_path}-wal") if os.path.exists(p))
+
+
+def _latest_state(checkpoint_type, blob):
+    """(timestamp, state values) of a serialized top-level checkpoint"""
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    
+    checkpoint = JsonPlusSerializer().loads_typed((checkpoint_type, blob))
+    return datetime.fromisoformat(checkpoint["ts"]), checkpoint["channel_values"]
 
-def list_checkpoints(db_path="checkpoints/aars_checkpoints.db"):
-    """List all saved checkpoints"""
+
+def thread_summaries(db_path=None):
+    """One dict per thread: counts, bytes, latest checkpoint, age, whether the run finished and its alert"""
+    db_path = db_path or default_db_path()
+    if not os.path.exists(db_path):
+        return []
+    
+    conn = _connect(db_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'checkpoints'").fetchone():
+            return []
+        sizes = {
+            thread_id: {"checkpoints": count, "bytes": size or 0}
+            for thread_id, count, size in conn.execute(
+                "SELECT thread_id, COUNT(*), SUM(LENGTH(checkpoint) + LENGTH(metadata)) FROM checkpoints GROUP BY thread_id"
+            )
+        }
+        writes = {
+            thread_id: (count, size or 0)
+            for thread_id, count, size in conn.execute(
+                "SELECT thread_id, COUNT(*), SUM(LENGTH(value)) FROM writes GROUP BY thread_id"
+            )
+        }
+        latest = conn.execute(
+            """SELECT c.thread_id, c.checkpoint_id, c.type, c.checkpoint FROM checkpoints c
+               JOIN (SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id FROM checkpoints
+                     WHERE checkpoint_ns = '' GROUP BY thread_id) l
+                 ON c.thread_id = l.thread_id AND c.checkpoint_id = l.checkpoint_id AND c.checkpoint_ns = ''"""
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    now = datetime.now(timezone.utc)
+    threads = []
+    for thread_id, checkpoint_id, checkpoint_type, blob in latest:
+        updated_at, values = _latest_state(checkpoint_type, blob)
+        next_step = values.get("next")
+        write_count, write_bytes = writes.get(thread_id, (0, 0))
+        threads.append({
+            "thread_id": thread_id,
+            "checkpoints": sizes[thread_id]["checkpoints"],
+            "writes": write_count,
+            "bytes": sizes[thread_id]["bytes"] + write_bytes,
+            "latest_checkpoint_id": checkpoint_id,
+            "updated_at": updated_at,
+            "age_hours": round((now - updated_at).total_seconds() / 3600, 1),
+            "next": next_step,
+            "finished": next_step in FINISHED_NEXT,
+            "alert_data": values.get("alert_data")
+        })
+    return sorted(threads, key=lambda t: t["updated_at"], reverse=True)
+
+
+def thread_ids(prefix, db_path=None):
+    """Ids of the threads whose id starts with prefix (an index range scan, no checkpoint is decoded)"""
+    db_path = db_path or default_db_path()
+    if not os.path.exists(db_path):
+        return []
+    
+    conn = _connect(db_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'checkpoints'").fetchone():
+            return []
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return [row[0] for row in conn.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id >= ? AND thread_id < ?", (prefix, upper)
+        )]
+    finally:
+        conn.close()
+
+
+def _trim(conn, thread_id, keep=None):
+    """
+    Delete a thread's pending writes and every checkpoint except `keep`
+    ((checkpoint_ns, checkpoint_id); default: its latest top-level one) in one
+    short transaction. Returns (checkpoints_deleted, writes_deleted).
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if keep is None:
+            keep = ("", conn.execute(
+                "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''", (thread_id,)
+            ).fetchone()[0] or "")
+        # A finished run has no pending writes worth keeping, even on its latest checkpoint
+        writes = conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,)).rowcount
+        checkpoints = conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND NOT (checkpoint_ns = ? AND checkpoint_id = ?)",
+            (thread_id, *keep)
+        ).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return checkpoints, writes
+
+
+def trim_thread(thread_id, db_path=None):
+    """
+    Keep only a finished thread's latest top-level checkpoint. Run after each
+    conversation turn, so a -conv thread holds one checkpoint however many
+    turns it has had. Returns (checkpoints_deleted, writes_deleted).
+    """
+    conn = _connect(db_path or default_db_path())
+    try:
+        return _trim(conn, thread_id)
+    finally:
+        conn.close()
+
+
+def list_checkpoints(db_path=None):
+    """Print and return the checkpoint threads, newest first"""
+    db_path = db_path or default_db_path()
     if not os.path.exists(db_path):
         print("No checkpoint database found")
         return []
     
-    from langgraph.checkpoint.sqlite import SqliteSaver
+    threads = thread_summaries(db_path)
+    print(f"Checkpoints in {db_path} ({_file_bytes(db_path) / 1024:.0f} KB on disk):")
+    print("="*96)
+    print(f"{'thread_id':<40} {'ckpts':>6} {'writes':>7} {'KB':>8} {'age (h)':>9}  status")
+    for t in threads:
+        status = "finished" if t["finished"] else f"open (next: {t['next'] or '-'})"
+        print(f"{t['thread_id']:<40} {t['checkpoints']:>6} {t['writes']:>7} {t['bytes'] / 1024:>8.1f} {t['age_hours']:>9}  {status}")
+    print("="*96)
+    print(f"{len(threads)} threads, {sum(t['finished'] for t in threads)} finished, "
+          f"{sum(t['bytes'] for t in threads) / 1024:.0f} KB of checkpoint data")
+    return threads
+
+
+def prune_checkpoints(db_path=None, max_age_days=CHECKPOINT_MAX_AGE_DAYS, max_threads=CHECKPOINT_MAX_THREADS,
+                      dry_run=False):
+    """
+    Retention for finished threads - open threads are left alone so they can
+    still be resumed:
+    - finished threads older than max_age_days, or beyond the max_threads most
+      recent, are deleted entirely
+    - the others keep only their latest top-level checkpoint (earlier steps,
+      nested agent checkpoints and their pending writes are dropped)
+    Each thread is pruned in its own short transaction.
+    """
+    db_path = db_path or default_db_path()
+    finished = [t for t in thread_summaries(db_path) if t["finished"]]  # newest first
+    
+    expired = set()
+    if max_age_days:
+        expired.update(t["thread_id"] for t in finished if t["age_hours"] > max_age_days * 24)
+    if max_threads:
+        expired.update(t["thread_id"] for t in finished[max_threads:])
+    
+    stats = {"threads_deleted": 0, "threads_trimmed": 0, "checkpoints_deleted": 0, "writes_deleted": 0}
+    if dry_run:
+        stats["threads_deleted"] = len(expired)
+        stats["threads_trimmed"] = sum(t["checkpoints"] > 1 for t in finished if t["thread_id"] not in expired)
+        stats["checkpoints_deleted"] = sum(
+            t["checkpoints"] if t["thread_id"] in expired else t["checkpoints"] - 1 for t in finished
+        )
+        stats["writes_deleted"] = sum(t["writes"] for t in finished)
+        return stats
     
-    checkpointer = SqliteSaver.from_conn_string(db_path)
+    conn = _connect(db_path)
+    try:
+        for t in finished:
+            thread_id = t["thread_id"]
+            if thread_id in expired:
+                keep = ("", "")  # no checkpoint has this key: keep nothing
+                stats["threads_deleted"] += 1
+            elif t["checkpoints"] > 1 or t["writes"]:
+                keep = ("", t["latest_checkpoint_id"])
+                stats["threads_trimmed"] += 1
+            else:
+                continue
+            
+            checkpoints, writes = _trim(conn, thread_id, keep)
+            stats["checkpoints_deleted"] += checkpoints
+            stats["writes_deleted"] += writes
+    finally:
+        conn.close()
+    return stats
+
+
+def compact_checkpoints(db_path=None, pages_per_step=256, pause_seconds=0.01):
+    """
+    Return free pages to the file system with PRAGMA incremental_vacuum,
+    pages_per_step at a time with a pause between steps, then truncate the
+    WAL. A database created before incremental auto-vacuum was enabled needs
+    one full VACUUM to switch modes; that one-off step holds the write lock
+    for its duration. Returns bytes reclaimed on disk.
+    """
+    db_path = db_path or default_db_path()
+    if not os.path.exists(db_path):
+        return 0
     
-    print(f"Checkpoints in {db_path}:")
-    print("="*60)
+    before = _file_bytes(db_path)
+    conn = _connect(db_path)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("⚙️  Switching checkpoint database to incremental auto-vacuum (one-time full VACUUM)")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        
+        while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            conn.execute(f"PRAGMA incremental_vacuum({pages_per_step})").fetchall()
+            time.sleep(pause_seconds)  # let workflow writers in between steps
+        
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    finally:
+        conn.close()
+    return before - _file_bytes(db_path)
+
+
+def maintain_checkpoints(db_path=None, max_age_days=CHECKPOINT_MAX_AGE_DAYS, max_threads=CHECKPOINT_MAX_THREADS,
+                         dry_run=False):
+    """Prune then compact; returns the prune stats plus bytes_reclaimed"""
+    db_path = db_path or default_db_path()
+    if not os.path.exists(db_path):
+        print("No checkpoint database found")
+        return {}
     
-    # This would require querying the SQLite database directly
-    # For now, just confirm it exists
-    print(f"✓ Checkpoint database exists at: {db_path}")
-    print("  Workflow states are being persisted")
+    started = time.perf_counter()
+    stats = prune_checkpoints(db_path, max_age_days, max_threads, dry_run)
+    stats["bytes_reclaimed"] = 0 if dry_run else compact_checkpoints(db_path)
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 2)
     
-    return []
+    print(f"{'🔍 Dry run' if dry_run else '✓ Checkpoint maintenance'}: {stats['threads_deleted']} threads deleted, "
+          f"{stats['threads_trimmed']} trimmed to their latest checkpoint, "
+          f"{stats['checkpoints_deleted']} checkpoints / {stats['writes_deleted']} writes removed, "
+          f"{stats['bytes_reclaimed'] / 1024:.0f} KB reclaimed ({stats['elapsed_seconds']}s)")
+    return stats
 
 
-def clear_checkpoints(db_path="checkpoints/aars_checkpoints.db"):
+def clear_checkpoints(db_path=None):
     """Clear all checkpoints"""
+    db_path = db_path or default_db_path()
     if os.path.exists(db_path):
         os.remove(db_path)
         print(f"✓ Cleared checkpoints: {db_path}")
@@ -34,11 +285,26 @@ def clear_checkpoints(db_path="checkpoints/aars_checkpoints.db"):
         print("No checkpoint database to clear")
 
 
-if __name__ == "__main__":
-    import sys
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="list", choices=["list", "prune", "compact", "maintain", "clear"])
+    parser.add_argument("--db", help="checkpoint database (default: $CHECKPOINT_DB)")
+    parser.add_argument("--max-age-days", type=float, default=CHECKPOINT_MAX_AGE_DAYS, help="0 = no age limit")
+    parser.add_argument("--max-threads", type=int, default=CHECKPOINT_MAX_THREADS, help="0 = no count limit")
+    parser.add_argument("--dry-run", action="store_true", help="report what prune would remove")
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "clear":
-        clear_checkpoints()
+    if args.command == "list":
+        list_checkpoints(args.db)
+    elif args.command == "prune":
+        print(prune_checkpoints(args.db, args.max_age_days, args.max_threads, args.dry_run))
+    elif args.command == "compact":
+        print(f"✓ {compact_checkpoints(args.db) / 1024:.0f} KB reclaimed")
+    elif args.command == "maintain":
+        maintain_checkpoints(args.db, args.max_age_days, args.max_threads, args.dry_run)
     else:
-        list_checkpoints()
+        clear_checkpoints(args.db)
 
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,21 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = "gpt-4o-mini"
 OPENAI_TEMPERATURE = 0.1
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))  # 0 = no limit
+
+# "openai", or "stub" for the offline scripted model in stub_llm.py (no API key, no network)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+STUB_LLM_LATENCY_MS = int(os.getenv("STUB_LLM_LATENCY_MS", "0"))
+
+# Database settings
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aars_database.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a pooled connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
 SCENARIOS = {
     "A-001": "Velocity Spike (Layering)",
@@ -18,3 +33,99 @@ SCENARIOS = {
 }
 
 ACTIONS = ["ESCALATE_SAR", "RFI", "FalsePositive", "BLOCK_ACCOUNT"]
+
+# Supervisor routing: "rules" decides from state and asks the LLM only for
+# ambiguous states; "llm" asks the LLM on every hop
+SUPERVISOR_ROUTING = os.getenv("SUPERVISOR_ROUTING", "rules").lower()
+
+# Run investigator and context_gatherer concurrently, joining before the adjudicator
+PARALLEL_INVESTIGATION = os.getenv("PARALLEL_INVESTIGATION", "true").lower() == "true"
+
+# Deterministic SOP pre-adjudication (sop_rules.py); only inconclusive cases reach the LLM adjudicator
+SOP_RULES_ENABLED = os.getenv("SOP_RULES_ENABLED", "true").lower() == "true"
+SOP_VELOCITY_MIN_COUNT = 3  # high-value outflows within 48h that make a velocity spike
+SOP_INCOME_MISMATCH_RATIO = 1.5  # annualized 90-day inflow / declared income
+SOP_STRUCTURING_AGGREGATE = 28000  # 7-day deposits across linked accounts
+
+# Tool settings
+HIGH_VALUE_TXN_THRESHOLD = 5000
+HISTORY_TOP_N = int(os.getenv("HISTORY_TOP_N", "25"))  # max transaction rows returned by db_query_history
+DEFAULT_LOOKBACK_DAYS = 90
+RECENT_TXN_COUNT = 5
+
+# Linked-account graph
+DEPOSIT_TXN_TYPES = ("credit", "cash_deposit", "wire_in")
+LINKED_DEPOSIT_WINDOW_DAYS = 7
+LINKED_ACCOUNTS_MAX_DEPTH = int(os.getenv("LINKED_ACCOUNTS_MAX_DEPTH", "2"))
+LINKED_ACCOUNTS_MAX_NODES = int(os.getenv("LINKED_ACCOUNTS_MAX_NODES", "500"))
+
+# Sanctions screening
+SANCTIONS_MIN_SCORE = 0.6  # candidates below this are not reported
+SANCTIONS_MATCH_THRESHOLD = 0.8  # potential match, needs review
+SANCTIONS_BLOCK_THRESHOLD = 0.9  # confirmed match -> BLOCK_ACCOUNT
+SANCTIONS_COMMON_NAME_DAMPING = 0.3  # score multiplier for entries flagged common_name
+SANCTIONS_MAX_CANDIDATES = 5
+SANCTIONS_BLOCKING_MAX_DF = 1000  # trigrams in more names than this are skipped during blocking
+
+# Customer snapshot cache shared by the tools
+SNAPSHOT_CACHE_MAX_ENTRIES = int(os.getenv("SNAPSHOT_CACHE_MAX_ENTRIES", "256"))
+SNAPSHOT_CACHE_TTL_SECONDS = int(os.getenv("SNAPSHOT_CACHE_TTL_SECONDS", "300"))
+
+# Tool output encoding (compact columnar JSON, ~4 bytes per token)
+TOOL_OUTPUT_MAX_BYTES = int(os.getenv("TOOL_OUTPUT_MAX_BYTES", "3000"))
+TOOL_OUTPUT_BUDGETS = {  # per-tool overrides of TOOL_OUTPUT_MAX_BYTES
+    "db_query_history": 6000,
+    "check_linked_accounts": 4000,
+    "check_account_dormancy": 2000,
+}
+
+# Customer feature store
+FEATURE_WINDOW_DAYS = DEFAULT_LOOKBACK_DAYS
+VELOCITY_WINDOW_HOURS = 48
+FEATURE_DEPOSIT_WINDOW_DAYS = 7
+DORMANCY_THRESHOLD_MONTHS = 12
+
+# Per-node/tool latency and token records in the workflow_metrics table (metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Agent retries and circuit breaker (resilience.py)
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))  # attempts per agent node, first call included
+RETRY_NODE_ATTEMPTS = {  # per-node overrides of RETRY_MAX_ATTEMPTS
+    "adjudicator": 2,
+}
+RETRY_BACKOFF_BASE_SECONDS = float(os.getenv("RETRY_BACKOFF_BASE_SECONDS", "1.0"))  # doubled per attempt, full jitter
+RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("RETRY_BACKOFF_MAX_SECONDS", "20"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # consecutive failures that open it
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))  # open time before one trial call
+# Errors worth retrying (comma-separated module.Class names; modules not installed are skipped).
+# Anything else, e.g. a bug in a node, is raised at once without touching the circuit breaker
+RETRY_TRANSIENT_ERRORS = [n.strip() for n in os.getenv("RETRY_TRANSIENT_ERRORS", ",".join([
+    "openai.APIConnectionError",  # includes APITimeoutError
+    "openai.RateLimitError",
+    "openai.InternalServerError",
+    "httpx.TransportError",
+    "sqlalchemy.exc.OperationalError",
+    "builtins.TimeoutError",
+    "builtins.ConnectionError",
+])).split(",") if n.strip()]
+
+# Checkpoint retention (checkpoint_manager.py); applies to finished threads only
+CHECKPOINT_MAX_AGE_DAYS = float(os.getenv("CHECKPOINT_MAX_AGE_DAYS", "30"))  # 0 = keep regardless of age
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "0"))  # most recent finished threads kept; 0 = no limit
+
+# Conversation state compaction (state.py); bounds each checkpoint of a chat thread, and workflow.py
+# trims the thread to its latest checkpoint after every turn
+CONVERSATION_KEEP_TURNS = int(os.getenv("CONVERSATION_KEEP_TURNS", "6"))  # recent turns kept verbatim; 0 = never summarize
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", "2000"))  # oldest summary lines dropped beyond this
+STATE_LOG_MAX_ENTRIES = int(os.getenv("STATE_LOG_MAX_ENTRIES", "50"))  # newest messages / routing_trace entries kept; 0 = no limit
+
+# Batch resolution
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# Persistent LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "checkpoints/llm_cache.db")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+# Nodes whose LLM calls bypass the cache (comma-separated node names)
+LLM_CACHE_EXCLUDE_NODES = {n.strip() for n in os.getenv("LLM_CACHE_EXCLUDE_NODES", "conversational").split(",") if n.strip()}
@@ -6,12 +6,20 @@ from .models import (
     Transaction,
     Alert,
     AlertResolution,
+    CustomerFeatures,
+    WorkflowMetric,
 )
 from .connection import (
     engine,
+    build_engine,
+    build_async_engine,
+    get_async_engine,
     SessionLocal,
+    AsyncSessionLocal,
     init_db,
+    migrate_db,
     get_db_session,
+    get_async_db_session,
 )
 
 __all__ = [
@@ -20,9 +28,17 @@ __all__ = [
     "Transaction",
     "Alert",
     "AlertResolution",
+    "CustomerFeatures",
+    "WorkflowMetric",
     "engine",
+    "build_engine",
+    "build_async_engine",
+    "get_async_engine",
     "SessionLocal",
+    "AsyncSessionLocal",
     "init_db",
+    "migrate_db",
     "get_db_session",
+    "get_async_db_session",
 ]
 
@@ -2,28 +2,180 @@
 Database Connection and Session Management
 """
 
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, Session
 from database.models import Base
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
+from config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite tuning.
+    WAL lets readers proceed while a writer is active; NORMAL sync is safe under WAL.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+# Async drivers used when DATABASE_URL names a sync one
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _engine_options(database_url, engine_kwargs):
+    """Shared engine options; returns (options, in_memory)"""
+    options = {"echo": False, "pool_pre_ping": True}
+    
+    if database_url.get_backend_name() == "sqlite":
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        in_memory = database_url.database in (None, "", ":memory:")
+    else:
+        in_memory = False
+    
+    if not in_memory:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    
+    options.update(engine_kwargs)
+    return options, in_memory
+
+
+def build_engine(url=DATABASE_URL, **engine_kwargs):
+    """
+    Create an engine for any SQLAlchemy URL (SQLite, Postgres, ...).
+    File-backed SQLite gets WAL and the pragmas above; pool sizing comes from config.
+    """
+    database_url = make_url(url)
+    options, in_memory = _engine_options(database_url, engine_kwargs)
+    new_engine = create_engine(database_url, **options)
+    
+    if database_url.get_backend_name() == "sqlite" and not in_memory:
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    
+    return new_engine
+
+
+def build_async_engine(url=DATABASE_URL, **engine_kwargs):
+    """
+    Async counterpart of build_engine for the same database.
+    A sync driver in the URL is swapped for its async one (aiosqlite, asyncpg).
+    """
+    database_url = make_url(url)
+    backend = database_url.get_backend_name()
+    if backend in ASYNC_DRIVERS and not database_url.get_dialect().is_async:
+        database_url = database_url.set(drivername=ASYNC_DRIVERS[backend])
+    
+    options, in_memory = _engine_options(database_url, engine_kwargs)
+    new_engine = create_async_engine(database_url, **options)
+    
+    if backend == "sqlite" and not in_memory:
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    
+    return new_engine
 
-# Database configuration
-DATABASE_URL = "sqlite:///./aars_database.db"
 
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  
-    echo=False 
-)
+engine = build_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine over the same database, for coroutine tools and services. Built
+# on first use, so processes that never go async do not need the async driver.
+_async_engine = None
+_async_session_factory = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    """Process-wide async engine for DATABASE_URL, created on first use"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                new_engine = build_async_engine()
+                _async_session_factory = async_sessionmaker(new_engine, autoflush=False, expire_on_commit=False)
+                _async_engine = new_engine
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    """New AsyncSession on the shared async engine (the async counterpart of SessionLocal())"""
+    get_async_engine()
+    return _async_session_factory()
+
 
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
     print("✓ Database tables created successfully")
+    migrate_db()
+
+
+def migrate_db(bind=None):
+    """
+    Bring an existing database up to the current models without a reseed.
+    Creates missing tables, adds missing (nullable) columns and builds any
+    declared indexes that are not there yet. Safe to run repeatedly.
+    Returns the list of schema changes applied.
+    """
+    bind = bind or engine
+    applied = []
+    
+    existing_tables = set(inspect(bind).get_table_names())
+    missing_tables = [t for t in Base.metadata.sorted_tables if t.name not in existing_tables]
+    if missing_tables:
+        Base.metadata.create_all(bind=bind, tables=missing_tables)
+        applied.extend(f"create table {t.name}" for t in missing_tables)
+    
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if table in missing_tables:
+                continue
+            
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                applied.append(f"add column {table.name}.{column.name}")
+            
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                index.create(bind=conn)
+                applied.append(f"create index {index.name}")
+    
+    for change in applied:
+        print(f"✓ Migration: {change}")
+    return applied
 
 
 def drop_db():
@@ -60,3 +212,21 @@ def get_db_session():
     finally:
         db.close()
 
+
+@asynccontextmanager
+async def get_async_db_session():
+    """
+    Async context manager for database sessions
+    Usage: async with get_async_db_session() as db:
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    init_db()
@@ -4,7 +4,7 @@ Persistent storage for alerts, customers, transactions, and resolutions
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -49,6 +49,10 @@ class Customer(Base):
 class Transaction(Base):
     """Transaction History"""
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_customer_date", "customer_id", "date"),
+        Index("ix_transactions_counterparty", "counterparty"),
+    )
     
     id = Column(String(50), primary_key=True)  # e.g., T-001
     customer_id = Column(String(50), ForeignKey("customers.id"), nullable=False)
@@ -94,6 +98,48 @@ class LinkedAccount(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class CustomerFeatures(Base):
+    """Derived per-customer features, maintained from transactions (see features.py)"""
+    __tablename__ = "customer_features"
+    
+    customer_id = Column(String(50), ForeignKey("customers.id"), primary_key=True)
+    as_of = Column(DateTime)  # latest transaction; all windows end here
+    txn_count_90d = Column(Integer, default=0)
+    max_txn_90d = Column(Float, default=0.0)
+    avg_txn_90d = Column(Float, default=0.0)
+    high_value_count_90d = Column(Integer, default=0)
+    velocity_48h_count = Column(Integer, default=0)  # most high-value outbound txns in any 48h
+    velocity_48h_total = Column(Float, default=0.0)
+    inflow_90d = Column(Float, default=0.0)
+    outflow_90d = Column(Float, default=0.0)
+    income_flow_ratio = Column(Float)  # annualized 90-day inflow / declared income
+    max_deposits_7d = Column(Float, default=0.0)  # largest deposit sum in any 7 days
+    dormancy_months = Column(Integer, default=0)  # longest silence before recent activity
+    last_activity_before_reactivation = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "customer_id": self.customer_id,
+            "as_of": self.as_of.isoformat() if self.as_of else None,
+            "txn_count_90d": self.txn_count_90d,
+            "max_txn_90d": self.max_txn_90d,
+            "avg_txn_90d": self.avg_txn_90d,
+            "high_value_count_90d": self.high_value_count_90d,
+            "velocity_48h_count": self.velocity_48h_count,
+            "velocity_48h_total": self.velocity_48h_total,
+            "inflow_90d": self.inflow_90d,
+            "outflow_90d": self.outflow_90d,
+            "income_flow_ratio": self.income_flow_ratio,
+            "max_deposits_7d": self.max_deposits_7d,
+            "dormancy_months": self.dormancy_months,
+            "last_activity_before_reactivation": (
+                self.last_activity_before_reactivation.isoformat()
+                if self.last_activity_before_reactivation else None
+            ),
+        }
+
+
 class SanctionsEntity(Base):
     """Sanctions Watchlist"""
     __tablename__ = "sanctions_entities"
@@ -104,16 +150,19 @@ class SanctionsEntity(Base):
     sanctioned = Column(Boolean, default=True)
     jurisdiction = Column(String(100))
     program = Column(String(100))  # OFAC-SDN, EU, UN, etc.
+    category = Column(String(100))  # TERRORISM, NARCOTICS, etc.
     common_name = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
+            "entity_id": f"SANC-{self.id}",
             "name": self.name,
             "entity_type": self.entity_type,
             "sanctioned": self.sanctioned,
             "jurisdiction": self.jurisdiction,
             "program": self.program,
+            "category": self.category,
             "common_name": self.common_name,
         }
 
@@ -121,6 +170,9 @@ class SanctionsEntity(Base):
 class Alert(Base):
     """Alert Records"""
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_status_priority_created", "status", "priority", "created_at"),
+    )
     
     id = Column(String(50), primary_key=True)  # e.g., A-001
     customer_id = Column(String(50), ForeignKey("customers.id"), nullable=False)
@@ -135,7 +187,7 @@ class Alert(Base):
     
     # Relationships
     customer = relationship("Customer", back_populates="alerts")
-    resolution = relationship("AlertResolution", back_populates="alert", uselist=False)
+    resolutions = relationship("AlertResolution", back_populates="alert", order_by="AlertResolution.id")
     
     def to_dict(self):
         return {
@@ -151,8 +203,11 @@ class Alert(Base):
 
 
 class AlertResolution(Base):
-    """Alert Resolution Records"""
+    """Alert Resolution Records - one row per finished resolve run, never updated (see resolution_store.py)"""
     __tablename__ = "alert_resolutions"
+    __table_args__ = (
+        Index("ix_alert_resolutions_alert_id", "alert_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     alert_id = Column(String(50), ForeignKey("alerts.id"), nullable=False)
@@ -164,9 +219,13 @@ class AlertResolution(Base):
     context_data = Column(JSON)
     resolved_at = Column(DateTime, default=datetime.utcnow)
     resolved_by = Column(String(100), default="AARS_SYSTEM")
+    thread_id = Column(String(100))  # checkpoint thread of the run
+    decided_by = Column(String(20))  # sop_rules | llm | resilience
+    sop_rule_applied = Column(String(50))
+    step_history = Column(JSON)  # the run's timeline as shown in the UI: [{"role", "content", ...}]
     
     # Relationships
-    alert = relationship("Alert", back_populates="resolution")
+    alert = relationship("Alert", back_populates="resolutions")
     
     def to_dict(self):
         return {
@@ -180,5 +239,49 @@ class AlertResolution(Base):
             "context_data": self.context_data,
             "resolved_at": self.resolved_at.isoformat(),
             "resolved_by": self.resolved_by,
+            "thread_id": self.thread_id,
+            "decided_by": self.decided_by,
+            "sop_rule_applied": self.sop_rule_applied,
+            "step_history": self.step_history,
         }
 
+
+class WorkflowMetric(Base):
+    """One timed node or tool invocation of a workflow run (see metrics.py)"""
+    __tablename__ = "workflow_metrics"
+    __table_args__ = (
+        Index("ix_workflow_metrics_thread_id", "thread_id"),
+        Index("ix_workflow_metrics_kind_name_scenario", "kind", "name", "scenario_code"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    thread_id = Column(String(100), nullable=False)
+    alert_id = Column(String(50))
+    scenario_code = Column(String(10))
+    kind = Column(String(10), nullable=False)  # node | tool
+    name = Column(String(100), nullable=False)  # node or tool name
+    node = Column(String(50))  # graph node the invocation ran under
+    status = Column(String(10), default="ok")  # ok | error | deferred
+    started_at = Column(DateTime, default=datetime.utcnow)
+    wall_ms = Column(Float, nullable=False)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    retries = Column(Integer, default=0)
+    result_bytes = Column(Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            "thread_id": self.thread_id,
+            "alert_id": self.alert_id,
+            "scenario_code": self.scenario_code,
+            "kind": self.kind,
+            "name": self.name,
+            "node": self.node,
+            "status": self.status,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "wall_ms": self.wall_ms,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "result_bytes": self.result_bytes,
+        }
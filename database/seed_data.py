@@ -1,8 +1,14 @@
 """Database Seed Script"""
 
-from datetime import datetime
-from database.connection import get_db_session, init_db
-from database.models import Customer, Transaction, Alert
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from database.connection import engine, get_db_session, init_db, migrate_db
+from database.models import Customer, CustomerFeatures, Transaction, Alert, AlertResolution, SanctionsEntity, LinkedAccount
+from features import rebuild_customer_features
+from config import SCENARIOS
 
 # Mock data embedded here
 MOCK_CUSTOMER_DB = {
@@ -90,10 +96,64 @@ MOCK_TRANSACTION_HISTORY = {
     "CUST-105": [
         {"date": "2023-06-10", "amount": 2500, "type": "credit", "description": "Social security"},
         {"date": "2023-07-10", "amount": 2500, "type": "credit", "description": "Social security"},
-        {"date": "2023-08-10", "amount": 2500, "type": "credit", "description": "Social security"}
+        {"date": "2023-08-10", "amount": 2500, "type": "credit", "description": "Social security"},
+        {"date": "2024-12-10", "amount": 15000, "type": "credit", "description": "Inbound wire"},
+        {"date": "2024-12-11", "amount": 12000, "type": "debit", "description": "ATM withdrawal (international)"}
     ]
 }
 
+MOCK_LINKED_ACCOUNTS = [
+    {"customer_id": "CUST-102", "linked_account_id": "ACC-102-JOINT", "relationship_type": "Joint account (spouse)"},
+    {"customer_id": "CUST-102", "linked_account_id": "ACC-102-BIZ", "relationship_type": "Business account"},
+]
+
+MOCK_SANCTIONS_ENTITIES = [
+    {
+        "id": 9001,
+        "entity_id": "SANC-9001",
+        "name": "Mahmoud Al-Hassan",
+        "entity_type": "INDIVIDUAL",
+        "sanctioned": True,
+        "jurisdiction": "High-Risk",
+        "program": "OFAC SDN",
+        "category": "TERRORISM",
+        "common_name": False
+    },
+    {
+        "id": 9002,
+        "entity_id": "SANC-9002",
+        "name": "Omar Terrorist Inc",
+        "entity_type": "ENTITY",
+        "sanctioned": True,
+        "jurisdiction": "Syria",
+        "program": "UN Security Council",
+        "category": "TERRORIST FINANCING",
+        "common_name": False
+    },
+    {
+        "id": 9003,
+        "entity_id": "SANC-9003",
+        "name": "Viktor Petrov",
+        "entity_type": "INDIVIDUAL",
+        "sanctioned": True,
+        "jurisdiction": "Russia",
+        "program": "OFAC/EU Consolidated List",
+        "category": "SANCTIONED OLIGARCH",
+        "common_name": False
+    },
+    {
+        "id": 9004,
+        "entity_id": "SANC-9004",
+        "name": "Deepak",
+        "entity_type": "INDIVIDUAL",
+        "sanctioned": True,
+        "jurisdiction": "N/A",
+        "program": "OFAC SDN",
+        "category": "NARCOTICS",
+        "common_name": True
+    }
+]
+
 TEST_ALERTS = [
     {
         "alert_id": "ALT-2024-001",
@@ -151,9 +211,13 @@ def seed_database():
     with get_db_session() as db:
         # Clear existing data
         print("Clearing existing data...")
+        db.query(AlertResolution).delete()
         db.query(Alert).delete()
+        db.query(LinkedAccount).delete()
+        db.query(CustomerFeatures).delete()
         db.query(Transaction).delete()
         db.query(Customer).delete()
+        db.query(SanctionsEntity).delete()
         db.commit()
         
         # Seed customers
@@ -207,11 +271,308 @@ def seed_database():
             db.add(alert)
         db.commit()
         print(f"  ✓ Seeded {len(TEST_ALERTS)} alerts")
+        
+        # Seed linked accounts
+        print("Seeding linked accounts...")
+        for link_data in MOCK_LINKED_ACCOUNTS:
+            db.add(LinkedAccount(**link_data))
+        db.commit()
+        print(f"  ✓ Seeded {len(MOCK_LINKED_ACCOUNTS)} linked accounts")
+        
+        # Seed sanctions watchlist
+        print("Seeding sanctions watchlist...")
+        for entity_data in MOCK_SANCTIONS_ENTITIES:
+            entity = {k: v for k, v in entity_data.items() if k != "entity_id"}
+            db.add(SanctionsEntity(**entity))
+        db.commit()
+        print(f"  ✓ Seeded {len(MOCK_SANCTIONS_ENTITIES)} sanctions entities")
     
     print("\n" + "="*60)
     print("DATABASE SEEDING COMPLETE")
     print("="*60 + "\n")
 
 
+# ---------------------------------------------------------------------------
+# Synthetic data for capacity testing
+# ---------------------------------------------------------------------------
+
+SYNTHETIC_OCCUPATIONS = [
+    # (occupation, weight, median declared income)
+    ("Teacher", 12, 55000),
+    ("Software Engineer", 10, 120000),
+    ("Nurse", 9, 70000),
+    ("Retail Worker", 12, 32000),
+    ("Student", 8, 12000),
+    ("Retired", 10, 30000),
+    ("Jeweler", 2, 110000),
+    ("Precious Metals Trader", 1, 250000),
+    ("Construction Business", 4, 400000),
+    ("Freelance Consultant", 6, 80000),
+    ("Restaurant Owner", 4, 150000),
+    ("Physician", 3, 250000),
+]
+SYNTHETIC_FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Anjali", "Vikram", "Sneha", "Arjun", "Kavya", "Rohan",
+                         "Meera", "Amit", "Neha", "Sanjay", "Pooja", "Karan", "Divya", "Ravi", "Isha"]
+SYNTHETIC_LAST_NAMES = ["Sharma", "Verma", "Gupta", "Patel", "Singh", "Reddy", "Nair", "Iyer", "Mehta",
+                        "Joshi", "Kapoor", "Bose", "Das", "Rao", "Kulkarni", "Malhotra", "Chopra", "Bishnoi"]
+SYNTHETIC_BRANCHES = [f"Branch {c}" for c in "ABCDEFGHIJ"]
+SYNTHETIC_MCCS = ["5411", "5812", "5541", "4900", "5311", "5999", "6011", "4814"]
+PRECIOUS_METALS_MCC = "5094"
+SYNTHETIC_RISK_RATINGS = (("Low", 70), ("Medium", 22), ("High", 8))
+
+
+def _weighted(rng, pairs):
+    return rng.choices([p[0] for p in pairs], weights=[p[1] for p in pairs])[0]
+
+
+class SyntheticDataGenerator:
+    """
+    Generates customers, background transactions and alerts with the
+    signal each SOP scenario (A-001..A-005) looks for planted in the
+    subject's history. Rows are yielded in chunks ready for bulk insert.
+    """
+    
+    def __init__(self, customers, transactions, alerts_per_scenario, end_date=None, seed=42):
+        self.rng = random.Random(seed)
+        self.customer_count = customers
+        self.transaction_count = transactions
+        self.alerts_per_scenario = alerts_per_scenario
+        self.end_date = end_date or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start_date = self.end_date - timedelta(days=730)
+        self.customers = []
+        self.alerts = []
+        self.links = []
+        self.planted = []
+        self.dormant_ids = set()  # A-005 subjects, kept out of background activity
+        self._txn_seq = 0
+    
+    def _txn(self, customer_id, amount, txn_type, date, **extra):
+        self._txn_seq += 1
+        row = {
+            "id": f"SYN-TXN-{self._txn_seq:09d}",
+            "customer_id": customer_id,
+            "amount": round(amount, 2),
+            "type": txn_type,
+            "date": date,
+            "counterparty": None,
+            "jurisdiction": "Domestic",
+            "branch": None,
+            "mcc": None,
+            "location": None,
+            "origin": None,
+        }
+        row.update(extra)
+        return row
+    
+    def build_customers(self):
+        rng = self.rng
+        for i in range(self.customer_count):
+            occupation, _, median_income = _weighted(rng, [(row, row[1]) for row in SYNTHETIC_OCCUPATIONS])
+            opened = self.start_date - timedelta(days=rng.randrange(30, 3650))
+            self.customers.append({
+                "id": f"SYN-CUST-{i:07d}",
+                "customer_id": f"SYN-CUST-{i:07d}",
+                "name": f"{rng.choice(SYNTHETIC_FIRST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}",
+                "occupation": occupation,
+                "declared_income": round(rng.lognormvariate(0, 0.35) * median_income, -2),
+                "source_of_funds": "Salary" if occupation not in ("Retired", "Student") else "Pension/Family",
+                "risk_rating": _weighted(rng, SYNTHETIC_RISK_RATINGS),
+                "account_opened": opened.date().isoformat(),
+                "account_open_date": opened.date().isoformat(),
+                "enhanced_due_diligence": False,
+                "kyc_verified": rng.random() > 0.03,
+                "employer": "Self-Employed" if "Business" in occupation or "Owner" in occupation else "Private",
+                "created_at": self.end_date,
+            })
+        return self.customers
+    
+    def _alert(self, code, customer, details, counterparty=None):
+        alert_id = f"SYN-ALT-{code}-{len(self.alerts):06d}"
+        self.alerts.append({
+            "id": alert_id,
+            "customer_id": customer["id"],
+            "scenario_code": code,
+            "scenario_name": SCENARIOS[code],
+            "description": counterparty and f"Counterparty: {counterparty}",
+            "trigger_details": details,
+            "status": "PENDING",
+            "priority": "HIGH" if code in ("A-004", "A-005") else "MEDIUM",
+            "created_at": self.end_date,
+            "updated_at": self.end_date,
+        })
+    
+    def plant_signals(self):
+        """Pattern transactions and alerts for each scenario, on dedicated subjects"""
+        rng = self.rng
+        needed = self.alerts_per_scenario * len(SCENARIOS)
+        if needed > len(self.customers):
+            raise ValueError(f"Need at least {needed} customers for {self.alerts_per_scenario} alerts per scenario")
+        subjects = rng.sample(self.customers, needed)
+        # Structuring partners come from outside the subjects, so no planted pattern (A-005 dormancy) is disturbed
+        subject_ids = {c["id"] for c in subjects}
+        partners = [c for c in self.customers if c["id"] not in subject_ids]
+        subjects = iter(subjects)
+        sanctioned = [e["name"] for e in MOCK_SANCTIONS_ENTITIES if not e["common_name"]]
+        
+        for _ in range(self.alerts_per_scenario):
+            # A-001 velocity spike: large inbound credit, then 5+ outbound wires > $5k within 48h
+            c = next(subjects)
+            t0 = self.end_date - timedelta(days=rng.randrange(1, 20), hours=rng.randrange(24))
+            inbound = rng.uniform(40000, 60000)
+            self.planted.append(self._txn(c["id"], inbound, "credit", t0, counterparty="Inbound wire", origin="International"))
+            wires = [rng.uniform(5200, 12000) for _ in range(rng.randint(5, 7))]
+            for w in wires:
+                when = t0 + timedelta(hours=2 + rng.uniform(0, 46))
+                self.planted.append(self._txn(c["id"], w, "debit", when, counterparty="Wire transfer"))
+            self._alert("A-001", c, f"{len(wires)} transactions exceeding $5,000 within 48 hours "
+                                    f"(total: ${sum(wires):,.0f}). Inbound credit of ${inbound:,.0f} prior to first outbound.")
+            
+            # A-002 structuring: 3 cash deposits of $9k-$9.9k in 7 days, one more via a linked account
+            c = next(subjects)
+            t0 = self.end_date - timedelta(days=rng.randrange(7, 30))
+            deposits = [rng.uniform(9000, 9900) for _ in range(3)]
+            for k, amount in enumerate(deposits):
+                self.planted.append(self._txn(c["id"], amount, "credit", t0 + timedelta(days=2 * k),
+                                              counterparty="Cash deposit", branch=rng.choice(SYNTHETIC_BRANCHES)))
+            if partners:
+                partner = rng.choice(partners)
+                self.links.append({"customer_id": c["id"], "linked_account_id": partner["id"],
+                                   "relationship_type": "Family member", "aggregate_deposits_7d": 0.0})
+                self.planted.append(self._txn(partner["id"], rng.uniform(9000, 9900), "credit", t0 + timedelta(days=3),
+                                              counterparty="Cash deposit", branch=rng.choice(SYNTHETIC_BRANCHES)))
+            self._alert("A-002", c, f"3 cash deposits in 7 days totalling ${sum(deposits):,.0f}.")
+            
+            # A-003 KYC inconsistency: large wire to a precious-metals merchant
+            c = next(subjects)
+            amount = rng.uniform(15000, 25000)
+            self.planted.append(self._txn(c["id"], amount, "debit", self.end_date - timedelta(days=rng.randrange(1, 10)),
+                                          counterparty="Precious Metals Trading", mcc=PRECIOUS_METALS_MCC))
+            self._alert("A-003", c, f"{c['occupation']} profile sending ${amount:,.0f} wire to MCC 'Precious Metals Trading'.")
+            
+            # A-004 sanctions hit: counterparty on the watchlist
+            c = next(subjects)
+            counterparty = rng.choice(sanctioned)
+            self.planted.append(self._txn(c["id"], rng.uniform(2000, 30000), "debit",
+                                          self.end_date - timedelta(days=rng.randrange(1, 10)),
+                                          counterparty=counterparty, jurisdiction="High-Risk"))
+            self._alert("A-004", c, f"Transaction counterparty '{counterparty}' matches a sanctions list entry.",
+                        counterparty=counterparty)
+            
+            # A-005 dormant reactivation: nothing for 13-24 months, then inbound wire and foreign ATM withdrawal
+            c = next(subjects)
+            self.dormant_ids.add(c["id"])
+            dormant_from = self.end_date - timedelta(days=rng.randrange(400, 730))
+            for k in range(3):
+                self.planted.append(self._txn(c["id"], rng.uniform(500, 3000), "credit",
+                                              dormant_from - timedelta(days=30 * k), counterparty="Pension"))
+            reactivated = self.end_date - timedelta(days=rng.randrange(1, 5))
+            wire = rng.uniform(10000, 20000)
+            withdrawal = wire * rng.uniform(0.7, 0.9)
+            self.planted.append(self._txn(c["id"], wire, "credit", reactivated, counterparty="Inbound wire", origin="International"))
+            self.planted.append(self._txn(c["id"], withdrawal, "debit", reactivated + timedelta(hours=6),
+                                          counterparty="ATM withdrawal", location="International", mcc="6011"))
+            months = round((reactivated - dormant_from).days / 30.4)
+            self._alert("A-005", c, f"Account dormant {months} months. Received ${wire:,.0f} inbound wire, "
+                                    f"followed by ${withdrawal:,.0f} ATM withdrawal (international location).")
+    
+    def background_transactions(self, chunk_size):
+        """Ordinary activity for everyone except dormant subjects, yielded in chunks"""
+        rng = self.rng
+        active = [c for c in self.customers if c["id"] not in self.dormant_ids]
+        # Heavy-tailed activity: a few customers account for most transactions
+        activity = [rng.paretovariate(1.2) for _ in active]
+        cum_activity = []
+        total = 0.0
+        for a in activity:
+            total += a
+            cum_activity.append(total)
+        span_seconds = int((self.end_date - self.start_date).total_seconds())
+        
+        remaining = max(self.transaction_count - len(self.planted), 0)
+        while remaining:
+            batch = []
+            for customer in rng.choices(active, cum_weights=cum_activity, k=min(chunk_size, remaining)):
+                date = self.start_date + timedelta(seconds=rng.randrange(span_seconds))
+                roll = rng.random()
+                if roll < 0.08:
+                    row = self._txn(customer["id"], customer["declared_income"] / 12 * rng.uniform(0.9, 1.1),
+                                    "credit", date, counterparty="Salary deposit")
+                elif roll < 0.12:
+                    row = self._txn(customer["id"], rng.lognormvariate(7.5, 1.0), "credit", date,
+                                    counterparty="Transfer in")
+                elif roll < 0.15:
+                    row = self._txn(customer["id"], rng.lognormvariate(6.5, 0.8), "credit", date,
+                                    counterparty="Cash deposit", branch=rng.choice(SYNTHETIC_BRANCHES))
+                else:
+                    row = self._txn(customer["id"], rng.lognormvariate(4.3, 1.1), "debit", date,
+                                    counterparty="Card payment", mcc=rng.choice(SYNTHETIC_MCCS))
+                batch.append(row)
+            remaining -= len(batch)
+            yield batch
+
+
+def load_synthetic_data(customers, transactions, alerts_per_scenario, chunk_size=50_000, seed=42):
+    """
+    Bulk-load a synthetic dataset through Core executemany in chunks.
+    Secondary indexes are dropped during the load and rebuilt by migrate_db(),
+    and customer features (which the bulk path bypasses) are rebuilt in batch.
+    """
+    print("\n" + "="*60)
+    print("LOADING SYNTHETIC DATA")
+    print("="*60 + "\n")
+    
+    started = time.perf_counter()
+    generator = SyntheticDataGenerator(customers, transactions, alerts_per_scenario, seed=seed)
+    generator.build_customers()
+    generator.plant_signals()
+    
+    indexed_tables = [Transaction.__table__, Alert.__table__]
+    with engine.begin() as conn:
+        for table in indexed_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        
+        for start in range(0, len(generator.customers), chunk_size):
+            conn.execute(Customer.__table__.insert(), generator.customers[start:start + chunk_size])
+        print(f"  ✓ Loaded {len(generator.customers):,} customers")
+        
+        conn.execute(Transaction.__table__.insert(), generator.planted)
+        if generator.links:
+            conn.execute(LinkedAccount.__table__.insert(), generator.links)
+        conn.execute(Alert.__table__.insert(), generator.alerts)
+        print(f"  ✓ Loaded {len(generator.alerts):,} alerts with {len(generator.planted):,} planted transactions")
+    
+    loaded = len(generator.planted)
+    for batch in generator.background_transactions(chunk_size):
+        with engine.begin() as conn:
+            conn.execute(Transaction.__table__.insert(), batch)
+        loaded += len(batch)
+        rate = loaded / (time.perf_counter() - started)
+        print(f"  … {loaded:,}/{transactions:,} transactions ({rate:,.0f} rows/s)", end="\r")
+    print()
+    
+    print("Rebuilding indexes...")
+    migrate_db()
+    
+    print("Rebuilding customer features...")
+    rebuild_customer_features()
+    
+    print(f"\n✓ Synthetic load finished in {time.perf_counter() - started:.1f}s")
+    return generator
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the AARS database")
+    parser.add_argument("--synthetic", action="store_true", help="also bulk-load a synthetic dataset")
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--alerts-per-scenario", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
     seed_database()
+    if args.synthetic:
+        load_synthetic_data(args.customers, args.transactions, args.alerts_per_scenario,
+                            chunk_size=args.chunk_size, seed=args.seed)
+
@@ -0,0 +1,203 @@
+"""Customer feature store - derived SOP features kept in the customer_features table"""
+
+from datetime import timedelta
+import pandas as pd
+from sqlalchemy import event, select, delete, insert, func, and_, or_
+from sqlalchemy.orm import Session
+from database.connection import engine
+from database.models import Customer, CustomerFeatures, Transaction
+from config import (
+    DEPOSIT_TXN_TYPES,
+    HIGH_VALUE_TXN_THRESHOLD,
+    FEATURE_WINDOW_DAYS,
+    VELOCITY_WINDOW_HOURS,
+    FEATURE_DEPOSIT_WINDOW_DAYS,
+    DORMANCY_THRESHOLD_MONTHS,
+)
+
+# Customers per batched window query
+LOAD_BATCH_SIZE = 500
+DAYS_PER_MONTH = 30.44
+
+
+def _load_windows(conn, customer_ids):
+    """
+    Transactions inside each customer's feature window (ending at their latest
+    transaction), the last transaction date before it, and declared incomes.
+    """
+    latest = conn.execute(
+        select(Transaction.customer_id, func.max(Transaction.date))
+        .where(Transaction.customer_id.in_(customer_ids))
+        .group_by(Transaction.customer_id)
+    ).all()
+    if not latest:
+        return None, {}, {}
+    
+    window = timedelta(days=FEATURE_WINDOW_DAYS)
+    rows = conn.execute(
+        select(Transaction.customer_id, Transaction.date, Transaction.amount, Transaction.type)
+        .where(or_(*(
+            and_(Transaction.customer_id == customer_id, Transaction.date >= latest_date - window)
+            for customer_id, latest_date in latest
+        )))
+        .order_by(Transaction.customer_id, Transaction.date)
+    ).all()
+    prior = dict(conn.execute(
+        select(Transaction.customer_id, func.max(Transaction.date))
+        .where(or_(*(
+            and_(Transaction.customer_id == customer_id, Transaction.date < latest_date - window)
+            for customer_id, latest_date in latest
+        )))
+        .group_by(Transaction.customer_id)
+    ).all())
+    incomes = dict(conn.execute(
+        select(Customer.id, Customer.declared_income).where(Customer.id.in_(customer_ids))
+    ).all())
+    
+    frame = pd.DataFrame(rows, columns=["customer_id", "date", "amount", "type"])
+    return frame, prior, incomes
+
+
+def _rolling_peak(rows, window):
+    """Largest count and sum of amounts inside any time window, per customer"""
+    if rows.empty:
+        return pd.DataFrame(columns=["count", "sum"], dtype=float)
+    rolled = rows.groupby("customer_id").rolling(window, on="date", closed="both")["amount"].agg(["count", "sum"])
+    return rolled.groupby(level=0).max()
+
+
+def compute_features(frame, prior=None, incomes=None):
+    """
+    Vectorized feature computation over windowed transactions of many customers.
+    `frame` has customer_id, date, amount, type sorted by (customer_id, date);
+    `prior` maps customer_id -> last transaction date before the window.
+    Returns one row per customer, indexed by customer_id.
+    """
+    prior = prior or {}
+    incomes = incomes or {}
+    frame = frame.assign(date=pd.to_datetime(frame["date"]), amount=frame["amount"].fillna(0.0))
+    customers = frame["customer_id"]
+    deposit = frame["type"].fillna("").str.lower().isin(DEPOSIT_TXN_TYPES)
+    high_value = frame["amount"] > HIGH_VALUE_TXN_THRESHOLD
+    
+    features = frame.groupby("customer_id", sort=False).agg(
+        as_of=("date", "max"),
+        txn_count_90d=("amount", "size"),
+        max_txn_90d=("amount", "max"),
+        avg_txn_90d=("amount", "mean"),
+    )
+    features["high_value_count_90d"] = high_value.groupby(customers).sum()
+    features["inflow_90d"] = frame["amount"].where(deposit, 0.0).groupby(customers).sum()
+    features["outflow_90d"] = frame["amount"].where(~deposit, 0.0).groupby(customers).sum()
+    
+    velocity = _rolling_peak(frame[high_value & ~deposit], f"{VELOCITY_WINDOW_HOURS}h")
+    features["velocity_48h_count"] = velocity["count"]
+    features["velocity_48h_total"] = velocity["sum"]
+    features["max_deposits_7d"] = _rolling_peak(frame[deposit], f"{FEATURE_DEPOSIT_WINDOW_DAYS}D")["sum"]
+    
+    # Dormancy: the longest silence ending inside the window, including the
+    # gap from the last transaction before the window to the first inside it
+    previous = frame.groupby("customer_id", sort=False)["date"].shift(1)
+    previous = previous.fillna(pd.to_datetime(customers.map(prior)))
+    gaps = pd.DataFrame({"customer_id": customers, "gap": frame["date"] - previous, "previous": previous}).dropna()
+    longest = gaps.sort_values("gap").groupby("customer_id").tail(1).set_index("customer_id")
+    features["dormancy_months"] = (longest["gap"].dt.days / DAYS_PER_MONTH).astype(int)
+    dormant = longest["previous"][features["dormancy_months"].reindex(longest.index) >= DORMANCY_THRESHOLD_MONTHS]
+    features["last_activity_before_reactivation"] = dormant
+    
+    income = pd.to_numeric(features.index.to_series().map(incomes), errors="coerce")
+    annual_inflow = features["inflow_90d"] * (365 / FEATURE_WINDOW_DAYS)
+    features["income_flow_ratio"] = (annual_inflow / income.where(income > 0)).round(3)
+    
+    counts = ["high_value_count_90d", "velocity_48h_count", "dormancy_months"]
+    amounts = ["max_txn_90d", "avg_txn_90d", "velocity_48h_total", "inflow_90d", "outflow_90d", "max_deposits_7d"]
+    features[counts] = features[counts].fillna(0).astype(int)
+    features[amounts] = features[amounts].fillna(0.0).round(2)
+    return features
+
+
+def _to_records(features):
+    records = []
+    for customer_id, row in features.iterrows():
+        record = {"customer_id": customer_id}
+        for column, value in row.items():
+            if isinstance(value, pd.Timestamp):
+                value = value.to_pydatetime()
+            elif pd.isna(value):
+                value = None
+            elif hasattr(value, "item"):
+                value = value.item()
+            record[column] = value
+        records.append(record)
+    return records
+
+
+def compute_customer_features(customer_id, conn):
+    """
+    One customer's features computed from its transactions without storing
+    them, in the CustomerFeatures.to_dict() shape; None without transactions.
+    For readers that find no stored row - only this module writes the table.
+    """
+    frame, prior, incomes = _load_windows(conn, [customer_id])
+    if frame is None:
+        return None
+    record = _to_records(compute_features(frame, prior, incomes))[0]
+    for key in ("as_of", "last_activity_before_reactivation"):
+        if record.get(key) is not None:
+            record[key] = record[key].isoformat()
+    return record
+
+
+def refresh_customer_features(customer_ids, conn):
+    """Recompute and store features for the given customers on an open connection"""
+    customer_ids = list(customer_ids)
+    refreshed = 0
+    for start in range(0, len(customer_ids), LOAD_BATCH_SIZE):
+        batch = customer_ids[start:start + LOAD_BATCH_SIZE]
+        conn.execute(delete(CustomerFeatures).where(CustomerFeatures.customer_id.in_(batch)))
+        frame, prior, incomes = _load_windows(conn, batch)
+        if frame is None:
+            continue
+        records = _to_records(compute_features(frame, prior, incomes))
+        conn.execute(insert(CustomerFeatures), records)
+        refreshed += len(records)
+    return refreshed
+
+
+def rebuild_customer_features(bind=None):
+    """Batch rebuild of the whole table, e.g. after a bulk load that bypassed the ORM"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        customer_ids = conn.execute(select(Transaction.customer_id).distinct()).scalars().all()
+        conn.execute(delete(CustomerFeatures))
+        refreshed = refresh_customer_features(customer_ids, conn)
+    print(f"✓ Rebuilt features for {refreshed:,} customers")
+    return refreshed
+
+
+def ensure_customer_features(bind=None):
+    """
+    Build the table once on a database that has none yet, e.g. right after
+    migrate_db() created it on an older database. Returns customers built.
+    """
+    bind = bind or engine
+    with bind.connect() as conn:
+        if conn.execute(select(CustomerFeatures.customer_id).limit(1)).first() is not None:
+            return 0
+    return rebuild_customer_features(bind)
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session, flush_context):
+    """Keep features current for customers whose transactions changed in this flush"""
+    touched = {
+        obj.customer_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Transaction)
+    }
+    if touched:
+        refresh_customer_features(touched, session.connection())
+
+
+if __name__ == "__main__":
+    rebuild_customer_features()
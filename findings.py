@@ -0,0 +1,82 @@
+"""Structured agent findings - construction and compact prompt rendering"""
+
+# Key metrics lifted from each tool's evidence into a finding: (metric, result key)
+FINDING_METRICS = {
+    "db_query_history": (
+        ("total_transactions", "total_transactions"),
+        ("max_txn_90d", "historical_max_txn"),
+        ("velocity_48h_count", "velocity_48h_count"),
+        ("velocity_48h_total", "velocity_48h_total"),
+        ("income_flow_ratio", "income_flow_ratio"),
+        ("max_deposits_7d", "max_deposits_7d"),
+    ),
+    "check_linked_accounts": (
+        ("linked_account_count", "linked_account_count"),
+        ("linked_deposits_7d", "aggregate_recent_deposits"),
+    ),
+    "check_account_dormancy": (
+        ("is_dormant", "is_dormant"),
+        ("dormant_months", "dormant_months"),
+    ),
+    "get_kyc_profile": (
+        ("occupation", "occupation"),
+        ("declared_income", "declared_income"),
+        ("risk_rating", "risk_rating"),
+    ),
+    "search_adverse_media": (
+        ("adverse_media_hits", "hits"),
+    ),
+}
+
+AGENT_LABELS = {
+    "investigator": "Investigator",
+    "context_gatherer": "Context Gatherer",
+    "adjudicator": "Adjudicator",
+}
+
+
+def _metrics(evidence):
+    metrics = {}
+    for tool_name, result in evidence.items():
+        if tool_name == "sanctions_lookup":
+            strongest = max(result.values(), key=lambda r: r.get("confidence", 0))
+            metrics["sanctions_match"] = strongest.get("match_type")
+            metrics["sanctions_confidence"] = strongest.get("confidence")
+            continue
+        for metric, key in FINDING_METRICS.get(tool_name, ()):
+            if result.get(key) is not None:
+                metrics[metric] = result[key]
+    return metrics
+
+
+def make_finding(agent, summary, evidence=None, status="ok", metrics=None):
+    """
+    One Finding record: which agent, ok/deferred, its prose summary, key metrics
+    (taken from the tool evidence unless given) and the evidence it rests on
+    (keys into AgentState.evidence).
+    """
+    evidence = evidence or {}
+    return {
+        "agent": agent,
+        "status": status,
+        "summary": summary,
+        "metrics": metrics if metrics is not None else _metrics(evidence),
+        "evidence_refs": sorted(evidence)
+    }
+
+
+def render_finding(finding, detail=True):
+    """`[Agent] status | k=v, ... | summary` - the summary only with detail=True"""
+    parts = [f"[{AGENT_LABELS.get(finding['agent'], finding['agent'])}] {finding['status']}"]
+    if finding["metrics"]:
+        parts.append(", ".join(f"{k}={v}" for k, v in finding["metrics"].items()))
+    if detail or finding["status"] != "ok":
+        parts.append(finding["summary"])
+    return " | ".join(parts)
+
+
+def render_findings(findings, detail=True, empty="No findings yet"):
+    """Prompt text for a list of findings; detail=False keeps one short line per finding"""
+    if not findings:
+        return empty
+    return "\n".join(render_finding(f, detail) for f in findings)
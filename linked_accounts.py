@@ -0,0 +1,210 @@
+"""Linked-account graph - adjacency index, bounded BFS and rolling deposit aggregates"""
+
+import bisect
+import threading
+from collections import defaultdict, deque
+from datetime import timedelta
+from sqlalchemy import event, func, and_, or_
+from sqlalchemy.orm import Session, object_session
+from database.connection import get_db_session
+from database.models import LinkedAccount, Transaction
+from config import DEPOSIT_TXN_TYPES, LINKED_DEPOSIT_WINDOW_DAYS
+
+# Accounts per batched deposit-window query
+LOAD_BATCH_SIZE = 500
+
+# session.info key for graph updates waiting on the session's commit
+PENDING_KEY = "linked_account_updates"
+
+
+def is_deposit(txn_type):
+    return (txn_type or "").lower() in DEPOSIT_TXN_TYPES
+
+
+class RollingDepositWindow:
+    """
+    Deposits inside a fixed window ending at the account's latest deposit,
+    with a running total. Adding a deposit evicts what fell out of the window,
+    so the total is never recomputed from raw transactions.
+    """
+    
+    def __init__(self, window_days=LINKED_DEPOSIT_WINDOW_DAYS):
+        self.window = timedelta(days=window_days)
+        self._dates = []
+        self._amounts = []
+        self.total = 0.0
+    
+    @property
+    def latest(self):
+        return self._dates[-1] if self._dates else None
+    
+    def add(self, date, amount):
+        if self._dates and date < self._dates[-1] - self.window:
+            return
+        pos = bisect.bisect_right(self._dates, date)
+        self._dates.insert(pos, date)
+        self._amounts.insert(pos, amount)
+        self.total += amount
+        
+        cutoff = self._dates[-1] - self.window
+        drop = bisect.bisect_left(self._dates, cutoff)
+        if drop:
+            self.total -= sum(self._amounts[:drop])
+            del self._dates[:drop]
+            del self._amounts[:drop]
+    
+    def total_as_of(self, as_of):
+        """Deposits within the window ending at as_of"""
+        if self.latest is None:
+            return 0.0
+        if as_of >= self.latest and self._dates[0] >= as_of - self.window:
+            return self.total
+        lo = bisect.bisect_left(self._dates, as_of - self.window)
+        hi = bisect.bisect_right(self._dates, as_of)
+        return sum(self._amounts[lo:hi])
+
+
+class LinkedAccountGraph:
+    """
+    Undirected adjacency index over LinkedAccount rows plus a RollingDepositWindow
+    per account. Windows are loaded lazily in batched queries and then kept
+    current by record_transaction().
+    """
+    
+    def __init__(self, window_days=LINKED_DEPOSIT_WINDOW_DAYS):
+        self.window_days = window_days
+        self._adjacency = defaultdict(dict)
+        self._windows = {}
+        self._lock = threading.RLock()
+    
+    @classmethod
+    def from_database(cls):
+        graph = cls()
+        with get_db_session() as db:
+            rows = db.query(
+                LinkedAccount.customer_id,
+                LinkedAccount.linked_account_id,
+                LinkedAccount.relationship_type
+            ).all()
+        for customer_id, linked_id, relationship_type in rows:
+            graph.add_link(customer_id, linked_id, relationship_type)
+        return graph
+    
+    def add_link(self, account_id, linked_account_id, relationship_type=None):
+        with self._lock:
+            self._adjacency[account_id][linked_account_id] = relationship_type
+            self._adjacency[linked_account_id][account_id] = relationship_type
+    
+    def record_transaction(self, account_id, txn_type, date, amount):
+        """Fold a newly booked transaction into an already-loaded window"""
+        if not is_deposit(txn_type) or date is None:
+            return
+        with self._lock:
+            window = self._windows.get(account_id)
+            if window is not None:
+                window.add(date, amount or 0.0)
+    
+    def traverse(self, account_id, max_depth, max_nodes):
+        """Breadth-first walk; returns [(account, depth, relationship_type)] excluding the start"""
+        with self._lock:
+            seen = {account_id}
+            queue = deque([(account_id, 0)])
+            found = []
+            while queue and len(found) < max_nodes:
+                current, depth = queue.popleft()
+                if depth == max_depth:
+                    continue
+                for neighbour, relationship_type in self._adjacency.get(current, {}).items():
+                    if neighbour in seen:
+                        continue
+                    seen.add(neighbour)
+                    found.append((neighbour, depth + 1, relationship_type))
+                    queue.append((neighbour, depth + 1))
+                    if len(found) >= max_nodes:
+                        break
+            return found
+    
+    def deposit_windows(self, account_ids):
+        """RollingDepositWindow per account, loading missing ones in batched queries"""
+        with self._lock:
+            missing = [a for a in account_ids if a not in self._windows]
+        
+        for start in range(0, len(missing), LOAD_BATCH_SIZE):
+            loaded = self._load_windows(missing[start:start + LOAD_BATCH_SIZE])
+            with self._lock:
+                for account_id, window in loaded.items():
+                    self._windows.setdefault(account_id, window)
+        
+        with self._lock:
+            return {a: self._windows[a] for a in account_ids}
+    
+    def _load_windows(self, account_ids):
+        windows = {a: RollingDepositWindow(self.window_days) for a in account_ids}
+        deposit_filter = func.lower(Transaction.type).in_(DEPOSIT_TXN_TYPES)
+        
+        with get_db_session() as db:
+            latest = db.query(Transaction.customer_id, func.max(Transaction.date)).filter(
+                Transaction.customer_id.in_(account_ids), deposit_filter
+            ).group_by(Transaction.customer_id).all()
+            if not latest:
+                return windows
+            
+            window = timedelta(days=self.window_days)
+            rows = db.query(Transaction.customer_id, Transaction.date, Transaction.amount).filter(
+                deposit_filter,
+                or_(*(
+                    and_(Transaction.customer_id == account_id, Transaction.date >= latest_date - window)
+                    for account_id, latest_date in latest
+                ))
+            ).all()
+        
+        for account_id, date, amount in rows:
+            windows[account_id].add(date, amount or 0.0)
+        return windows
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_linked_account_graph():
+    """Process-wide graph, built from the database on first use"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = LinkedAccountGraph.from_database()
+    return _graph
+
+
+def _queue(target, update):
+    """Hold a graph update on the inserting session until its transaction commits"""
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault(PENDING_KEY, []).append(update)
+
+
+@event.listens_for(Transaction, "after_insert")
+def _on_transaction_insert(mapper, connection, target):
+    if _graph is not None:
+        _queue(target, (_graph.record_transaction, target.customer_id, target.type, target.date, target.amount))
+
+
+@event.listens_for(LinkedAccount, "after_insert")
+def _on_link_insert(mapper, connection, target):
+    if _graph is not None:
+        _queue(target, (_graph.add_link, target.customer_id, target.linked_account_id, target.relationship_type))
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session):
+    """Apply queued inserts to the graph once they are durable"""
+    for apply, *args in session.info.pop(PENDING_KEY, ()):
+        apply(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session):
+    """Rolled-back inserts never reach the graph"""
+    session.info.pop(PENDING_KEY, None)
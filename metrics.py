@@ -0,0 +1,288 @@
+"""
+Workflow metrics - per-node and per-tool timing and token accounting
+
+A process-wide LangChain callback handler attached to the compiled workflow
+records every graph node and tool invocation: wall time, prompt/completion
+tokens of the LLM calls made inside it, retries and result size. Records are
+buffered per run and written to the workflow_metrics table when the run ends.
+
+Usage: python metrics.py --kind node --since-hours 24
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import insert, select
+from database.connection import engine
+from database.models import WorkflowMetric
+from resilience import RETRY_EVENT
+
+
+def _size(value):
+    content = getattr(value, "content", value)
+    if isinstance(content, str):
+        return len(content.encode())
+    return len(json.dumps(content, default=str).encode())
+
+
+def _usage(response):
+    """(prompt, completion) tokens of an LLM result"""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not (prompt or completion):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+class MetricsRecorder(BaseCallbackHandler):
+    """
+    Callback handler shared by all runs of a workflow. Nested runs (agent
+    model and tool steps, LLM calls) are attributed to the top-level graph
+    node they run under by following parent run ids.
+    """
+    
+    def __init__(self, bind=None):
+        self.bind = bind or engine
+        self._lock = threading.Lock()
+        self._root = {}  # run_id -> root (graph) run_id
+        self._node = {}  # run_id -> enclosing top-level node run_id
+        self._open = {}  # node/tool run_id -> record being timed
+        self._runs = {}  # root run_id -> {"records": [...], "alert": {...}, "thread_id": ...}
+        self._table_ready = False
+    
+    def _register(self, run_id, parent_run_id):
+        root = self._root.get(parent_run_id, run_id) if parent_run_id else run_id
+        self._root[run_id] = root
+        if parent_run_id in self._node:
+            self._node[run_id] = self._node[parent_run_id]
+        return root
+    
+    def _start(self, run_id, root, kind, name, node):
+        record = {
+            "kind": kind,
+            "name": name,
+            "node": node,
+            "status": "ok",
+            "started_at": datetime.utcnow(),
+            "started": time.perf_counter(),
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "retries": 0,
+            "result_bytes": 0,
+        }
+        self._open[run_id] = record
+        self._runs[root]["records"].append(record)
+        return record
+    
+    def _finish(self, run_id, result=None, error=False):
+        record = self._open.pop(run_id, None)
+        if record is None:
+            return
+        record["wall_ms"] = round((time.perf_counter() - record.pop("started")) * 1000, 3)
+        if error:
+            record["status"] = "error"
+        elif result is not None:
+            record["result_bytes"] = _size(result)
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        with self._lock:
+            root = self._register(run_id, parent_run_id)
+            if parent_run_id is None:
+                self._runs[root] = {"records": [], "alert": {}, "thread_id": metadata.get("thread_id")}
+                return
+            
+            node = metadata.get("langgraph_node")
+            top_level = "|" not in metadata.get("langgraph_checkpoint_ns", "|")
+            if not (node and top_level and kwargs.get("name") == node and root in self._runs):
+                return
+            
+            run = self._runs[root]
+            if isinstance(inputs, dict) and not run["alert"]:
+                run["alert"] = inputs.get("alert_data") or {}
+            self._node[run_id] = run_id
+            record = self._start(run_id, root, "node", node, node)
+            # A node run right after a failed run of the same node is a retry
+            previous = [r for r in run["records"][:-1] if r["kind"] == "node" and r["name"] == node]
+            if previous and previous[-1]["status"] == "error":
+                record["retries"] = previous[-1]["retries"] + 1
+    
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            record = self._open.get(run_id)
+            statuses = (outputs.get("agent_status") or {}).values() if isinstance(outputs, dict) else ()
+            if record and "deferred" in statuses:
+                record["status"] = "deferred"
+            self._finish(run_id, outputs)
+            root = self._root.get(run_id)
+            done = self._runs.pop(run_id, None) if root == run_id else None
+        if done:
+            self._flush(done)
+    
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._finish(run_id, error=True)
+            done = self._runs.pop(run_id, None) if self._root.get(run_id) == run_id else None
+        if done:
+            self._flush(done)
+    
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            root = self._register(run_id, parent_run_id)
+            if root not in self._runs:
+                return
+            node_run = self._open.get(self._node.get(run_id))
+            name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+            self._start(run_id, root, "tool", name, node_run["name"] if node_run else None)
+    
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        with self._lock:
+            self._finish(run_id, output)
+    
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._finish(run_id, error=True)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._register(run_id, parent_run_id)
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._register(run_id, parent_run_id)
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt, completion = _usage(response)
+        with self._lock:
+            record = self._open.get(self._node.get(run_id))
+            if record:
+                record["prompt_tokens"] += prompt
+                record["completion_tokens"] += completion
+    
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        with self._lock:
+            record = self._open.get(self._node.get(run_id))
+            if record:
+                record["retries"] += 1
+    
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        # Nodes retry their agent calls in-process (resilience.call_with_retry)
+        if name != RETRY_EVENT:
+            return
+        with self._lock:
+            record = self._open.get(self._node.get(run_id))
+            if record:
+                record["retries"] += 1
+    
+    def _flush(self, run):
+        """Write one finished run's records; metrics never fail the workflow"""
+        with self._lock:
+            finished = {run_id for run_id, root in self._root.items() if self._runs.get(root) is None}
+            for run_id in finished:
+                self._root.pop(run_id, None)
+                self._node.pop(run_id, None)
+        
+        alert = run["alert"]
+        rows = [
+            {
+                **{k: v for k, v in record.items() if k != "started"},
+                "wall_ms": record.get("wall_ms", 0.0),
+                "thread_id": run["thread_id"] or "unknown",
+                "alert_id": alert.get("alert_id"),
+                "scenario_code": alert.get("scenario_code"),
+            }
+            for record in run["records"]
+        ]
+        if not rows:
+            return
+        try:
+            if not self._table_ready:
+                WorkflowMetric.__table__.create(bind=self.bind, checkfirst=True)
+                self._table_ready = True
+            with self.bind.begin() as conn:
+                conn.execute(insert(WorkflowMetric), rows)
+        except Exception as e:
+            print(f"⚠️  Could not store workflow metrics: {e}")
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_metrics_recorder():
+    """Process-wide recorder, created on first use"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = MetricsRecorder()
+    return _recorder
+
+
+def load_metrics(kind=None, since=None, thread_id=None, bind=None):
+    """workflow_metrics rows as a DataFrame, optionally filtered"""
+    query = select(WorkflowMetric.__table__)
+    if kind:
+        query = query.where(WorkflowMetric.kind == kind)
+    if since:
+        query = query.where(WorkflowMetric.started_at >= since)
+    if thread_id:
+        query = query.where(WorkflowMetric.thread_id == thread_id)
+    with (bind or engine).connect() as conn:
+        return pd.DataFrame(conn.execute(query).mappings().all())
+
+
+def latency_percentiles(kind="node", by=("name", "scenario_code"), since=None, thread_id=None, bind=None):
+    """
+    p50/p95/p99 wall time (ms) per group - by default per node and scenario -
+    with invocation counts, failures (errors, of which deferred after retries),
+    mean tokens, retries and result size.
+    """
+    frame = load_metrics(kind, since, thread_id, bind)
+    if frame.empty:
+        return frame
+    
+    by = list(by)
+    frame[by] = frame[by].fillna("-")
+    grouped = frame.groupby(by)
+    summary = grouped["wall_ms"].quantile([0.5, 0.95, 0.99]).unstack()
+    summary.columns = ["p50_ms", "p95_ms", "p99_ms"]
+    summary.insert(0, "count", grouped.size())
+    summary["errors"] = grouped["status"].apply(lambda s: int(s.isin(["error", "deferred"]).sum()))
+    summary["deferred"] = grouped["status"].apply(lambda s: int((s == "deferred").sum()))
+    summary["retries"] = grouped["retries"].sum()
+    summary["avg_prompt_tokens"] = grouped["prompt_tokens"].mean()
+    summary["avg_completion_tokens"] = grouped["completion_tokens"].mean()
+    summary["avg_result_bytes"] = grouped["result_bytes"].mean()
+    return summary.round(1).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=["node", "tool"], default="node")
+    parser.add_argument("--by", default="name,scenario_code", help="comma-separated grouping columns")
+    parser.add_argument("--since-hours", type=float, help="only invocations started in the last N hours")
+    parser.add_argument("--thread", help="only this thread_id")
+    args = parser.parse_args()
+    
+    since = datetime.utcnow() - timedelta(hours=args.since_hours) if args.since_hours else None
+    summary = latency_percentiles(args.kind, args.by.split(","), since, args.thread)
+    if summary.empty:
+        print("No workflow metrics recorded yet")
+        return
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Retry policy and circuit breaker for agent calls
+
+Agent nodes run their LLM/tool work through call_with_retry: a bounded number
+of attempts per node with exponential backoff and full jitter. All nodes and
+alerts in the process share one circuit breaker, so once the upstream is
+failing consistently every in-flight alert fails fast instead of burning its
+attempts. A node that gives up reports "deferred"; the supervisor then closes
+the run with a DEFERRED resolution and the alert goes back to the queue.
+Only transient errors (RETRY_TRANSIENT_ERRORS) are retried and counted by
+the breaker; any other error is raised from the first attempt.
+"""
+
+import importlib
+import random
+import threading
+import time
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_NODE_ATTEMPTS,
+    RETRY_BACKOFF_BASE_SECONDS,
+    RETRY_BACKOFF_MAX_SECONDS,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    RETRY_TRANSIENT_ERRORS,
+)
+
+DEFERRED = "DEFERRED"
+RETRY_EVENT = "aars_retry"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+
+
+class RetriesExhausted(Exception):
+    """A node used all its attempts; wraps the last error"""
+    
+    def __init__(self, node, attempts, error):
+        super().__init__(f"{node} failed after {attempts} attempt(s): {error}")
+        self.node = node
+        self.attempts = attempts
+        self.error = error
+
+
+def load_error_types(names):
+    """Exception classes for module.Class names (classes pass through); names whose module is not installed are skipped"""
+    types = []
+    for name in names:
+        if isinstance(name, type):
+            types.append(name)
+            continue
+        module, _, attr = name.rpartition(".")
+        try:
+            types.append(getattr(importlib.import_module(module), attr))
+        except (ImportError, AttributeError):
+            continue
+    return tuple(types)
+
+
+class RetryPolicy:
+    """Attempt limits per node, the backoff between attempts and which errors are retried"""
+    
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, node_attempts=None,
+                 base_seconds=RETRY_BACKOFF_BASE_SECONDS, max_seconds=RETRY_BACKOFF_MAX_SECONDS,
+                 transient_errors=None):
+        self.max_attempts = max_attempts
+        self.node_attempts = dict(RETRY_NODE_ATTEMPTS if node_attempts is None else node_attempts)
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self._transient_names = RETRY_TRANSIENT_ERRORS if transient_errors is None else transient_errors
+        self._transient = None
+    
+    @property
+    def transient_errors(self):
+        """Tuple of retried exception types, resolved on first use (importing openai is slow)"""
+        if self._transient is None:
+            self._transient = load_error_types(self._transient_names)
+        return self._transient
+    
+    def attempts_for(self, node):
+        return max(1, self.node_attempts.get(node, self.max_attempts))
+    
+    def backoff(self, attempt):
+        """Seconds to wait after failed attempt number `attempt` (1-based): full jitter"""
+        return random.uniform(0, min(self.max_seconds, self.base_seconds * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_seconds`, letting one trial call through; the
+    trial's outcome closes or re-opens it. Thread-safe; shared process-wide.
+    """
+    
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.rejected = 0
+        self.opened = 0
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+    
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+    
+    def allow(self):
+        """Whether a call may go out now; raises CircuitOpenError otherwise"""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"Upstream circuit open after {self._failures} consecutive failures; "
+                               f"next trial in {retry_in:.0f}s")
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_running
+            self._trial_running = False
+            if reopen or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                print(f"⛔ Circuit opened after {self._failures} consecutive failures "
+                      f"(fail fast for {self.reset_seconds:.0f}s)")
+    
+    def release(self):
+        """Give back a half-open trial slot after a call that says nothing about the upstream"""
+        with self._lock:
+            self._trial_running = False
+    
+    def reset(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self.opened,
+                "calls_rejected": self.rejected
+            }
+
+
+retry_policy = RetryPolicy()
+upstream_circuit = CircuitBreaker()
+
+
+def _report_retry(node, attempt, error):
+    """Tell the run's callbacks (MetricsRecorder) that the node is retrying; a no-op outside a graph run"""
+    from langchain_core.callbacks.manager import dispatch_custom_event
+    
+    try:
+        dispatch_custom_event(RETRY_EVENT, {"node": node, "attempt": attempt, "error": str(error)})
+    except RuntimeError:
+        pass
+
+
+def call_with_retry(node, fn, policy=None, breaker=None):
+    """
+    fn() with up to policy.attempts_for(node) attempts, backing off between
+    them. Every attempt goes through the breaker; an open circuit ends the
+    retries at once. Each retry is reported to the run's callbacks as a
+    RETRY_EVENT custom event. Raises RetriesExhausted (with the last error)
+    once transient errors use up the attempts; any other error is re-raised
+    as is, without a retry or a breaker failure.
+    """
+    policy = policy or retry_policy
+    breaker = breaker or upstream_circuit
+    attempts = policy.attempts_for(node)
+    
+    for attempt in range(1, attempts + 1):
+        try:
+            breaker.allow()
+        except CircuitOpenError as e:
+            raise RetriesExhausted(node, attempt - 1, e) from e
+        
+        try:
+            result = fn()
+        except policy.transient_errors as e:
+            breaker.record_failure()
+            if attempt == attempts:
+                raise RetriesExhausted(node, attempt, e) from e
+            delay = policy.backoff(attempt)
+            _report_retry(node, attempt, e)
+            print(f"⚠️  {node} attempt {attempt}/{attempts} failed: {e} - retrying in {delay:.1f}s")
+            time.sleep(delay)
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+def deferred_resolution(agents, reasons):
+    """Resolution for a run ended early because agents could not complete"""
+    return {
+        "action": DEFERRED,
+        "rationale": f"Deferred - {', '.join(agents)} unavailable: {'; '.join(reasons)}. Alert returned to the queue.",
+        "confidence": 0.0,
+        "sop_rule_applied": None,
+        "decided_by": "resilience"
+    }
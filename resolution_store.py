@@ -0,0 +1,105 @@
+"""
+Resolution store - append-only alert resolutions with their step history
+
+Each finished resolve run is one INSERT into alert_resolutions; existing rows
+are never rewritten. A final (non-deferred) resolution also moves the alert
+to RESOLVED in the same transaction, so batch runs do not pick it up again.
+Readers fetch only what they show: the IDs of resolved
+alerts, and one alert's latest resolution when it is opened.
+"""
+
+import json
+import os
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from database.connection import engine
+from database.models import Alert, AlertResolution
+from resilience import DEFERRED
+
+LEGACY_HISTORY_FILE = "checkpoints/workflow_histories.json"
+
+
+def record_resolution(alert_data, resolution, step_history=None, findings=None, thread_id=None, bind=None):
+    """Append one run's outcome; returns the new row id"""
+    action = resolution["action"]
+    row = {
+        "alert_id": alert_data["alert_id"],
+        "decision": action,
+        "rationale": resolution.get("rationale") or "",
+        "confidence": resolution.get("confidence") or 0.0,
+        "action_executed": None if action == DEFERRED else action,
+        "investigation_facts": findings or [],
+        "context_data": alert_data,
+        "thread_id": thread_id,
+        "decided_by": resolution.get("decided_by"),
+        "sop_rule_applied": resolution.get("sop_rule_applied"),
+        "step_history": step_history or [],
+    }
+    with (bind or engine).begin() as conn:
+        row_id = conn.execute(insert(AlertResolution), row).inserted_primary_key[0]
+        if action != DEFERRED:
+            conn.execute(update(Alert).where(Alert.id == alert_data["alert_id"]).values(status="RESOLVED"))
+        return row_id
+
+
+def resolved_alert_ids(bind=None):
+    """Alerts with at least one non-deferred resolution"""
+    query = select(AlertResolution.alert_id).where(AlertResolution.decision != DEFERRED).distinct()
+    with (bind or engine).connect() as conn:
+        return set(conn.execute(query).scalars())
+
+
+def latest_resolution(alert_id, include_deferred=False, bind=None):
+    """The alert's most recent resolution as a dict (AlertResolution.to_dict), or None"""
+    query = select(AlertResolution).where(AlertResolution.alert_id == alert_id)
+    if not include_deferred:
+        query = query.where(AlertResolution.decision != DEFERRED)
+    query = query.order_by(AlertResolution.id.desc()).limit(1)
+    with Session(bind or engine) as session:
+        row = session.scalars(query).first()
+        return row.to_dict() if row else None
+
+
+def clear_resolutions(alert_id=None, bind=None):
+    """Delete one alert's resolutions, or all of them (UI reset), and put those alerts back to PENDING; returns rows removed"""
+    query = delete(AlertResolution)
+    reopen = update(Alert).where(Alert.status == "RESOLVED").values(status="PENDING")
+    if alert_id:
+        query = query.where(AlertResolution.alert_id == alert_id)
+        reopen = reopen.where(Alert.id == alert_id)
+    with (bind or engine).begin() as conn:
+        removed = conn.execute(query).rowcount
+        conn.execute(reopen)
+        return removed
+
+
+def import_legacy_histories(path=LEGACY_HISTORY_FILE, bind=None):
+    """
+    One-time move of the old workflow_histories.json into alert_resolutions.
+    Alerts that already have rows are skipped; the file is renamed to
+    *.imported afterwards. Returns the number of rows written.
+    """
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as f:
+            histories = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read {path}: {e}")
+        return 0
+    
+    with (bind or engine).connect() as conn:
+        known = set(conn.execute(select(AlertResolution.alert_id).distinct()).scalars())
+    
+    imported = 0
+    for alert_id, history in histories.items():
+        resolution = next((m.get("data") for m in history if m.get("role") == "resolution"), None)
+        if alert_id in known or not resolution:
+            continue
+        record_resolution({"alert_id": alert_id}, resolution, step_history=history, bind=bind)
+        imported += 1
+    
+    os.replace(path, f"{path}.imported")
+    print(f"✓ Imported {imported} workflow histories from {path}")
+    return imported
+
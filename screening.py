@@ -0,0 +1,271 @@
+"""Sanctions screening - fuzzy name matching over the SanctionsEntity watchlist"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import chain, islice
+from functools import lru_cache
+from database.connection import get_db_session
+from database.models import SanctionsEntity
+from config import (
+    SANCTIONS_MIN_SCORE,
+    SANCTIONS_MAX_CANDIDATES,
+    SANCTIONS_BLOCKING_MAX_DF,
+    SANCTIONS_COMMON_NAME_DAMPING,
+)
+
+# Legal forms and honorifics that carry no identifying signal
+NOISE_TOKENS = {
+    "inc", "ltd", "llc", "plc", "co", "corp", "company", "limited", "gmbh", "sa",
+    "the", "mr", "mrs", "ms", "dr",
+}
+
+# Spelling folds applied to every token so common transliteration variants
+# (Mohammed/Muhammad, Mahmud/Mahmoud, Yusuf/Youssef) share a skeleton
+TRANSLITERATION_FOLDS = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"(kh|q|ck|c(?![eihy]))"), "k"),
+    (re.compile(r"(ou|oo|u)"), "u"),
+    (re.compile(r"(dj|j)"), "y"),
+    (re.compile(r"(ee|ie|ey|y)"), "i"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"^el$"), "al"),
+    (re.compile(r"o"), "u"),
+    (re.compile(r"e"), "a"),
+    (re.compile(r"h(?![aeiou])"), ""),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+
+def normalize_name(name):
+    """Accent-stripped, casefolded, transliteration-folded tokens (order preserved)"""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    ascii_name = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    tokens = []
+    for token in re.split(r"[^a-z0-9]+", ascii_name):
+        if not token or token in NOISE_TOKENS:
+            continue
+        for pattern, replacement in TRANSLITERATION_FOLDS:
+            token = pattern.sub(replacement, token)
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def _deletions(token):
+    """Token plus its single-character deletions (symmetric-delete neighbourhood)"""
+    if len(token) < 4:
+        return {token}
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+@lru_cache(maxsize=200_000)
+def jaro_winkler(a, b):
+    """Jaro-Winkler similarity in [0, 1]; memoized since watchlist tokens repeat heavily"""
+    if a == b:
+        return 1.0
+    if len(a) > len(b):
+        a, b = b, a
+    len_a, len_b = len(a), len(b)
+    if not len_a:
+        return 0.0
+    
+    window = max(len_b // 2 - 1, 0)
+    used_b = bytearray(len_b)
+    matches_a = []
+    for i, ch in enumerate(a):
+        hi = i + window + 1
+        j = b.find(ch, max(0, i - window), hi)
+        while j != -1 and used_b[j]:
+            j = b.find(ch, j + 1, hi)
+        if j != -1:
+            used_b[j] = 1
+            matches_a.append(ch)
+    
+    m = len(matches_a)
+    if not m:
+        return 0.0
+    matches_b = [b[j] for j in range(len_b) if used_b[j]]
+    transpositions = sum(x != y for x, y in zip(matches_a, matches_b)) / 2
+    jaro = (m / len_a + m / len_b + (m - transpositions) / m) / 3
+    
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def _token_similarity(query_tokens, entity_tokens):
+    """Symmetric best-match Jaro-Winkler over tokens, so word order does not matter"""
+    matrix = [
+        [1.0 if q == e else jaro_winkler(q, e) for e in entity_tokens]
+        for q in query_tokens
+    ]
+    query_side = sum(max(row) for row in matrix) / len(query_tokens)
+    entity_side = sum(max(col) for col in zip(*matrix)) / len(entity_tokens)
+    return (query_side + entity_side) / 2
+
+
+class SanctionsScreeningIndex:
+    """
+    In-memory fuzzy screening index over watchlist entries.
+    Names are blocked by folded tokens: each query token is expanded to the
+    watchlist tokens within one edit (symmetric-delete lookup), and the
+    postings of the most selective tokens form the candidate pool. Candidates
+    are pre-ranked by token coverage and rescored with token-level Jaro-Winkler.
+    """
+    
+    # Upper bound on candidates considered when only very common tokens match
+    max_pool = 2000
+    
+    def __init__(self, entities):
+        self.entities = []
+        self._tokens = []
+        self._postings = defaultdict(set)
+        self._deletes = defaultdict(set)
+        self._exact = defaultdict(list)
+        
+        for entity in entities:
+            tokens = normalize_name(entity["name"])
+            if not tokens:
+                continue
+            idx = len(self.entities)
+            self.entities.append(entity)
+            self._tokens.append(tokens)
+            self._exact[" ".join(sorted(tokens))].append(idx)
+            for token in tokens:
+                self._postings[token].add(idx)
+        
+        for token in self._postings:
+            for variant in _deletions(token):
+                self._deletes[variant].add(token)
+        
+        self.max_df = max(SANCTIONS_BLOCKING_MAX_DF, 1)
+    
+    @classmethod
+    def from_database(cls):
+        with get_db_session() as db:
+            rows = db.query(SanctionsEntity).filter(SanctionsEntity.sanctioned == True).all()
+            return cls([row.to_dict() for row in rows])
+    
+    def __len__(self):
+        return len(self.entities)
+    
+    def _similar_tokens(self, token):
+        """Watchlist tokens within one edit of token"""
+        similar = set()
+        for variant in _deletions(token):
+            similar.update(self._deletes.get(variant, ()))
+        return similar
+    
+    def _block(self, tokens):
+        """Counter of candidate -> number of query tokens it matches"""
+        expansions = []
+        for token in set(tokens):
+            similar = self._similar_tokens(token)
+            if similar:
+                df = sum(len(self._postings[t]) for t in similar)
+                expansions.append((df, similar))
+        if not expansions:
+            return Counter()
+        expansions.sort(key=lambda e: e[0])
+        
+        selective = [similar for df, similar in expansions if df <= self.max_df]
+        common = [similar for df, similar in expansions if df > self.max_df]
+        
+        if selective:
+            # Counter counts postings in C; coverage = query tokens matched
+            coverage = Counter(chain.from_iterable(
+                self._postings[t] for similar in selective for t in similar
+            ))
+            pool = set(coverage)
+        else:
+            # Only common tokens matched: narrow by intersecting, rarest first
+            pool, coverage = None, Counter()
+            for similar in common:
+                if pool is None and len(common) == 1:
+                    # Nothing left to intersect with: take max_pool ids without building the union
+                    narrowed = set(islice(chain.from_iterable(self._postings[t] for t in similar), self.max_pool))
+                elif pool is None:
+                    narrowed = set().union(*(self._postings[t] for t in similar))
+                else:
+                    # Probe the (small) pool against each posting instead of
+                    # materializing the union of tens of thousands of ids
+                    narrowed = set()
+                    for t in similar:
+                        narrowed |= pool & self._postings[t]
+                if not narrowed:
+                    break
+                pool = narrowed
+            pool = set(list(pool)[:self.max_pool])
+            coverage.update(pool)
+            common = common[1:]
+        
+        # Common tokens only add coverage to candidates already in the pool (set intersections in C)
+        for similar in common:
+            matched = set()
+            for t in similar:
+                matched |= pool & self._postings[t]
+            coverage.update(matched)
+        return coverage
+    
+    def search(self, name, limit=SANCTIONS_MAX_CANDIDATES, min_score=SANCTIONS_MIN_SCORE):
+        """
+        Ranked candidates as dicts of entity fields plus score.
+        min_score applies to name similarity; common names are damped afterwards
+        so they are still reported, just with low confidence.
+        """
+        tokens = normalize_name(name)
+        if not tokens:
+            return []
+        
+        exact = set(self._exact.get(" ".join(sorted(tokens)), ()))
+        coverage = self._block(tokens)
+        
+        # Pre-rank by token coverage; Jaro-Winkler only for the best few
+        prerank = [idx for idx, _ in coverage.most_common(limit + 3)]
+        
+        scored = []
+        for idx in set(prerank) | exact:
+            score = 1.0 if idx in exact else _token_similarity(tokens, self._tokens[idx])
+            if score < min_score:
+                continue
+            if self.entities[idx].get("common_name"):
+                score *= SANCTIONS_COMMON_NAME_DAMPING
+            scored.append((score, idx))
+        
+        scored.sort(reverse=True)
+        return [
+            {**self.entities[idx], "score": round(score, 3)}
+            for score, idx in scored[:limit]
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_screening_index():
+    """Process-wide screening index, built from the database on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SanctionsScreeningIndex.from_database()
+                if not len(index):
+                    from database.seed_data import MOCK_SANCTIONS_ENTITIES
+                    print("⚠️  sanctions_entities is empty - screening against the mock watchlist")
+                    index = SanctionsScreeningIndex(MOCK_SANCTIONS_ENTITIES)
+                _index = index
+    return _index
+
+
+def refresh_screening_index():
+    """Rebuild the index after the watchlist table changes"""
+    global _index
+    with _index_lock:
+        _index = None
+    return get_screening_index()
@@ -0,0 +1,237 @@
+"""SOP decision table - deterministic adjudication over structured tool outputs"""
+
+import json
+import threading
+from collections import Counter
+from langchain_core.messages import ToolMessage
+from config import (
+    DEPOSIT_TXN_TYPES,
+    HIGH_VALUE_TXN_THRESHOLD,
+    SANCTIONS_MATCH_THRESHOLD,
+    SOP_VELOCITY_MIN_COUNT,
+    SOP_INCOME_MISMATCH_RATIO,
+    SOP_STRUCTURING_AGGREGATE,
+)
+
+PRECIOUS_METALS_OCCUPATIONS = ("jewel", "trader", "bullion", "goldsmith")
+LOW_INCOME_OCCUPATIONS = ("teacher", "student")
+
+
+def collect_evidence(messages):
+    """
+    Parsed tool results from an agent run, keyed by tool name. The first
+    successful call of each tool is kept; sanctions lookups are kept per
+    screened name. Results carrying an "error" key are not evidence.
+    """
+    evidence = {}
+    for message in messages:
+        if not isinstance(message, ToolMessage):
+            continue
+        try:
+            result = json.loads(message.content)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(result, dict) or "error" in result:
+            continue
+        
+        if message.name == "sanctions_lookup":
+            evidence.setdefault("sanctions_lookup", {})[result.get("counterparty_name", "")] = result
+        else:
+            evidence.setdefault(message.name, result)
+    return evidence
+
+
+def _rows(table):
+    """Row dicts from a tool table, whether columnar or a plain list"""
+    if isinstance(table, dict) and "columns" in table:
+        return [dict(zip(table["columns"], row)) for row in table["rows"]]
+    return table or []
+
+
+def _occupation(evidence):
+    profile = evidence.get("get_kyc_profile")
+    return (profile.get("occupation") or "").lower() if profile else None
+
+
+# Transaction fields that can carry the international signal (location="International" on ATM withdrawals)
+INTERNATIONAL_FIELDS = ("counterparty", "location", "jurisdiction", "origin")
+
+
+def _international_withdrawal(dormancy):
+    return any(
+        (row.get("type") or "").lower() not in DEPOSIT_TXN_TYPES
+        and any("international" in (row.get(field) or "").lower() for field in INTERNATIONAL_FIELDS)
+        for row in _rows(dormancy.get("recent_transactions"))
+    )
+
+
+# Predicates take (alert_data, evidence) and return True/False, or None when
+# the evidence they need is missing - which makes the whole table inconclusive.
+
+def _velocity_without_history_and_income_mismatch(alert_data, evidence):
+    history = evidence.get("db_query_history")
+    if not history or "velocity_48h_count" not in history:
+        return None
+    if isinstance(history["transactions"], dict) and history["transactions"].get("omitted"):
+        return None  # rows were cut to the output budget; outflows cannot be counted
+    if history["velocity_48h_count"] < SOP_VELOCITY_MIN_COUNT or history.get("income_flow_ratio") is None:
+        return False
+    high_value_outflows = sum(
+        1 for row in _rows(history["transactions"])
+        if row["amount"] > HIGH_VALUE_TXN_THRESHOLD and (row.get("type") or "").lower() not in DEPOSIT_TXN_TYPES
+    )
+    prior_velocity = high_value_outflows > history["velocity_48h_count"]
+    return not prior_velocity and history["income_flow_ratio"] >= SOP_INCOME_MISMATCH_RATIO
+
+
+def _linked_aggregate_over_threshold(alert_data, evidence):
+    linked = evidence.get("check_linked_accounts")
+    if not linked:
+        return None
+    return linked["aggregate_recent_deposits"] > SOP_STRUCTURING_AGGREGATE
+
+
+def _precious_metals_by(occupations):
+    def predicate(alert_data, evidence):
+        occupation = _occupation(evidence)
+        if occupation is None:
+            return None
+        return (
+            "precious metals" in alert_data.get("trigger_details", "").lower()
+            and any(keyword in occupation for keyword in occupations)
+        )
+    return predicate
+
+
+def _confirmed_sanctions_match(alert_data, evidence):
+    lookups = evidence.get("sanctions_lookup")
+    if not lookups:
+        return None
+    return any(result.get("action_required") == "BLOCK_ACCOUNT" for result in lookups.values())
+
+
+def _potential_match_high_risk(alert_data, evidence):
+    return any(
+        result.get("confidence", 0) >= SANCTIONS_MATCH_THRESHOLD
+        and not result.get("match_type", "").startswith("Common Name")
+        and result.get("jurisdiction") == "High-Risk"
+        for result in evidence.get("sanctions_lookup", {}).values()
+    )
+
+
+def _counterparty_cleared(alert_data, evidence):
+    # Only conclusive when the alert's own counterparty was the name screened
+    result = evidence.get("sanctions_lookup", {}).get(alert_data.get("counterparty_name"))
+    if result is None:
+        return None
+    return result["match_type"] == "No Match" or result["match_type"].startswith("Common Name")
+
+
+def _dormant_with(condition):
+    def predicate(alert_data, evidence):
+        dormancy = evidence.get("check_account_dormancy")
+        profile = evidence.get("get_kyc_profile")
+        if not dormancy or not profile:
+            return None
+        return dormancy["is_dormant"] and condition(profile.get("risk_rating"), _international_withdrawal(dormancy))
+    return predicate
+
+
+# The SOP as a decision table: per scenario, rules are tried in order and the
+# first that matches decides. Cases the SOP leaves to judgement (business
+# cycles, legitimate business, unclear matches) have no rule and go to the LLM.
+# (rule_id, action, confidence, description, predicate)
+SOP_RULES = {
+    "A-001": [
+        ("A-001-R1", "ESCALATE_SAR", 0.9,
+         "Velocity spike with no prior high velocity in 90 days and inflows inconsistent with declared income",
+         _velocity_without_history_and_income_mismatch),
+    ],
+    "A-002": [
+        ("A-002-R1", "ESCALATE_SAR", 0.9,
+         f"Deposits across customer and linked accounts aggregate over ${SOP_STRUCTURING_AGGREGATE:,} in 7 days",
+         _linked_aggregate_over_threshold),
+    ],
+    "A-003": [
+        ("A-003-R1", "FalsePositive", 0.9,
+         "Precious metals counterparty consistent with the customer's trade",
+         _precious_metals_by(PRECIOUS_METALS_OCCUPATIONS)),
+        ("A-003-R2", "ESCALATE_SAR", 0.9,
+         "Large precious metals transfer inconsistent with the customer's occupation",
+         _precious_metals_by(LOW_INCOME_OCCUPATIONS)),
+    ],
+    "A-004": [
+        ("A-004-R1", "BLOCK_ACCOUNT", 0.98,
+         "Confirmed sanctions match - immediate block",
+         _confirmed_sanctions_match),
+        ("A-004-R2", "ESCALATE_SAR", 0.85,
+         "Potential sanctions match in a high-risk jurisdiction",
+         _potential_match_high_risk),
+        ("A-004-R3", "FalsePositive", 0.9,
+         "Counterparty screened clear or matched a common name only",
+         _counterparty_cleared),
+    ],
+    "A-005": [
+        ("A-005-R1", "ESCALATE_SAR", 0.9,
+         "Dormant account reactivated with high KYC risk or an international withdrawal",
+         _dormant_with(lambda risk, international: risk == "High" or international)),
+        ("A-005-R2", "RFI", 0.8,
+         "Dormant account reactivated by a low-risk customer - request information",
+         _dormant_with(lambda risk, international: risk == "Low" and not international)),
+    ],
+}
+
+
+class SopStats:
+    """How many adjudications the decision table settled without the LLM"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decided = 0
+        self.deferred = 0
+        self.rules = Counter()
+    
+    def record(self, rule_id):
+        with self._lock:
+            if rule_id:
+                self.decided += 1
+                self.rules[rule_id] += 1
+            else:
+                self.deferred += 1
+    
+    def stats(self):
+        with self._lock:
+            total = self.decided + self.deferred
+            return {
+                "decided_by_rules": self.decided,
+                "deferred_to_llm": self.deferred,
+                "llm_skipped_pct": round(100 * self.decided / total, 1) if total else 0.0,
+                "rules": dict(self.rules)
+            }
+
+
+sop_stats = SopStats()
+
+
+def pre_adjudicate(alert_data, evidence):
+    """
+    Resolution from the decision table, or None when it is inconclusive:
+    no rule matched, or a rule ahead of the match lacked its evidence.
+    """
+    decision = None
+    for rule_id, action, confidence, description, predicate in SOP_RULES.get(alert_data.get("scenario_code"), []):
+        matched = predicate(alert_data, evidence)
+        if matched is None:
+            break
+        if matched:
+            decision = {
+                "action": action,
+                "rationale": f"{description} (deterministic SOP rule {rule_id}).",
+                "confidence": confidence,
+                "sop_rule_applied": rule_id,
+                "decided_by": "sop_rules"
+            }
+            break
+    
+    sop_stats.record(decision["sop_rule_applied"] if decision else None)
+    return decision
@@ -2,16 +2,87 @@
 
 from typing import TypedDict, Annotated
 import operator
+from config import CONVERSATION_KEEP_TURNS, CONVERSATION_SUMMARY_MAX_CHARS, STATE_LOG_MAX_ENTRIES
+
+
+def latest(current, update):
+    """Last write wins; lets parallel branches both hand control back to the supervisor"""
+    return update
+
+
+def merge(current, update):
+    """Dict union; investigator and context_gatherer each add their tools' evidence"""
+    return {**(current or {}), **update}
+
+
+def keep_last(limit):
+    """Append reducer that keeps only the newest `limit` entries (0 = unbounded)"""
+    def reducer(current, update):
+        combined = (current or []) + update
+        return combined[-limit:] if limit else combined
+    return reducer
+
+
+def _clip(text, size):
+    text = " ".join(str(text).split())
+    return text if len(text) <= size else text[:size - 1] + "…"
+
+
+def fold_turns(summary, entries):
+    """
+    Extend a running summary entry with older history entries: one line per
+    turn with the question and the start of the answer. Oldest lines are
+    dropped once the summary exceeds CONVERSATION_SUMMARY_MAX_CHARS; `turns`
+    still counts every turn folded so far.
+    """
+    lines = summary["content"].splitlines() if summary else []
+    turns = summary["turns"] if summary else 0
+    for entry in entries:
+        if entry.get("role") == "user":
+            turns += 1
+            lines.append(f"- Q: {_clip(entry.get('content', ''), 120)}")
+        elif lines:
+            lines[-1] += f" → A: {_clip(entry.get('content', ''), 200)}"
+    while len(lines) > 1 and len("\n".join(lines)) > CONVERSATION_SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    return {"role": "summary", "content": "\n".join(lines), "turns": turns}
+
+
+def compact_history(current, update):
+    """
+    Append, then fold everything but the last CONVERSATION_KEEP_TURNS
+    user/assistant turns into one leading summary entry. Runs as the channel
+    reducer, so the checkpoint of a long conversation thread stays bounded.
+    """
+    history = (current or []) + update
+    summary = history[0] if history and history[0].get("role") == "summary" else None
+    turns = history[1:] if summary else history
+    keep = CONVERSATION_KEEP_TURNS * 2
+    if not keep or len(turns) <= keep:
+        return history
+    return [fold_turns(summary, turns[:-keep])] + turns[-keep:]
+
+
+class Finding(TypedDict):
+    """One agent report in AgentState.findings (see findings.make_finding)"""
+    agent: str  # investigator | context_gatherer | adjudicator
+    status: str  # ok | deferred (gave up after its retries)
+    summary: str  # the agent's prose report, or the error message
+    metrics: dict  # key numbers from the agent's tool results
+    evidence_refs: list  # tool names backing the finding (keys into AgentState.evidence)
 
 
 class AgentState(TypedDict):
     """Shared state across all agents"""
     alert_data: dict
-    findings: Annotated[list, operator.add]
+    findings: Annotated[list[Finding], operator.add]
+    agent_status: Annotated[dict, merge]  # agent -> status of its latest finding
     resolution: dict
-    next: str
-    messages: Annotated[list, operator.add]
+    next: Annotated[str, latest]
+    messages: Annotated[list, keep_last(STATE_LOG_MAX_ENTRIES)]
     mode: str
     user_query: str
-    conversation_history: Annotated[list, operator.add]
+    conversation_history: Annotated[list, compact_history]  # [summary entry] + recent user/assistant turns
     conversation_response: str
+    routing_trace: Annotated[list, keep_last(STATE_LOG_MAX_ENTRIES)]  # one entry per supervisor decision
+    evidence: Annotated[dict, merge]  # parsed tool results by tool name, for SOP rules
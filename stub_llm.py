@@ -0,0 +1,160 @@
+"""Offline stub chat model - scripted tool calls and decisions for benchmarks and tests"""
+
+import json
+import re
+import time
+import uuid
+from typing import Any
+from pydantic import Field
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Action the stub adjudicator takes per scenario (the TEST_ALERTS expectations)
+DEFAULT_DECISIONS = {
+    "A-001": "ESCALATE_SAR",
+    "A-002": "ESCALATE_SAR",
+    "A-003": "FalsePositive",
+    "A-004": "BLOCK_ACCOUNT",
+    "A-005": "ESCALATE_SAR",
+}
+
+
+def _words(text):
+    return re.findall(r"\S+\s*", text) or [text]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI that never leaves the process.
+    - Tool-using agents: the first turn calls every bound tool with arguments
+      read from the prompt (customer id, quoted counterparty); the second turn
+      summarizes the tool results.
+    - Supervisor: routes from the progress shown in its prompt.
+    - Adjudicator: returns the SOP JSON with the scripted decision.
+    Every call sleeps latency_seconds to stand in for network/model time, and
+    text takes stream_delay_seconds per word to generate - delivered word by
+    word when streamed, all at once otherwise.
+    """
+    
+    latency_seconds: float = 0.0
+    stream_delay_seconds: float = 0.0
+    decisions: dict = Field(default_factory=lambda: dict(DEFAULT_DECISIONS))
+    bound_tools: list = Field(default_factory=list)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "aars-stub"
+    
+    @property
+    def _identifying_params(self) -> dict:
+        return {"latency_seconds": self.latency_seconds, "decisions": self.decisions}
+    
+    def bind_tools(self, tools, **kwargs: Any):
+        schemas = [convert_to_openai_tool(t)["function"] for t in tools]
+        return self.model_copy(update={"bound_tools": schemas})
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._reply(messages)
+        if self.stream_delay_seconds and message.content:
+            # Unstreamed answers still take the whole generation time
+            time.sleep(self.stream_delay_seconds * (len(_words(message.content)) - 1))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _reply(self, messages):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        
+        system = "\n".join(m.content for m in messages if isinstance(m, SystemMessage))
+        prompt = "\n".join(m.content for m in messages if isinstance(m.content, str))
+        tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+        
+        if "USER:" in prompt:
+            message = AIMessage(content="Stub answer: the alert evidence is summarized in the investigation findings. "
+                                        "Ask about transactions, KYC, sanctions or linked accounts for details.")
+        elif self.bound_tools and not tool_results:
+            message = AIMessage(content="", tool_calls=self._tool_calls(prompt))
+        elif self.bound_tools:
+            lines = [f"- {m.name}: {m.content[:160]}" for m in tool_results]
+            message = AIMessage(content="FINDINGS:\n" + "\n".join(lines))
+        elif "SUPERVISOR" in system:
+            message = AIMessage(content=json.dumps({"next": self._route(prompt), "reasoning": "Stub routing"}))
+        elif "Adjudicator" in system:
+            message = AIMessage(content=json.dumps(self._decide(prompt)))
+        else:
+            message = AIMessage(content="Stub response")
+        
+        # Rough token counts (~4 characters per token) so accounting works offline
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = (len(message.content) + len(json.dumps(message.tool_calls))) // 4
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return message
+    
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._reply(messages)
+        if message.tool_calls:
+            tool_call_chunks = [
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i, "type": "tool_call_chunk"}
+                for i, c in enumerate(message.tool_calls)
+            ]
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=tool_call_chunks, usage_metadata=message.usage_metadata
+            ))
+            return
+        
+        words = _words(message.content)
+        for i, word in enumerate(words):
+            if i and self.stream_delay_seconds:
+                time.sleep(self.stream_delay_seconds)
+            last = i == len(words) - 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word, usage_metadata=message.usage_metadata if last else None
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+    
+    def _tool_calls(self, prompt):
+        customer = re.search(r"Customer: (\S+)", prompt)
+        counterparty = re.search(r"'([^']+)'", prompt)
+        values = {
+            "customer_id": customer.group(1) if customer else "UNKNOWN",
+            "counterparty_name": counterparty.group(1) if counterparty else (customer.group(1) if customer else ""),
+        }
+        calls = []
+        for schema in self.bound_tools:
+            required = schema.get("parameters", {}).get("required", [])
+            calls.append({
+                "name": schema["name"],
+                "args": {arg: values.get(arg, "") for arg in required},
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "tool_call",
+            })
+        return calls
+    
+    @staticmethod
+    def _route(prompt):
+        if "Mode: conversation" in prompt:
+            return "conversational"
+        if "[Investigator] ok" not in prompt:
+            return "investigator"
+        if "[Context Gatherer] ok" not in prompt:
+            return "context_gatherer"
+        if "No resolution yet" in prompt:
+            return "adjudicator"
+        return "FINISH"
+    
+    def _decide(self, prompt):
+        scenario = re.search(r"Scenario: (A-\d{3})", prompt)
+        code = scenario.group(1) if scenario else "A-001"
+        return {
+            "action": self.decisions.get(code, "RFI"),
+            "rationale": f"Stub decision for {code} from gathered evidence",
+            "confidence": 0.9,
+            "sop_rule_applied": code,
+        }
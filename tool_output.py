@@ -0,0 +1,142 @@
+"""Tool output encoding - compact, budgeted JSON for the agents' context"""
+
+import json
+import threading
+from datetime import datetime
+from config import TOOL_OUTPUT_MAX_BYTES, TOOL_OUTPUT_BUDGETS
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(",", ":"), default=str)
+
+
+def _is_table(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+def _to_columns(rows):
+    """List of row dicts -> {"columns": [...], "rows": [[...], ...]}, dropping all-null columns"""
+    columns = []
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns.append(key)
+    columns = [c for c in columns if any(row.get(c) is not None for row in rows)]
+    return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in rows]}
+
+
+def _columnar(value, tables):
+    """Recursively convert tables to columnar form, collecting them for budgeting"""
+    if isinstance(value, dict):
+        return {key: _columnar(item, tables) for key, item in value.items()}
+    if _is_table(value):
+        table = _to_columns(value)
+        tables.append(table)
+        return table
+    if isinstance(value, list):
+        return [_columnar(item, tables) for item in value]
+    return value
+
+
+def _parse_date(value):
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _summarize(columns, rows):
+    """Counts, numeric sums and date range for rows that did not fit the budget"""
+    summary = {"rows": len(rows)}
+    sums = {}
+    for i, column in enumerate(columns):
+        values = [row[i] for row in rows if row[i] is not None]
+        if not values:
+            continue
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            sums[column] = round(sum(values), 2)
+        elif column.endswith("date") and all(_parse_date(v) for v in values):
+            summary[f"{column}_range"] = [min(values), max(values)]
+    if sums:
+        summary["sums"] = sums
+    return summary
+
+
+def _fit(payload, tables, budget):
+    """Truncate the largest tables until the payload fits, summarizing what was cut"""
+    for table in sorted(tables, key=lambda t: len(_dumps(t)), reverse=True):
+        text = _dumps(payload)
+        if len(text) <= budget:
+            return text
+        
+        rows = table["rows"]
+        if not rows:
+            continue
+        lo, hi = 0, len(rows) - 1  # largest prefix that fits, searched over [0, len - 1]
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            table["rows"], table["omitted"] = rows[:mid], _summarize(table["columns"], rows[mid:])
+            if len(_dumps(payload)) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        table["rows"], table["omitted"] = rows[:lo], _summarize(table["columns"], rows[lo:])
+    return _dumps(payload)
+
+
+class ToolOutputStats:
+    """Running totals of bytes produced vs. the pretty-printed equivalent"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.bytes_baseline = 0
+        self.bytes_encoded = 0
+        self.truncated = 0
+    
+    def record(self, baseline, encoded, truncated):
+        with self._lock:
+            self.calls += 1
+            self.bytes_baseline += baseline
+            self.bytes_encoded += encoded
+            self.truncated += int(truncated)
+    
+    def stats(self):
+        with self._lock:
+            saved = self.bytes_baseline - self.bytes_encoded
+            return {
+                "calls": self.calls,
+                "bytes_baseline": self.bytes_baseline,
+                "bytes_encoded": self.bytes_encoded,
+                "bytes_saved": saved,
+                "saved_pct": round(100 * saved / self.bytes_baseline, 1) if self.bytes_baseline else 0.0,
+                "truncated": self.truncated
+            }
+
+
+tool_output_stats = ToolOutputStats()
+
+
+def encode_tool_output(tool_name, payload, budget=None):
+    """
+    Encode a tool result for the LLM: no indentation, lists of row dicts as
+    a header plus value rows, and rows beyond the tool's byte budget replaced
+    by a summary under "omitted".
+    """
+    budget = budget or TOOL_OUTPUT_BUDGETS.get(tool_name, TOOL_OUTPUT_MAX_BYTES)
+    baseline = len(json.dumps(payload, indent=2, default=str))
+    
+    tables = []
+    compact = _columnar(payload, tables)
+    text = _dumps(compact)
+    truncated = len(text) > budget
+    if truncated:
+        text = _fit(compact, tables, budget)
+    
+    tool_output_stats.record(baseline, len(text), truncated)
+    saved = baseline - len(text)
+    print(f"   ↳ Output: {len(text)} bytes, saved {saved} ({100 * saved / baseline:.0f}%)"
+          f"{' [truncated to budget]' if truncated else ''}")
+    return text
@@ -1,48 +1,35 @@
 """Agent tools - Database queries and external lookups"""
 
 from langchain_core.tools import tool
+import asyncio
 import json
-from database.connection import get_db_session
-from database.models import Customer, Transaction
-
-MOCK_SANCTIONS_LIST = {
-    "Mahmoud Al-Hassan": {
-        "entity_id": "SANC-9001", 
-        "jurisdiction": "High-Risk", 
-        "match_type": "CONFIRMED TERRORIST - OFAC SDN LIST",
-        "list_source": "OFAC SDN",
-        "category": "TERRORISM",
-        "confidence": 0.98,
-        "action_required": "BLOCK_ACCOUNT"
-    },
-    "Deepak": {
-        "entity_id": None, 
-        "jurisdiction": "N/A", 
-        "match_type": "Common Name - False Positive",
-        "list_source": None,
-        "category": None,
-        "confidence": 0.15,
-        "action_required": None
-    },
-    "Omar Terrorist Inc": {
-        "entity_id": "SANC-9002",
-        "jurisdiction": "Syria",
-        "match_type": "CONFIRMED SANCTIONED ENTITY - UN SANCTIONS",
-        "list_source": "UN Security Council",
-        "category": "TERRORIST FINANCING",
-        "confidence": 0.99,
-        "action_required": "BLOCK_ACCOUNT"
-    },
-    "Viktor Petrov": {
-        "entity_id": "SANC-9003",
-        "jurisdiction": "Russia",
-        "match_type": "CONFIRMED - EU/US SANCTIONS",
-        "list_source": "OFAC/EU Consolidated List",
-        "category": "SANCTIONED OLIGARCH",
-        "confidence": 0.95,
-        "action_required": "BLOCK_ACCOUNT"
-    }
-}
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from database.connection import get_db_session, get_async_db_session
+from database.models import Customer, CustomerFeatures, Transaction, Alert
+from config import (
+    HIGH_VALUE_TXN_THRESHOLD,
+    HISTORY_TOP_N,
+    DEFAULT_LOOKBACK_DAYS,
+    RECENT_TXN_COUNT,
+    SNAPSHOT_CACHE_MAX_ENTRIES,
+    SNAPSHOT_CACHE_TTL_SECONDS,
+    SANCTIONS_MATCH_THRESHOLD,
+    SANCTIONS_BLOCK_THRESHOLD,
+    LINKED_ACCOUNTS_MAX_DEPTH,
+    LINKED_ACCOUNTS_MAX_NODES,
+    LINKED_DEPOSIT_WINDOW_DAYS,
+    FEATURE_WINDOW_DAYS,
+    DORMANCY_THRESHOLD_MONTHS,
+)
+from screening import get_screening_index
+from linked_accounts import get_linked_account_graph
+from tool_output import encode_tool_output
+from features import compute_customer_features
 
 MOCK_ADVERSE_MEDIA = {
     "CUST-101": {"hits": 0, "summary": "No adverse media found for Rohitash"},
@@ -53,36 +40,261 @@ MOCK_ADVERSE_MEDIA = {
 }
 
 
+def _query_history(db, customer_id, lookback_days, features=None):
+    """Windowed history aggregates plus the top-N transactions, or None if no activity"""
+    if features and lookback_days == FEATURE_WINDOW_DAYS:
+        # Precomputed by the feature store over the same window
+        window_end = datetime.fromisoformat(features["as_of"])
+        total_txns = features["txn_count_90d"]
+        max_txn = features["max_txn_90d"]
+        avg_txn = features["avg_txn_90d"]
+        high_value_count = features["high_value_count_90d"]
+    else:
+        # The window ends at the customer's latest activity (index lookup on customer_id, date)
+        window_end = db.query(func.max(Transaction.date)).filter(
+            Transaction.customer_id == customer_id
+        ).scalar()
+        if window_end is None:
+            return None
+        
+        total_txns, max_txn, avg_txn, high_value_count = db.query(
+            func.count(Transaction.id),
+            func.max(Transaction.amount),
+            func.avg(Transaction.amount),
+            func.sum(case((Transaction.amount > HIGH_VALUE_TXN_THRESHOLD, 1), else_=0))
+        ).filter(
+            Transaction.customer_id == customer_id,
+            Transaction.date >= window_end - timedelta(days=lookback_days)
+        ).one()
+    
+    window_start = window_end - timedelta(days=lookback_days)
+    
+    # Only the largest transactions in the window are returned as rows
+    top_txns = db.query(Transaction).filter(
+        Transaction.customer_id == customer_id,
+        Transaction.date >= window_start
+    ).order_by(
+        Transaction.amount.desc(), Transaction.date.desc()
+    ).limit(HISTORY_TOP_N).all()
+    txn_list = sorted((t.to_dict() for t in top_txns), key=lambda t: t["date"])
+    
+    result = {
+        "customer_id": customer_id,
+        "lookback_days": lookback_days,
+        "window_start": window_start.isoformat(),
+        "window_end": window_end.isoformat(),
+        "transactions": txn_list,
+        "transactions_shown": len(txn_list),
+        "historical_max_txn": max_txn or 0,
+        "historical_avg_txn": round(avg_txn or 0, 2),
+        "high_value_count_90d": high_value_count or 0,
+        "total_transactions": total_txns
+    }
+    if features:
+        result.update({
+            k: features[k] for k in (
+                "velocity_48h_count", "velocity_48h_total", "inflow_90d",
+                "outflow_90d", "income_flow_ratio", "max_deposits_7d"
+            )
+        })
+    return result
+
+
+class CustomerSnapshot:
+    """
+    Everything the tools need about one customer, loaded in a single session:
+    KYC profile, alerts, precomputed features, most recent transactions and the
+    default history window. Other lookback windows are loaded on first use and
+    kept on the snapshot; snapshots are shared across threads and event loops,
+    so each window is loaded once and concurrent callers wait for that load.
+    """
+    
+    def __init__(self, customer_id, profile, alerts, features, recent_transactions, history):
+        self.customer_id = customer_id
+        self.profile = profile
+        self.alerts = alerts
+        self.features = features
+        self.recent_transactions = recent_transactions
+        self._lock = threading.Lock()
+        self._history = {DEFAULT_LOOKBACK_DAYS: Future()}  # lookback_days -> Future of the history result
+        self._history[DEFAULT_LOOKBACK_DAYS].set_result(history)
+    
+    @classmethod
+    def load(cls, customer_id):
+        with get_db_session() as db:
+            return cls._from_session(db, customer_id)
+    
+    @classmethod
+    async def aload(cls, customer_id):
+        async with get_async_db_session() as db:
+            return await db.run_sync(cls._from_session, customer_id)
+    
+    @classmethod
+    def _from_session(cls, db, customer_id):
+        features = db.get(CustomerFeatures, customer_id)
+        if features is not None:
+            features = features.to_dict()
+        else:
+            # No stored row yet (bulk load before a rebuild): compute it from the transactions, read-only
+            features = compute_customer_features(customer_id, db.connection())
+        
+        customer = db.query(Customer).filter(Customer.id == customer_id).first()
+        alerts = db.query(Alert).filter(Alert.customer_id == customer_id).all()
+        recent = db.query(Transaction).filter(
+            Transaction.customer_id == customer_id
+        ).order_by(Transaction.date.desc()).limit(RECENT_TXN_COUNT).all()
+        
+        return cls(
+            customer_id,
+            profile=customer.to_dict() if customer else None,
+            alerts=[a.to_dict() for a in alerts],
+            features=features,
+            recent_transactions=[t.to_dict() for t in reversed(recent)],
+            history=_query_history(db, customer_id, DEFAULT_LOOKBACK_DAYS, features)
+        )
+    
+    def _claim(self, lookback_days):
+        """(future, owner) for a window; the owner is the one caller that loads it"""
+        with self._lock:
+            future = self._history.get(lookback_days)
+            if future is not None:
+                return future, False
+            future = self._history[lookback_days] = Future()
+            return future, True
+    
+    def _fail(self, lookback_days, future, error):
+        # Waiting callers see the error; the next call loads the window again
+        with self._lock:
+            self._history.pop(lookback_days, None)
+        future.set_exception(error)
+    
+    def history(self, lookback_days):
+        future, owner = self._claim(lookback_days)
+        if owner:
+            try:
+                with get_db_session() as db:
+                    future.set_result(_query_history(db, self.customer_id, lookback_days, self.features))
+            except BaseException as e:
+                self._fail(lookback_days, future, e)
+                raise
+        return future.result()
+    
+    async def ahistory(self, lookback_days):
+        future, owner = self._claim(lookback_days)
+        if owner:
+            try:
+                async with get_async_db_session() as db:
+                    future.set_result(await db.run_sync(
+                        _query_history, self.customer_id, lookback_days, self.features
+                    ))
+            except BaseException as e:
+                self._fail(lookback_days, future, e)
+                raise
+        return future.result() if future.done() else await asyncio.wrap_future(future)
+
+
+class CustomerSnapshotCache:
+    """
+    Process-wide LRU of CustomerSnapshots with a TTL.
+    Tools share one snapshot per customer, so an investigation (and the
+    conversation that follows) hits the database once per customer.
+    """
+    
+    def __init__(self, max_entries=SNAPSHOT_CACHE_MAX_ENTRIES, ttl_seconds=SNAPSHOT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _lookup(self, customer_id, now):
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(customer_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+    
+    def _store(self, customer_id, now, snapshot):
+        with self._lock:
+            self._entries[customer_id] = (now, snapshot)
+            self._entries.move_to_end(customer_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def get(self, customer_id):
+        now = time.monotonic()
+        snapshot = self._lookup(customer_id, now)
+        if snapshot is None:
+            snapshot = CustomerSnapshot.load(customer_id)
+            self._store(customer_id, now, snapshot)
+        return snapshot
+    
+    async def aget(self, customer_id):
+        now = time.monotonic()
+        snapshot = self._lookup(customer_id, now)
+        if snapshot is None:
+            snapshot = await CustomerSnapshot.aload(customer_id)
+            self._store(customer_id, now, snapshot)
+        return snapshot
+    
+    def invalidate(self, customer_id=None):
+        """Drop one customer's snapshot, or all of them"""
+        with self._lock:
+            if customer_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(customer_id, None)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+customer_snapshots = CustomerSnapshotCache()
+
+
+def _history_output(customer_id, lookback_days, result):
+    if result is None:
+        return json.dumps({"error": "Customer not found", "transactions": []})
+    
+    print(f"   ✓ Found {result['total_transactions']} transactions in {lookback_days}d window, max: ${result['historical_max_txn']}")
+    return encode_tool_output("db_query_history", result)
+
+
 @tool
 def db_query_history(customer_id: str, lookback_days: int = 90) -> str:
     """Query historical transaction data for a customer."""
     print(f"\n🔍 [DB Tool] Querying transaction history for {customer_id}")
     
     try:
-        with get_db_session() as db:
-            transactions = db.query(Transaction).filter(
-                Transaction.customer_id == customer_id
-            ).all()
-            
-            if not transactions:
-                return json.dumps({"error": "Customer not found", "transactions": []})
-            
-            txn_list = [t.to_dict() for t in transactions]
-            high_value_txns = [t for t in txn_list if t["amount"] > 5000]
-            max_txn = max([t["amount"] for t in txn_list]) if txn_list else 0
-            avg_txn = sum([t["amount"] for t in txn_list]) / len(txn_list) if txn_list else 0
-            
-            result = {
-                "customer_id": customer_id,
-                "transactions": txn_list,
-                "historical_max_txn": max_txn,
-                "historical_avg_txn": round(avg_txn, 2),
-                "high_value_count_90d": len(high_value_txns),
-                "total_transactions": len(txn_list)
-            }
-            
-            print(f"   ✓ Found {len(txn_list)} transactions, max: ${max_txn}")
-            return json.dumps(result, indent=2)
+        return _history_output(customer_id, lookback_days, customer_snapshots.get(customer_id).history(lookback_days))
+    
+    except Exception as e:
+        print(f"   ✗ Database error: {e}")
+        return json.dumps({"error": str(e), "transactions": []})
+
+
+@tool("db_query_history")
+async def adb_query_history(customer_id: str, lookback_days: int = 90) -> str:
+    """Query historical transaction data for a customer."""
+    print(f"\n🔍 [DB Tool] Querying transaction history for {customer_id} (async)")
+    
+    try:
+        snapshot = await customer_snapshots.aget(customer_id)
+        return _history_output(customer_id, lookback_days, await snapshot.ahistory(lookback_days))
     
     except Exception as e:
         print(f"   ✗ Database error: {e}")
@@ -94,18 +306,63 @@ def check_linked_accounts(customer_id: str) -> str:
     """Check for linked accounts associated with a customer."""
     print(f"\n🔗 [DB Tool] Checking linked accounts for {customer_id}")
     
-    linked = []
-    aggregate_deposits = 28500 if customer_id == "CUST-102" else 0
+    try:
+        graph = get_linked_account_graph()
+        linked = graph.traverse(customer_id, LINKED_ACCOUNTS_MAX_DEPTH, LINKED_ACCOUNTS_MAX_NODES)
+        windows = graph.deposit_windows([customer_id] + [account for account, _, _ in linked])
+        
+        # Aggregate over the network as of its most recent deposit
+        latest_dates = [w.latest for w in windows.values() if w.latest is not None]
+        as_of = max(latest_dates) if latest_dates else None
+        deposits = {
+            account: round(window.total_as_of(as_of), 2) if as_of else 0.0
+            for account, window in windows.items()
+        }
+        
+        result = {
+            "customer_id": customer_id,
+            "linked_accounts": [
+                {
+                    "account_id": account,
+                    "depth": depth,
+                    "relationship_type": relationship_type,
+                    "deposits_7d": deposits[account]
+                }
+                for account, depth, relationship_type in linked
+            ],
+            "linked_account_count": len(linked),
+            "customer_deposits_7d": deposits[customer_id],
+            "aggregate_recent_deposits": round(sum(deposits.values()), 2),
+            "deposit_window_days": LINKED_DEPOSIT_WINDOW_DAYS,
+            "as_of": as_of.isoformat() if as_of else None
+        }
+        
+        print(f"   ✓ Found {len(linked)} linked accounts, aggregate deposits: ${result['aggregate_recent_deposits']}")
+        return encode_tool_output("check_linked_accounts", result)
+    
+    except Exception as e:
+        print(f"   ✗ Database error: {e}")
+        return json.dumps({"error": str(e), "linked_accounts": []})
+
+
+def _dormancy_output(customer_id, snapshot):
+    features = snapshot.features or {}
+    txn_list = snapshot.recent_transactions
+    
+    dormant_months = features.get("dormancy_months", 0)
+    is_dormant = dormant_months >= DORMANCY_THRESHOLD_MONTHS
     
     result = {
         "customer_id": customer_id,
-        "linked_accounts": linked,
-        "linked_account_count": len(linked),
-        "aggregate_recent_deposits": aggregate_deposits
+        "is_dormant": is_dormant,
+        "dormant_months": dormant_months,
+        "last_activity_date": txn_list[-1]["date"] if txn_list else "N/A",
+        "last_activity_before_reactivation": features.get("last_activity_before_reactivation"),
+        "recent_transactions": txn_list
     }
     
-    print(f"   ✓ Found {len(linked)} linked accounts")
-    return json.dumps(result, indent=2)
+    print(f"   ✓ Dormant: {is_dormant}, Months: {dormant_months}")
+    return encode_tool_output("check_account_dormancy", result)
 
 
 @tool
@@ -114,49 +371,55 @@ def check_account_dormancy(customer_id: str) -> str:
     print(f"\n💤 [DB Tool] Checking account dormancy for {customer_id}")
     
     try:
-        with get_db_session() as db:
-            transactions = db.query(Transaction).filter(
-                Transaction.customer_id == customer_id
-            ).all()
-            
-            is_dormant = customer_id == "CUST-105"
-            dormant_months = 16 if is_dormant else 0
-            
-            txn_list = [t.to_dict() for t in transactions]
-            
-            result = {
-                "customer_id": customer_id,
-                "is_dormant": is_dormant,
-                "dormant_months": dormant_months,
-                "last_activity_date": txn_list[-1]["date"] if txn_list else "N/A",
-                "recent_transactions": txn_list[-5:] if txn_list else []
-            }
-            
-            print(f"   ✓ Dormant: {is_dormant}, Months: {dormant_months}")
-            return json.dumps(result, indent=2)
+        return _dormancy_output(customer_id, customer_snapshots.get(customer_id))
+    
+    except Exception as e:
+        print(f"   ✗ Database error: {e}")
+        return json.dumps({"error": str(e)})
+
+
+@tool("check_account_dormancy")
+async def acheck_account_dormancy(customer_id: str) -> str:
+    """Check account dormancy status."""
+    print(f"\n💤 [DB Tool] Checking account dormancy for {customer_id} (async)")
+    
+    try:
+        return _dormancy_output(customer_id, await customer_snapshots.aget(customer_id))
     
     except Exception as e:
         print(f"   ✗ Database error: {e}")
         return json.dumps({"error": str(e)})
 
 
+def _kyc_output(profile):
+    if not profile:
+        return json.dumps({"error": "Customer not found"})
+    
+    print(f"   ✓ Profile: {profile['occupation']}, Income: ${profile['declared_income']}")
+    return encode_tool_output("get_kyc_profile", profile)
+
+
 @tool
 def get_kyc_profile(customer_id: str) -> str:
     """Retrieve KYC profile from database."""
     print(f"\n👤 [Context Tool] Retrieving KYC profile for {customer_id}")
     
     try:
-        with get_db_session() as db:
-            customer = db.query(Customer).filter(
-                Customer.id == customer_id
-            ).first()
-            
-            if not customer:
-                return json.dumps({"error": "Customer not found"})
-            
-            profile = customer.to_dict()
-            print(f"   ✓ Profile: {profile['occupation']}, Income: ${profile['declared_income']}")
-            return json.dumps(profile, indent=2)
+        return _kyc_output(customer_snapshots.get(customer_id).profile)
+    
+    except Exception as e:
+        print(f"   ✗ Database error: {e}")
+        return json.dumps({"error": str(e)})
+
+
+@tool("get_kyc_profile")
+async def aget_kyc_profile(customer_id: str) -> str:
+    """Retrieve KYC profile from database."""
+    print(f"\n👤 [Context Tool] Retrieving KYC profile for {customer_id} (async)")
+    
+    try:
+        snapshot = await customer_snapshots.aget(customer_id)
+        return _kyc_output(snapshot.profile)
     
     except Exception as e:
         print(f"   ✗ Database error: {e}")
@@ -170,7 +433,7 @@ def search_adverse_media(customer_id: str) -> str:
     
     result = MOCK_ADVERSE_MEDIA.get(customer_id, {"hits": 0, "summary": "No data available"})
     print(f"   ✓ Adverse media hits: {result['hits']}")
-    return json.dumps(result, indent=2)
+    return encode_tool_output("search_adverse_media", result)
 
 
 @tool
@@ -178,7 +441,13 @@ def sanctions_lookup(counterparty_name: str) -> str:
     """Look up counterparty in sanctions watchlist (OFAC, UN, EU)."""
     print(f"\n🚨 [Context Tool] Sanctions lookup for '{counterparty_name}'")
     
-    result = MOCK_SANCTIONS_LIST.get(counterparty_name, {
+    try:
+        candidates = get_screening_index().search(counterparty_name)
+    except Exception as e:
+        print(f"   ✗ Screening error: {e}")
+        return json.dumps({"error": str(e), "counterparty_name": counterparty_name})
+    
+    result = {
         "entity_id": None,
         "jurisdiction": "N/A",
         "match_type": "No Match",
@@ -186,9 +455,33 @@ def sanctions_lookup(counterparty_name: str) -> str:
         "category": None,
         "confidence": 0.0,
         "action_required": None
-    })
+    }
+    
+    if candidates:
+        best = candidates[0]
+        result.update({
+            "entity_id": best["entity_id"],
+            "matched_name": best["name"],
+            "jurisdiction": best["jurisdiction"],
+            "list_source": best["program"],
+            "category": best["category"],
+            "confidence": best["score"]
+        })
+        if best["common_name"]:
+            result["match_type"] = "Common Name - False Positive"
+        elif best["score"] >= SANCTIONS_BLOCK_THRESHOLD:
+            result["match_type"] = f"CONFIRMED {best['category']} - {best['program']}"
+            result["action_required"] = "BLOCK_ACCOUNT"
+        elif best["score"] >= SANCTIONS_MATCH_THRESHOLD:
+            result["match_type"] = "Potential Match - Manual Review"
+        else:
+            result["match_type"] = "Weak Match - Likely False Positive"
     
     result["counterparty_name"] = counterparty_name
+    result["candidates"] = [
+        {k: c[k] for k in ("entity_id", "name", "score", "program", "common_name")}
+        for c in candidates
+    ]
     is_confirmed = result.get("action_required") == "BLOCK_ACCOUNT"
     
     if is_confirmed:
@@ -198,4 +491,4 @@ def sanctions_lookup(counterparty_name: str) -> str:
     else:
         print(f"   ✓ Match type: {result['match_type']}")
     
-    return json.dumps(result, indent=2)
+    return encode_tool_output("sanctions_lookup", result)
@@ -1,39 +1,107 @@
-"""LangGraph workflow construction"""
+"""
+LangGraph workflow construction
+
+LangChain, LangGraph, the agents and the tools are imported on first use, so
+importing this module is cheap; get_workflow() compiles the graph once per
+process and shares it between UI sessions and worker threads.
+"""
 
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
 from state import AgentState
-from agents import (
-    create_investigator_agent,
-    create_context_gatherer_agent,
-    create_adjudicator_agent,
-    create_supervisor_node,
-    create_aem_executor_node,
-    create_conversational_agent
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    LLM_BACKEND,
+    STUB_LLM_LATENCY_MS,
+    PARALLEL_INVESTIGATION,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_EXCLUDE_NODES,
+    METRICS_ENABLED,
 )
-from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TEMPERATURE
+from collections import Counter
 import os
+import re
+import threading
 
 USE_CHECKPOINTS = os.getenv("USE_CHECKPOINTS", "true").lower() == "true"
 
+# Resolve threads are numbered per alert: ALT-2024-001-resolve-1, -2, ...
+RESOLVE_THREAD = re.compile(r"(.+)-resolve-(\d+)")
+
+
+def build_rate_limiter(requests_per_minute=LLM_REQUESTS_PER_MINUTE):
+    """Token-bucket limiter shared by every LLM call of a workflow, or None if unlimited"""
+    if not requests_per_minute:
+        return None
+    
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+    return InMemoryRateLimiter(
+        requests_per_second=requests_per_minute / 60,
+        check_every_n_seconds=0.05,
+        max_bucket_size=max(1, requests_per_minute // 60)
+    )
+
 
-def create_aars_workflow():
-    """Build the complete LangGraph workflow"""
+def build_chat_model(rate_limiter=None, backend=LLM_BACKEND):
+    """The chat model shared by all agents: ChatOpenAI, or the offline stub"""
+    if backend == "stub":
+        from stub_llm import StubChatModel
+        return StubChatModel(latency_seconds=STUB_LLM_LATENCY_MS / 1000, rate_limiter=rate_limiter)
     
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY not set in environment")
     
-    model = ChatOpenAI(
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
         model=OPENAI_MODEL,
         temperature=OPENAI_TEMPERATURE,
-        api_key=OPENAI_API_KEY
+        api_key=OPENAI_API_KEY,
+        rate_limiter=rate_limiter or build_rate_limiter()
+    )
+
+
+def create_aars_workflow(parallel=PARALLEL_INVESTIGATION, rate_limiter=None,
+                         cache_enabled=LLM_CACHE_ENABLED, cache_exclude=LLM_CACHE_EXCLUDE_NODES,
+                         model=None, checkpoints=None, metrics=METRICS_ENABLED):
+    """
+    Build the complete LangGraph workflow.
+    With parallel=True the supervisor fans out to investigator and
+    context_gatherer in one step; both report back and it joins them
+    before routing to the adjudicator.
+    All agents share one chat model, so rate_limiter (default: built from
+    LLM_REQUESTS_PER_MINUTE) caps requests across every alert run on this app.
+    `model` overrides the LLM_BACKEND chat model (e.g. a StubChatModel with
+    custom latency); `checkpoints` overrides USE_CHECKPOINTS.
+    With metrics=True every node and tool invocation is timed and stored in
+    the workflow_metrics table (see metrics.py).
+    """
+    
+    from langgraph.graph import StateGraph, END
+    from agents import (
+        create_investigator_agent,
+        create_context_gatherer_agent,
+        create_adjudicator_agent,
+        create_supervisor_node,
+        create_aem_executor_node,
+        create_conversational_agent,
+        FAN_OUT
     )
+    from llm_cache import get_llm_cache
     
-    investigator = create_investigator_agent(model)
-    context_gatherer = create_context_gatherer_agent(model)
-    adjudicator = create_adjudicator_agent(model)
-    conversational = create_conversational_agent(model)
-    supervisor = create_supervisor_node(model)
+    model = model or build_chat_model(rate_limiter)
+    
+    cached_model = model.model_copy(update={"cache": get_llm_cache()}) if cache_enabled else model
+    uncached_model = model.model_copy(update={"cache": False})
+    
+    def model_for(node):
+        return uncached_model if node in cache_exclude else cached_model
+    
+    investigator = create_investigator_agent(model_for("investigator"))
+    context_gatherer = create_context_gatherer_agent(model_for("context_gatherer"))
+    adjudicator = create_adjudicator_agent(model_for("adjudicator"))
+    conversational = create_conversational_agent(model_for("conversational"))
+    supervisor = create_supervisor_node(model_for("supervisor"), parallel=parallel)
     aem_executor = create_aem_executor_node()
     
     workflow = StateGraph(AgentState)
@@ -45,8 +113,10 @@ def create_aars_workflow():
     workflow.add_node("conversational", conversational)
     workflow.add_node("aem_executor", aem_executor)
     
-    def route_supervisor(state: AgentState) -> str:
+    def route_supervisor(state: AgentState):
         next_step = state.get("next", "FINISH")
+        if next_step == FAN_OUT:
+            return ["investigator", "context_gatherer"]
         return END if next_step == "FINISH" else next_step
     
     def route_to_supervisor_or_aem(state: AgentState) -> str:
@@ -62,24 +132,30 @@ def create_aars_workflow():
             "context_gatherer": "context_gatherer",
             "adjudicator": "adjudicator",
             "conversational": "conversational",
+            "aem_executor": "aem_executor",
             END: END
         }
     )
     
-    workflow.add_conditional_edges("investigator", route_to_supervisor_or_aem, {"supervisor": "supervisor"})
-    workflow.add_conditional_edges("context_gatherer", route_to_supervisor_or_aem, {"supervisor": "supervisor"})
+    # Agents report back to the supervisor; one that gives up after its retries
+    # (resilience.py) is reported as deferred and the supervisor closes the run
+    workflow.add_edge("investigator", "supervisor")
+    workflow.add_edge("context_gatherer", "supervisor")
     workflow.add_conditional_edges("adjudicator", route_to_supervisor_or_aem, {"aem_executor": "aem_executor", "supervisor": "supervisor"})
     workflow.add_edge("conversational", END)
     workflow.add_edge("aem_executor", END)
     
-    if USE_CHECKPOINTS:
+    if USE_CHECKPOINTS if checkpoints is None else checkpoints:
         from langgraph.checkpoint.sqlite import SqliteSaver
+        from checkpoint_manager import default_db_path
         import sqlite3
         
-        db_path = os.getenv("CHECKPOINT_DB", "checkpoints/aars_checkpoints.db")
+        db_path = default_db_path()
         os.makedirs(os.path.dirname(db_path) if os.path.dirname(db_path) else "checkpoints", exist_ok=True)
         
         conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Only takes effect on a new file; lets checkpoint_manager compact without a full VACUUM
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
         memory = SqliteSaver(conn)
         app = workflow.compile(checkpointer=memory)
         print("✓ Checkpointing ENABLED - Can resume after failures")
@@ -87,51 +163,168 @@ def create_aars_workflow():
         app = workflow.compile()
         print("⚠️  Checkpointing DISABLED - Cannot resume after failures")
     
+    if metrics:
+        from metrics import get_metrics_recorder
+        app = app.with_config(callbacks=[get_metrics_recorder()])
+    
+    return app
+
+
+_workflows = {}
+_workflows_lock = threading.Lock()
+
+
+def get_workflow(**options):
+    """
+    Process-wide compiled workflow, built on first request and shared by every
+    caller asking for the same options (keyword arguments of
+    create_aars_workflow; values must be hashable). Safe to call from many
+    threads at once; wrap it in st.cache_resource in the UI.
+    """
+    key = tuple(sorted(options.items()))
+    app = _workflows.get(key)
+    if app is None:
+        with _workflows_lock:
+            app = _workflows.get(key)
+            if app is None:
+                app = _workflows[key] = create_aars_workflow(**options)
     return app
 
 
-def run_alert_resolution(app, alert_data, thread_id=None, max_iterations=50):
+def reset_workflows():
+    """Drop cached workflows so the next get_workflow() rebuilds (e.g. after a config change)"""
+    with _workflows_lock:
+        _workflows.clear()
+
+
+def build_initial_state(alert_data, mode="resolve", user_query=""):
+    """Fresh AgentState for one run of the graph"""
+    return {
+        "alert_data": alert_data,
+        "findings": [],
+        "agent_status": {},
+        "resolution": {},
+        "next": "",
+        "messages": [],
+        "mode": mode,
+        "user_query": user_query,
+        "conversation_history": [],
+        "conversation_response": "",
+        "routing_trace": [],
+        "evidence": {}
+    }
+
+
+def _thread_config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def resolve_thread_id(alert_id, attempt):
+    """Checkpoint thread of one resolve attempt of an alert (attempts count from 1)"""
+    return f"{alert_id}-resolve-{attempt}"
+
+
+def latest_resolve_attempt(alert_id, db_path=None):
+    """Highest resolve attempt of the alert in the checkpoint database (0 if none); earlier ones may have been pruned"""
+    from checkpoint_manager import thread_ids
+    
+    attempts = [
+        int(match.group(2))
+        for match in map(RESOLVE_THREAD.fullmatch, thread_ids(resolve_thread_id(alert_id, ""), db_path))
+        if match and match.group(1) == alert_id
+    ]
+    return max(attempts, default=0)
+
+
+def next_resolve_thread(app, alert_id, resume=True):
+    """
+    (thread_id, resuming) for the alert's next resolve run: its latest attempt
+    if that run was interrupted - the checkpoint still has nodes to run - and
+    resume is set, otherwise a new attempt.
+    """
+    if app.checkpointer is None:
+        return resolve_thread_id(alert_id, 1), False
+    
+    attempt = latest_resolve_attempt(alert_id)
+    if attempt and resume and app.get_state(_thread_config(resolve_thread_id(alert_id, attempt))).next:
+        return resolve_thread_id(alert_id, attempt), True
+    return resolve_thread_id(alert_id, attempt + 1), False
+
+
+def find_interrupted_resolutions(db_path=None):
+    """
+    Startup scan of the checkpoint database: per alert, its latest resolve
+    attempt if that run stopped before finishing (crash, kill, max
+    iterations), newest first. Entries are checkpoint_manager thread
+    summaries (thread_id, alert_data, next, updated_at, ...); passing the
+    alert_data to run_alert_resolution resumes the run.
+    """
+    from checkpoint_manager import thread_summaries
+    
+    latest = {}
+    for thread in thread_summaries(db_path):
+        match = RESOLVE_THREAD.fullmatch(thread["thread_id"])
+        if not match:
+            continue
+        alert_id, attempt = match.group(1), int(match.group(2))
+        if alert_id not in latest or attempt > latest[alert_id][0]:
+            latest[alert_id] = (attempt, thread)
+    return [thread for _, thread in latest.values() if not thread["finished"] and thread["alert_data"]]
+
+
+def run_alert_resolution(app, alert_data, thread_id=None, max_iterations=50, callbacks=None, resume=True):
     """
     Run alert through AARS workflow (resolve mode).
     Yields processed node outputs for real-time UI updates.
+    `callbacks` are LangChain callback handlers attached to the run.
+    Without a thread_id the alert's latest attempt is resumed from its last
+    checkpoint if it was interrupted (resume=False starts a new attempt);
+    completed nodes are not run again.
     """
-    import uuid
+    from tools import customer_snapshots
+    from tool_output import tool_output_stats
+    from sop_rules import sop_stats
+    from llm_cache import get_llm_cache
+    from resilience import upstream_circuit
     
     print("\n" + "█"*80)
     print(f"█  AARS WORKFLOW STARTED")
     print(f"█  Alert: {alert_data['alert_id']} | Scenario: {alert_data['scenario_code']}")
     print("█"*80)
     
-    fresh_thread_id = thread_id or f"{alert_data['alert_id']}-resolve-{uuid.uuid4().hex[:8]}"
+    if thread_id is None:
+        thread_id, resuming = next_resolve_thread(app, alert_data["alert_id"], resume)
+    else:
+        resuming = resume and app.checkpointer is not None and bool(app.get_state(_thread_config(thread_id)).next)
     
-    initial_state = {
-        "alert_data": alert_data,
-        "findings": [],
-        "resolution": {},
-        "next": "",
-        "messages": [],
-        "mode": "resolve",
-        "user_query": "",
-        "conversation_history": [],
-        "conversation_response": ""
-    }
+    # Each resolve run starts from fresh customer data; its tools then share one snapshot
+    customer_snapshots.invalidate(alert_data.get("subject_id"))
     
-    config = {"configurable": {"thread_id": fresh_thread_id}}
+    config = _thread_config(thread_id)
+    if callbacks:
+        config["callbacks"] = callbacks
+    
+    if resuming:
+        print(f"↻ Resuming {thread_id} at {', '.join(app.get_state(config).next)}")
     
     iteration = 0
-    for state in app.stream(initial_state, config):
+    routing_paths = []
+    # None continues the thread from its last checkpoint
+    for state in app.stream(None if resuming else build_initial_state(alert_data), config):
         iteration += 1
         if iteration > max_iterations:
             yield {
                 "node": "error",
                 "error": "Max iterations reached",
-                "resolution": None
+                "resolution": None,
+                "thread_id": thread_id
             }
             break
         
         for node_name, node_state in state.items():
+            routing_paths.extend(step["path"] for step in node_state.get("routing_trace", []))
             findings = node_state.get("findings", [])
-            has_error = any("ERROR:" in f for f in findings)
+            has_error = "deferred" in node_state.get("agent_status", {}).values()
             
             yield {
                 "node": node_name,
@@ -139,14 +332,34 @@ def run_alert_resolution(app, alert_data, thread_id=None, max_iterations=50):
                 "findings": findings,
                 "has_error": has_error,
                 "resolution": node_state.get("resolution"),
-                "next": node_state.get("next", "")
+                "next": node_state.get("next", ""),
+                "thread_id": thread_id
             }
     
     print("\n" + "█"*80)
     print(f"█  WORKFLOW COMPLETED")
+    print(f"█  Customer snapshot cache: {customer_snapshots.stats()}")
+    print(f"█  Tool output encoding: {tool_output_stats.stats()}")
+    print(f"█  Supervisor routing: {dict(Counter(routing_paths))}")
+    print(f"█  SOP pre-adjudication: {sop_stats.stats()}")
+    print(f"█  Upstream circuit: {upstream_circuit.stats()}")
+    if LLM_CACHE_ENABLED:
+        print(f"█  LLM cache: {get_llm_cache().stats()}")
     print("█"*80 + "\n")
 
 
+def _trim_conversation(app, thread_id):
+    """Drop the superseded checkpoints of a finished turn; get_state and the next turn only read the latest"""
+    if app.checkpointer is None:
+        return
+    from checkpoint_manager import trim_thread
+    
+    try:
+        trim_thread(thread_id)
+    except Exception as e:
+        print(f"⚠️  Could not trim conversation checkpoints: {e}")
+
+
 def run_conversation(app, alert_data, user_query, thread_id=None):
     """Run conversation through AARS workflow (Supervisor → Conversational Agent)"""
     
@@ -157,17 +370,7 @@ def run_conversation(app, alert_data, user_query, thread_id=None):
     
     conv_thread_id = f"{thread_id or alert_data['alert_id']}-conv"
     
-    initial_state = {
-        "alert_data": alert_data,
-        "findings": [],
-        "resolution": {},
-        "next": "",
-        "messages": [],
-        "mode": "conversation",
-        "user_query": user_query,
-        "conversation_history": [],
-        "conversation_response": ""
-    }
+    initial_state = build_initial_state(alert_data, mode="conversation", user_query=user_query)
     
     config = {"configurable": {"thread_id": conv_thread_id}}
     
@@ -182,8 +385,64 @@ def run_conversation(app, alert_data, user_query, thread_id=None):
     
     if checkpoint_state and checkpoint_state.values:
         conversation_history = checkpoint_state.values.get("conversation_history", [])
+    _trim_conversation(app, conv_thread_id)
     
     print(f"█  Response generated (History: {len(conversation_history)} messages)")
     print("█"*80 + "\n")
     
     return response or "I couldn't generate a response. Please try again.", conversation_history
+
+
+def stream_conversation(app, alert_data, user_query, thread_id=None):
+    """
+    Streaming variant of run_conversation. Yields ("token", text) as the
+    Conversational Agent's LLM generates its answer, then one
+    ("done", {"response", "conversation_history", "ttft_ms"}) event. The
+    conversation history is still written to the checkpoint once, by the
+    node, when the answer is complete; the turn's earlier checkpoints are
+    then dropped.
+    """
+    import time
+    from langchain_core.messages import AIMessageChunk
+    
+    print("\n" + "█"*80)
+    print(f"█  AARS CONVERSATION MODE (streaming)")
+    print(f"█  Alert: {alert_data['alert_id']} | Query: {user_query[:50]}...")
+    print("█"*80)
+    
+    conv_thread_id = f"{thread_id or alert_data['alert_id']}-conv"
+    initial_state = build_initial_state(alert_data, mode="conversation", user_query=user_query)
+    config = {"configurable": {"thread_id": conv_thread_id}}
+    
+    started = time.perf_counter()
+    ttft_ms = None
+    response = ""
+    # The agent's LLM runs in a nested graph, so its tokens need subgraphs=True
+    for namespace, mode, data in app.stream(initial_state, config, stream_mode=["messages", "updates"], subgraphs=True):
+        if mode == "messages":
+            chunk, metadata = data
+            from_agent = namespace and namespace[0].startswith("conversational:")
+            if from_agent and isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content:
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+                yield "token", chunk.content
+        elif not namespace:
+            for value in data.values():
+                if isinstance(value, dict) and value.get("conversation_response"):
+                    response = value["conversation_response"]
+    
+    checkpoint_state = app.get_state(config)
+    conversation_history = []
+    if checkpoint_state and checkpoint_state.values:
+        conversation_history = checkpoint_state.values.get("conversation_history", [])
+    _trim_conversation(app, conv_thread_id)
+    
+    print(f"█  Time to first token: {ttft_ms} ms | Total: {round((time.perf_counter() - started) * 1000, 1)} ms")
+    print(f"█  Response generated (History: {len(conversation_history)} messages)")
+    print("█"*80 + "\n")
+    
+    yield "done", {
+        "response": response or "I couldn't generate a response. Please try again.",
+        "conversation_history": conversation_history,
+        "ttft_ms": ttft_ms
+    }